@@ -1,9 +1,9 @@
-from flask_swagger_ui import get_swaggerui_blueprint
-from flask_migrate import Migrate
+from flask import Flask
+
 from .config import create_app, db
+from .lazy import LazyMount, lazy_blueprint
 
 # app = create_app()
-# migrate = Migrate(app, db)
 
 # Make app available for Flask CLI
 # cli = app.cli
@@ -12,29 +12,60 @@ from .config import create_app, db
 SWAGGER_URL = '/swagger'
 API_URL = '/static/swagger.json'
 
-swaggerui_blueprint = get_swaggerui_blueprint(
-    SWAGGER_URL,
-    API_URL,
-    config={
-        'app_name': "Contact API"
-    }
-)
+# Rarely used endpoints, imported on their first request when LAZY_BLUEPRINTS is on (the default).
+# Rules mirror the modules' @route decorators: (rule, view function, methods, options)
+LAZY_BLUEPRINTS = {
+    "audit_logs": ("app.api.audit_logs", "/api/app", [
+        ("/audit-logs", "get_audit_logs", ["GET"], {"strict_slashes": False}),
+        ("/audit-logs/stats", "get_audit_log_stats", ["GET"], {}),
+        ("/audit-logs/export", "export_audit_logs", ["GET"], {}),
+    ]),
+}
+
+
+def _swagger_ui_blueprint():
+    from flask_swagger_ui import get_swaggerui_blueprint
+
+    return get_swaggerui_blueprint(
+        SWAGGER_URL,
+        API_URL,
+        config={
+            'app_name': "Contact API"
+        }
+    )
 
 
-def register_blueprints(app_instance): # Pass the app instance
+def _swagger_ui_app():
+    """The Swagger UI as a standalone app (it only serves the UI's files)."""
+    swagger_app = Flask(__name__, static_folder=None)
+    swagger_app.register_blueprint(_swagger_ui_blueprint())
+    return swagger_app
+
+
+def register_blueprints(app_instance, lazy=None): # Pass the app instance
     from .api.contacts import contacts_bp
     from .api.auth import auth_bp # Placeholder for auth blueprint
     from .api.users import users_bp
     from .api.roles import roles_bp
     from .api.permissions import permissions_bp
     from .api.categories import categories_bp
-    from .api.audit_logs import audit_logs_bp
 
-    app_instance.register_blueprint(swaggerui_blueprint, url_prefix=SWAGGER_URL)
+    if lazy is None:
+        lazy = app_instance.config.get("LAZY_BLUEPRINTS", True)
+    if lazy:
+        # Swagger UI and the audit log views are loaded by the first request that needs them
+        app_instance.wsgi_app = LazyMount(app_instance.wsgi_app, SWAGGER_URL, _swagger_ui_app)
+        for name, (module, url_prefix, rules) in LAZY_BLUEPRINTS.items():
+            app_instance.register_blueprint(lazy_blueprint(name, module, rules), url_prefix=url_prefix)
+    else:
+        from .api.audit_logs import audit_logs_bp
+
+        app_instance.register_blueprint(_swagger_ui_blueprint(), url_prefix=SWAGGER_URL)
+        app_instance.register_blueprint(audit_logs_bp, url_prefix="/api/app")
+
     app_instance.register_blueprint(contacts_bp, url_prefix="/api/app")
     app_instance.register_blueprint(users_bp, url_prefix="/api/app")
     app_instance.register_blueprint(roles_bp, url_prefix="/api/app")
     app_instance.register_blueprint(permissions_bp, url_prefix="/api/app")
     app_instance.register_blueprint(categories_bp, url_prefix="/api/app")
-    app_instance.register_blueprint(audit_logs_bp, url_prefix="/api/app")
     app_instance.register_blueprint(auth_bp, url_prefix="/api/auth") # Auth routes
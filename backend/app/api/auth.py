@@ -48,7 +48,7 @@ def register():
 @auth_bp.route("/login", methods=["POST"])
 def login():
     if current_user.is_authenticated:
-        return jsonify({"message": "Already logged in", "user": current_user.to_json()})
+        return jsonify({"message": "Already logged in", "user": current_user.load_user(*User.serialization_options()).to_json()})
 
     data = request.get_json()
     identifier = data.get("identifier") # Can be username or email
@@ -57,7 +57,9 @@ def login():
     if not identifier or not password:
         return jsonify({"message": "Missing identifier or password"}), 400
 
-    user = User.query.filter((User.username == identifier) | (User.email == identifier)).first()
+    user = User.query.options(*User.serialization_options()).filter(
+        (User.username == identifier) | (User.email == identifier)
+    ).first()
 
     if user and user.check_password(password):
         login_user(user, remember=data.get("remember", False)) # 'remember' for persistent sessions
@@ -74,7 +76,7 @@ def logout():
 @auth_bp.route("/status", methods=["GET"])
 def status():
     if current_user.is_authenticated:
-        return jsonify({"logged_in": True, "user": current_user.to_json()}), 200
+        return jsonify({"logged_in": True, "user": current_user.load_user(*User.serialization_options()).to_json()}), 200
     else:
         return jsonify({"logged_in": False}), 200
 
@@ -3,68 +3,66 @@ from ..config import db
 from ..models import Category, Permission  # Import Category and Permission
 from ..decorators import permission_required
 from flask_login import login_required
-from ..utils.audit_logger import log_audit_event
+from ..utils.fieldsets import parse_fieldset
+from ..utils.streaming import stream_items
+from ..utils.pagination import paginate, parse_count_mode
+from ..utils.text_search import parse_match_mode, text_filter
 
 categories_bp = Blueprint("categories", __name__)
 
+
+# Helper function to read `fields`/`include`, with the legacy include_* flags as default includes
+def _parse_category_fieldset(args):
+    """Raises ValueError for unknown fields or includes."""
+    default_include = [
+        name
+        for name in ("usage", "affected_permissions")
+        if args.get(f"include_{name}", "false").lower() == "true"
+    ]
+    return parse_fieldset(args, Category.JSON_COLUMNS, Category.JSON_INCLUDES, default_include)
+
+
+# Helper function to serialize a page of categories without per-row queries
+def _categories_to_json(categories, fieldset):
+    """Serializes categories, batching the permission lookup when usage is requested."""
+    affected_permissions = {}
+    if fieldset.includes("usage") or fieldset.includes("affected_permissions"):
+        affected_permissions = Category.load_affected_permissions([c.id for c in categories])
+    return [
+        c.to_json(affected_permissions=affected_permissions.get(c.id), fieldset=fieldset)
+        for c in categories
+    ]
+
 @categories_bp.route("/categories", methods=["GET"], strict_slashes=False)
 @login_required
 @permission_required("category.read.all")  # New permission for category management
 def get_categories():
     page = request.args.get("page", 1, type=int)
     per_page = request.args.get("per_page", 10, type=int)
-    include_usage = request.args.get("include_usage", "false").lower() == "true"
-    include_affected_permissions = (
-        request.args.get("include_affected_permissions", "false").lower() == "true"
-    )
     status_filter = request.args.get("status")
     name_search = request.args.get("name_search")
     get_all = request.args.get("get_all", "false").lower() == "true"
 
-    query = Category.query
+    try:
+        fieldset = _parse_category_fieldset(request.args)
+        count_mode = parse_count_mode(request.args)
+        match_mode = parse_match_mode(request.args)
+    except ValueError as e:
+        return jsonify({"message": str(e)}), 400
+
+    query = Category.query.options(*Category.serialization_options(fieldset))
 
     if status_filter:
         query = query.filter_by(status=status_filter)
     if name_search:
-        query = query.filter(Category.name.ilike(f"%{name_search}%"))
+        query = query.filter(text_filter(Category.name, name_search, match_mode))
 
     if get_all:
-        categories = query.all()
-        json_categories = list(
-            map(
-                lambda x: x.to_json(
-                    include_usage=include_usage,
-                    include_affected_permissions=include_affected_permissions,
-                ),
-                categories,
-            )
-        )
-        response_data = {"items": json_categories}  # No pagination metadata
-        response = make_response(jsonify(response_data))
-        return response
+        # No pagination metadata; streamed in chunks so memory stays flat regardless of table size
+        return stream_items(query, lambda categories: _categories_to_json(categories, fieldset))
     else:
-        pagination = query.paginate(page=page, per_page=per_page, error_out=False)
-        categories = pagination.items
-        json_categories = list(
-            map(
-                lambda x: x.to_json(
-                    include_usage=include_usage,
-                    include_affected_permissions=include_affected_permissions,
-                ),
-                categories,
-            )
-        )
-
-    pagination_metadata = {
-        "total_items": pagination.total,
-        "total_pages": pagination.pages,
-        "current_page": pagination.page,
-        "per_page": pagination.per_page,
-        "has_next": pagination.has_next,
-        "has_prev": pagination.has_prev,
-        "next_num": pagination.next_num,
-        "prev_num": pagination.prev_num,
-    }
+        categories, pagination_metadata = paginate(query, page, per_page, count_mode)
+        json_categories = _categories_to_json(categories, fieldset)
 
     response_data = {"items": json_categories, "pagination": pagination_metadata}
     response = make_response(jsonify(response_data))
@@ -76,21 +74,16 @@ def get_categories():
 @login_required
 @permission_required("category.read.all")
 def get_category(category_id):
-    include_usage = request.args.get("include_usage", "false").lower() == "true"
-    include_affected_permissions = (
-        request.args.get("include_affected_permissions", "false").lower() == "true"
-    )
+    try:
+        fieldset = _parse_category_fieldset(request.args)
+    except ValueError as e:
+        return jsonify({"message": str(e)}), 400
 
-    category = Category.query.get(category_id)
+    category = Category.query.options(*Category.serialization_options(fieldset)).get(category_id)
     if not category:
         return jsonify({"message": "Category not found"}), 404
 
-    return jsonify(
-        category.to_json(
-            include_usage=include_usage,
-            include_affected_permissions=include_affected_permissions,
-        )
-    ), 200
+    return jsonify(category.to_json(fieldset=fieldset)), 200
 
 
 @categories_bp.route("/categories", methods=["POST"])
@@ -115,15 +108,7 @@ def create_category():
 
     try:
         db.session.add(new_category)
-        db.session.commit()
-
-        log_audit_event(
-            action_type="CREATE",
-            entity_type="Category",
-            entity_id=new_category.id,
-            new_value=new_category.to_json(),  # Log the full new object state
-            description=f"Created category '{new_category.name}' (ID: {new_category.id})",
-        )
+        db.session.commit()  # The CREATE audit row is written by the same flush
 
     except Exception as e:
         db.session.rollback()
@@ -149,10 +134,6 @@ def update_category(category_id):
     if not category:
         return jsonify({"message": "Category not found"}), 404
 
-    # Capture old state for audit logging before making any changes
-    old_category_data = category.to_json()
-    changes = {}  # Dictionary to track what changed for audit log
-
     data = request.json
     new_name = data.get("name")
     new_description = data.get("description")
@@ -164,34 +145,21 @@ def update_category(category_id):
         ).first()
         if existing_category:
             return jsonify({"message": f"Category '{new_name}' already exists"}), 409
-        changes["name"] = {"old": category.name, "new": new_name}
         category.name = new_name
 
     if new_description is not None and new_description != category.description:
-        changes["description"] = {"old": category.description, "new": new_description}
         category.description = new_description
 
     if new_status is not None and new_status != category.status:
         if new_status not in ["active", "inactive"]:
             return jsonify({"message": "Invalid status. Must be 'active' or 'inactive'"}), 400
-        changes["status"] = {"old": category.status, "new": new_status}
         category.status = new_status
 
-    if not changes:  # No actual changes were made
+    if not db.session.is_modified(category):  # No actual changes were made
         return jsonify({"message": "No changes provided for update."}), 200
 
     try:
-        db.session.commit()
-        for field, values in changes.items():
-            log_audit_event(
-                action_type="UPDATE",
-                entity_type="Category",
-                entity_id=category.id,
-                field_name=field,
-                old_value=values["old"],
-                new_value=values["new"],
-                description=f"Updated category '{category.name}' (ID: {category.id}): changed '{field}'",
-            )
+        db.session.commit()  # One UPDATE audit row per changed field is written by the same flush
     except Exception as e:
         db.session.rollback()
         current_app.logger.error(f"Failed to update category: {e}", exc_info=True)
@@ -223,21 +191,9 @@ def delete_category(category_id):
             409,
         )
 
-    # Capture category data before deletion for audit log
-    deleted_category_name = category.name
-    deleted_category_json = category.to_json()
-
     try:
         db.session.delete(category)
-        db.session.commit()
-
-        log_audit_event(
-            action_type="DELETE",
-            entity_type="Category",
-            entity_id=category_id,  # Use the ID of the deleted category
-            old_value=deleted_category_json,  # Log the state before deletion
-            description=f"Deleted category '{deleted_category_name}' (ID: {category_id})",
-        )
+        db.session.commit()  # The DELETE audit row (state before deletion) is written by the same flush
 
     except Exception as e:
         db.session.rollback()
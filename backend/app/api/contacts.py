@@ -2,6 +2,8 @@ from flask import Blueprint, request, jsonify, make_response
 from ..config import db
 from ..models import Contact
 from ..decorators import permission_required
+from ..utils.fieldsets import parse_fieldset
+from ..utils.pagination import paginate, parse_count_mode
 from flask_login import login_required, current_user
 
 contacts_bp = Blueprint('contacts', __name__)
@@ -27,22 +29,16 @@ def get_contacts():
     page = request.args.get("page", 1, type=int)
     per_page = request.args.get("per_page", 10, type=int)
 
-    pagination = contacts_query.paginate(
-        page=page, per_page=per_page, error_out=False
+    try:
+        fieldset = parse_fieldset(request.args, Contact.JSON_COLUMNS, {})
+        count_mode = parse_count_mode(request.args)
+    except ValueError as e:
+        return jsonify({"message": str(e)}), 400
+
+    contacts, pagination_metadata = paginate(
+        contacts_query.options(*Contact.serialization_options(fieldset)), page, per_page, count_mode
     )
-    contacts = pagination.items
-    json_contacts = list(map(lambda x: x.to_json(), contacts))
-
-    pagination_metadata = {
-        "total_items": pagination.total,
-        "total_pages": pagination.pages,
-        "current_page": pagination.page,
-        "per_page": pagination.per_page,
-        "has_next": pagination.has_next,
-        "has_prev": pagination.has_prev,
-        "next_num": pagination.next_num,
-        "prev_num": pagination.prev_num,
-    }
+    json_contacts = [contact.to_json(fieldset=fieldset) for contact in contacts]
 
     response_data = {"items": json_contacts, "pagination": pagination_metadata}
     response = make_response(jsonify(response_data))
@@ -3,71 +3,68 @@ from ..config import db
 from ..models import Permission, Category
 from ..decorators import permission_required
 from flask_login import login_required
-from ..utils.audit_logger import log_audit_event
+from ..utils.permission_cache import bump_rbac_version
+from ..utils.fieldsets import parse_fieldset
+from ..utils.streaming import stream_items
+from ..utils.pagination import paginate, parse_count_mode
+from ..utils.text_search import parse_match_mode, text_filter
 
 permissions_bp = Blueprint('permissions', __name__)
 
+# Helper function to read `fields`/`include`, with the legacy include_* flags as default includes
+def _parse_permission_fieldset(args):
+    """Raises ValueError for unknown fields or includes."""
+    default_include = [
+        name for name, flag in (("category", "include_category_details"), ("usage", "include_usage"))
+        if args.get(flag, "false").lower() == "true"
+    ]
+    return parse_fieldset(args, Permission.JSON_COLUMNS, Permission.JSON_INCLUDES, default_include)
+
+# Helper function to serialize a page of permissions without per-row queries
+def _permissions_to_json(permissions, fieldset):
+    """Serializes permissions, batching the affected roles lookup when usage is requested."""
+    affected_roles = {}
+    if fieldset.includes("usage"):
+        affected_roles = Permission.load_affected_roles([p.id for p in permissions])
+    return [p.to_json(affected_roles=affected_roles.get(p.id), fieldset=fieldset) for p in permissions]
+
 @permissions_bp.route("/permissions", methods=["GET"], strict_slashes=False)
 @login_required
 @permission_required('permission.manage') # Or 'permission.read.all'
 def get_permissions():
     page = request.args.get("page", 1, type=int)
     per_page = request.args.get("per_page", 10, type=int)
-    include_usage = request.args.get("include_usage", "false").lower() == "true"
-    include_category_details = request.args.get("include_category_details", "false").lower() == "true"
     status_filter = request.args.get("status")
     name_search = request.args.get("name_search")
     category_id_filter = request.args.get("category_id", type=int)
     category_name_filter = request.args.get("category_name")
     get_all = request.args.get("get_all", "false").lower() == "true"
 
-    query = Permission.query
+    try:
+        fieldset = _parse_permission_fieldset(request.args)
+        count_mode = parse_count_mode(request.args)
+        match_mode = parse_match_mode(request.args)
+    except ValueError as e:
+        return jsonify({"message": str(e)}), 400
+
+    query = Permission.query.options(*Permission.serialization_options(fieldset))
     # Apply filters based on query parameters
     if status_filter:
         query = query.filter_by(status=status_filter)
     if name_search:
-        query = query.filter(Permission.name.ilike(f"%{name_search}%"))
+        query = query.filter(text_filter(Permission.name, name_search, match_mode))
     if category_id_filter:
         query = query.filter_by(category_id=category_id_filter)
     if category_name_filter:
         # Join with Category table to filter by category name
-        query = query.join(Category).filter(Category.name.ilike(f"%{category_name_filter}%"))
+        query = query.join(Category).filter(text_filter(Category.name, category_name_filter, match_mode))
 
     if get_all:
-        permissions = query.all()
-        json_permissions = list(map(
-            lambda x: x.to_json(
-                include_usage=include_usage,
-                include_category_details=include_category_details
-            ),
-            permissions
-        ))
-        response_data = {"items": json_permissions}  # No pagination metadata
-        response = make_response(jsonify(response_data))
-        return response
+        # No pagination metadata; streamed in chunks so memory stays flat regardless of table size
+        return stream_items(query, lambda permissions: _permissions_to_json(permissions, fieldset))
     else:
-        pagination = query.paginate(
-            page=page, per_page=per_page, error_out=False
-        )
-        permissions = pagination.items
-        json_permissions = list(map(
-            lambda x: x.to_json(
-                include_usage=include_usage,
-                include_category_details=include_category_details
-            ),
-            permissions
-        ))
-
-    pagination_metadata = {
-        "total_items": pagination.total,
-        "total_pages": pagination.pages,
-        "current_page": pagination.page,
-        "per_page": pagination.per_page,
-        "has_next": pagination.has_next,
-        "has_prev": pagination.has_prev,
-        "next_num": pagination.next_num,
-        "prev_num": pagination.prev_num,
-    }
+        permissions, pagination_metadata = paginate(query, page, per_page, count_mode)
+        json_permissions = _permissions_to_json(permissions, fieldset)
 
     response_data = {"items": json_permissions, "pagination": pagination_metadata}
     response = make_response(jsonify(response_data))
@@ -78,17 +75,15 @@ def get_permissions():
 @login_required
 @permission_required('permission.read.all')
 def get_permission(permission_id):
-    include_usage = request.args.get("include_usage", "false").lower() == "true"
-    include_category_details = request.args.get("include_category_details", "false").lower() == "true"
-
+    try:
+        fieldset = _parse_permission_fieldset(request.args)
+    except ValueError as e:
+        return jsonify({"message": str(e)}), 400
 
-    permission = Permission.query.get(permission_id)
+    permission = Permission.query.options(*Permission.serialization_options(fieldset)).get(permission_id)
     if not permission:
         return jsonify({"message": "Permission not found"}), 404
-    return jsonify(permission.to_json(
-        include_usage=include_usage,
-        include_category_details=include_category_details
-    )), 200
+    return jsonify(permission.to_json(fieldset=fieldset)), 200
 
 @permissions_bp.route("/permissions", methods=["POST"])
 @login_required
@@ -124,15 +119,8 @@ def create_permission():
 
     try:
         db.session.add(new_permission)
-        db.session.commit()
-
-        log_audit_event(
-            action_type='CREATE',
-            entity_type='Permission',
-            entity_id=new_permission.id,
-            new_value=new_permission.to_json(include_category_details=True),
-            description=f"Created permission '{new_permission.name}' (ID: {new_permission.id})"
-        )
+        bump_rbac_version() # Commits with the change; stales every worker's RBAC caches
+        db.session.commit() # The CREATE audit row is written by the same flush
     except Exception as e:
         db.session.rollback()
         current_app.logger.error(f"Failed to create permission: {e}", exc_info=True)
@@ -148,10 +136,6 @@ def update_permission(permission_id):
     if not permission:
         return jsonify({"message": "Permission not found"}), 404
 
-    # Capture old state for audit logging
-    old_permission_data = permission.to_json(include_category_details=True)
-    changes = {}
-
     data = request.json
     new_name = data.get("name")
     new_description = data.get("description")
@@ -165,56 +149,30 @@ def update_permission(permission_id):
         ).first()
         if existing_permission:
             return jsonify({"message": f"Permission '{new_name}' already exists"}), 409
-        changes['name'] = {'old': permission.name, 'new': new_name}
         permission.name = new_name
 
     if new_description is not None and new_description != permission.description:
-        changes['description'] = {'old': permission.description, 'new': new_description}
         permission.description = new_description
 
     if new_category_id is not None and new_category_id != permission.category_id:
-        new_category = None
-        if new_category_id is not None:
-            new_category = Category.query.get(new_category_id)
-            if not new_category:
-                return jsonify({"message": f"Category with ID {new_category_id} not found"}), 404
-
-        changes['category_id'] = {'old': permission.category_id, 'new': new_category_id}
-        # For more readable log, get category names if they exist
-        old_cat_name = permission.category_obj.name if permission.category_obj else 'None'
-        new_cat_name = new_category.name if new_category else 'None'
-        changes['category_name'] = {'old': old_cat_name, 'new': new_cat_name}  # Store for description
+        # No autoflush: pending changes must still count as modifications below
+        with db.session.no_autoflush:
+            new_category = db.session.get(Category, new_category_id)
+        if not new_category:
+            return jsonify({"message": f"Category with ID {new_category_id} not found"}), 404
         permission.category_id = new_category_id
 
     if new_status is not None and new_status != permission.status:
         if new_status not in ['active', 'inactive']:
             return jsonify({"message": "Invalid status. Must be 'active' or 'inactive'"}), 400
-        changes['status'] = {'old': permission.status, 'new': new_status}
         permission.status = new_status
 
-    if not changes:
+    if not db.session.is_modified(permission):
         return jsonify({"message": "No changes provided for update."}), 200
 
     try:
-        db.session.commit()
-
-        for field, values in changes.items():
-            if field == 'category_name':  # Skip logging this specific helper field
-                continue
-
-            description_msg = f"Updated permission '{permission.name}' (ID: {permission.id}): changed '{field}'"
-            if field == 'category_id':
-                description_msg += f" from '{changes['category_name']['old']}' to '{changes['category_name']['new']}'"
-
-            log_audit_event(
-                action_type='UPDATE',
-                entity_type='Permission',
-                entity_id=permission.id,
-                field_name=field,
-                old_value=values['old'],
-                new_value=values['new'],
-                description=description_msg
-            )
+        bump_rbac_version() # Commits with the change; stales every worker's RBAC caches
+        db.session.commit() # One UPDATE audit row per changed field is written by the same flush
     except Exception as e:
         db.session.rollback()
         current_app.logger.error(f"Failed to update permission: {e}", exc_info=True)
@@ -236,21 +194,10 @@ def delete_permission(permission_id):
             {"message": f"Cannot delete permission '{permission.name}'. It is assigned to {permission.roles.count()} roles."}
         ), 409
 
-    # Capture permission data before deletion for audit log
-    deleted_permission_name = permission.name
-    deleted_permission_json = permission.to_json(include_category_details=True)
-
     try:
         db.session.delete(permission)
-        db.session.commit()
-
-        log_audit_event(
-            action_type='DELETE',
-            entity_type='Permission',
-            entity_id=permission_id,  # Use the ID of the deleted permission
-            old_value=deleted_permission_json,  # Log the state before deletion
-            description=f"Deleted permission '{deleted_permission_name}' (ID: {permission_id})"
-        )
+        bump_rbac_version() # Commits with the change; stales every worker's RBAC caches
+        db.session.commit() # The DELETE audit row (state before deletion) is written by the same flush
     except Exception as e:
         db.session.rollback()
         current_app.logger.error(f"Failed to delete permission: {e}", exc_info=True)
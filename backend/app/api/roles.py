@@ -3,7 +3,10 @@ from ..config import db
 from ..models import Role, Permission # Import Permission model
 from ..decorators import permission_required
 from flask_login import login_required, current_user
-from ..utils.audit_logger import log_audit_event # NEW: Import the audit logger
+from ..utils.permission_cache import bump_rbac_version
+from ..utils.fieldsets import parse_fieldset
+from ..utils.pagination import paginate, parse_count_mode
+from ..utils.text_search import parse_match_mode, text_filter
 
 roles_bp = Blueprint('roles', __name__)
 
@@ -29,27 +32,20 @@ def get_roles():
     # Adding name_search as per the previous GET roles example
     name_search = request.args.get("name_search")
 
-    query = Role.query
+    try:
+        fieldset = parse_fieldset(request.args, Role.JSON_COLUMNS, Role.JSON_INCLUDES, Role.DEFAULT_INCLUDE)
+        count_mode = parse_count_mode(request.args)
+        match_mode = parse_match_mode(request.args)
+    except ValueError as e:
+        return jsonify({"message": str(e)}), 400
+
+    query = Role.query.options(*Role.serialization_options(fieldset))
 
     if name_search:
-        query = query.filter(Role.name.ilike(f"%{name_search}%"))
-
-    pagination = query.paginate(
-        page=page, per_page=per_page, error_out=False
-    )
-    roles = pagination.items
-    json_roles = list(map(lambda x: x.to_json(), roles))
-
-    pagination_metadata = {
-        "total_items": pagination.total,
-        "total_pages": pagination.pages,
-        "current_page": pagination.page,
-        "per_page": pagination.per_page,
-        "has_next": pagination.has_next,
-        "has_prev": pagination.has_prev,
-        "next_num": pagination.next_num,
-        "prev_num": pagination.prev_num,
-    }
+        query = query.filter(text_filter(Role.name, name_search, match_mode))
+
+    roles, pagination_metadata = paginate(query, page, per_page, count_mode)
+    json_roles = [role.to_json(fieldset=fieldset) for role in roles]
 
     response_data = {"items": json_roles, "pagination": pagination_metadata}
     response = make_response(jsonify(response_data))
@@ -60,10 +56,15 @@ def get_roles():
 @login_required
 @permission_required('role.manage')
 def get_role(role_id):
-    role = Role.query.get(role_id)
+    try:
+        fieldset = parse_fieldset(request.args, Role.JSON_COLUMNS, Role.JSON_INCLUDES, Role.DEFAULT_INCLUDE)
+    except ValueError as e:
+        return jsonify({"message": str(e)}), 400
+
+    role = Role.query.options(*Role.serialization_options(fieldset)).get(role_id)
     if not role:
         return jsonify({"message": "Role not found"}), 404
-    return jsonify(role.to_json()), 200
+    return jsonify(role.to_json(fieldset=fieldset)), 200
 
 @roles_bp.route("/roles", methods=["POST"])
 @login_required
@@ -90,15 +91,8 @@ def create_role():
 
     try:
         db.session.add(new_role)
-        db.session.commit()
-
-        log_audit_event(
-            action_type='CREATE',
-            entity_type='Role',
-            entity_id=new_role.id,
-            new_value=new_role.to_json(), # Log the full new object state
-            description=f"Created role '{new_role.name}' (ID: {new_role.id})"
-        )
+        bump_rbac_version() # Commits with the change; stales every worker's RBAC caches
+        db.session.commit() # The CREATE audit row is written by the same flush
 
     except Exception as e:
         db.session.rollback()
@@ -115,10 +109,6 @@ def update_role(role_id):
     if not role:
         return jsonify({"message": "Role not found"}), 404
 
-    # Capture old state for audit logging before modifications
-    old_role_data = role.to_json()
-    changes = {} # Dictionary to track what changed for audit log
-
     data = request.json
     new_name = data.get("name")
     new_description = data.get("description")
@@ -132,90 +122,28 @@ def update_role(role_id):
         ).first()
         if existing_role:
             return jsonify({"message": f"Role '{new_name}' already exists"}), 409
-        changes['name'] = {'old': role.name, 'new': new_name}
         role.name = new_name
 
     # Handle description change
     if new_description is not None and new_description != role.description:
-        changes['description'] = {'old': role.description, 'new': new_description}
         role.description = new_description
 
-    # Handle permission changes (this is the most complex part for auditing)
+    # Overwrite the permission set; added/removed permissions are audited from the collection history
     if new_permission_ids is not None:
-        current_permissions_info = sorted([
-            {"id": p.id, "name": p.name} for p in role.permissions
-        ], key=lambda x: x['id'])  # Sort for consistent comparison
-
-        new_permission_ids_set = set(new_permission_ids)  # Use a set for efficient lookup
-        # Fetch new permissions and their names
-        try:
-            permissions_to_set = _get_permissions_by_ids(list(new_permission_ids_set))
-        except ValueError as e:
-            return jsonify({"message": str(e)}), 400
-
-        new_permissions_info = sorted([
-            {"id": p.id, "name": p.name} for p in permissions_to_set
-        ], key=lambda x: x['id'])  # Sort for consistent comparison
-
-        # Only proceed if there are actual changes in the set of permissions
-        if current_permissions_info != new_permissions_info:
-            # Calculate added and removed permissions for description
-            current_permission_ids = {p['id'] for p in current_permissions_info}
-            new_permission_ids_for_compare = {p['id'] for p in new_permissions_info}
-
-            added_permissions_names = [
-                p['name'] for p in new_permissions_info
-                if p['id'] not in current_permission_ids
-            ]
-            removed_permissions_names = [
-                p['name'] for p in current_permissions_info
-                if p['id'] not in new_permission_ids_for_compare
-            ]
-
-            # Update the role's permissions
+        # No autoflush (lookup and lazy load): pending changes must still count as modifications below
+        with db.session.no_autoflush:
+            try:
+                permissions_to_set = _get_permissions_by_ids(list(set(new_permission_ids)))
+            except ValueError as e:
+                return jsonify({"message": str(e)}), 400
             role.permissions = permissions_to_set
 
-            # Store permission changes in the `changes` dict for logging
-            changes['permissions'] = {
-                'old_details': current_permissions_info,  # Store list of dicts
-                'new_details': new_permissions_info,  # Store list of dicts
-                'added_names': added_permissions_names,
-                'removed_names': removed_permissions_names
-            }
-
-    if not changes: # No actual changes were detected based on provided data
+    if not db.session.is_modified(role): # No actual changes were detected based on provided data
         return jsonify({"message": "No changes provided for update."}), 200
 
     try:
-        db.session.commit()
-
-        for field, values in changes.items():
-            if field == 'permissions':
-                description_msg = f"Updated role '{role.name}' (ID: {role.id}): permissions changed."
-                if values['added_names']:
-                    description_msg += f" Added: {', '.join(values['added_names'])}."
-                if values['removed_names']:
-                    description_msg += f" Removed: {', '.join(values['removed_names'])}."
-
-                log_audit_event(
-                    action_type='UPDATE',
-                    entity_type='Role',
-                    entity_id=role.id,
-                    field_name=field,
-                    old_value=values['old_details'],
-                    new_value=values['new_details'],
-                    description=description_msg
-                )
-            else:
-                log_audit_event(
-                    action_type='UPDATE',
-                    entity_type='Role',
-                    entity_id=role.id,
-                    field_name=field,
-                    old_value=values['old'],
-                    new_value=values['new'],
-                    description=f"Updated role '{role.name}' (ID: {role.id}): changed '{field}'"
-                )
+        bump_rbac_version() # Commits with the change; stales every worker's RBAC caches
+        db.session.commit() # One UPDATE audit row per changed field is written by the same flush
 
     except Exception as e:
         db.session.rollback()
@@ -241,23 +169,10 @@ def delete_role(role_id):
     if role.users.count() > 0:
         return jsonify({"message": f"Cannot delete role '{role.name}'. It is currently assigned to users."}), 409
 
-    # Capture role data before deletion for audit log
-    deleted_role_name = role.name
-    deleted_role_json = role.to_json() # Captures current state including permissions
-
     try:
         db.session.delete(role)
-        db.session.commit()
-
-        # --- AUDIT LOG: ROLE DELETION ---
-        log_audit_event(
-            action_type='DELETE',
-            entity_type='Role',
-            entity_id=role_id,
-            old_value=deleted_role_json, # Log the state before deletion
-            description=f"Deleted role '{deleted_role_name}' (ID: {role_id})"
-        )
-        # -----------------------------------
+        bump_rbac_version() # Commits with the change; stales every worker's RBAC caches
+        db.session.commit() # The DELETE audit row (state before deletion) is written by the same flush
 
     except Exception as e:
         db.session.rollback()
@@ -300,34 +215,10 @@ def add_permission_to_role(role_id):
     if permission in role.permissions:
         return jsonify({"message": "Role already has this permission"}), 409
 
-    # Capture old permissions for audit
-    old_permissions_details = sorted([
-        {"id": p.id, "name": p.name} for p in role.permissions
-    ], key=lambda x: x['id'])
-
     role.permissions.append(permission)
     try:
-        db.session.commit()
-
-        # --- AUDIT LOG: ADD PERMISSION TO ROLE ---
-        new_permissions_details = sorted([
-            {"id": p.id, "name": p.name} for p in role.permissions
-        ], key=lambda x: x['id'])
-
-        description_msg = (
-            f"Added permission '{permission.name}' (ID: {permission.id}) "
-            f"to role '{role.name}' (ID: {role.id})."
-        )
-        log_audit_event(
-            action_type='UPDATE',
-            entity_type='Role',
-            entity_id=role.id,
-            field_name='permissions',
-            old_value=old_permissions_details,  # Pass the list of dicts
-            new_value=new_permissions_details,  # Pass the list of dicts
-            description=description_msg
-        )
-        # -------------------------------------------
+        bump_rbac_version() # Commits with the change; stales every worker's RBAC caches
+        db.session.commit() # The 'permissions' audit row is written by the same flush
 
     except Exception as e:
         db.session.rollback()
@@ -351,34 +242,10 @@ def remove_permission_from_role(role_id, permission_id):
     if permission not in role.permissions:
         return jsonify({"message": "Role does not have this permission"}), 404
 
-    # Capture old permissions for audit
-    old_permissions_details = sorted([
-        {"id": p.id, "name": p.name} for p in role.permissions
-    ], key=lambda x: x['id'])
-
     role.permissions.remove(permission)
     try:
-        db.session.commit()
-
-        # --- AUDIT LOG: REMOVE PERMISSION FROM ROLE ---
-        new_permissions_details = sorted([
-            {"id": p.id, "name": p.name} for p in role.permissions
-        ], key=lambda x: x['id'])
-
-        description_msg = (
-            f"Removed permission '{permission.name}' (ID: {permission.id}) "
-            f"from role '{role.name}' (ID: {role.id})."
-        )
-        log_audit_event(
-            action_type='UPDATE',
-            entity_type='Role',
-            entity_id=role.id,
-            field_name='permissions',
-            old_value=old_permissions_details,  # Pass the list of dicts
-            new_value=new_permissions_details,  # Pass the list of dicts
-            description=description_msg
-        )
-        # ----------------------------------------------
+        bump_rbac_version() # Commits with the change; stales every worker's RBAC caches
+        db.session.commit() # The 'permissions' audit row is written by the same flush
 
     except Exception as e:
         db.session.rollback()
@@ -5,6 +5,11 @@ from flask_login import login_required, current_user
 from ..models import User, Role # Adjusted import
 from ..config import db # Import db from app package __init__
 from ..decorators import permission_required
+from ..utils.permission_cache import bump_rbac_version
+from ..utils.fieldsets import parse_fieldset
+from ..utils.streaming import stream_items
+from ..utils.pagination import paginate, parse_count_mode
+from ..utils.text_search import parse_match_mode, text_filter
 
 users_bp = Blueprint('users', __name__)
 
@@ -20,42 +25,33 @@ def get_users():
     role_id_filter = request.args.get("role_id", type=int)  # Filter by role ID
     role_name_filter = request.args.get("role_name")  # Filter by role name
 
-    query = User.query
+    try:
+        fieldset = parse_fieldset(request.args, User.JSON_COLUMNS, User.JSON_INCLUDES, User.DEFAULT_INCLUDE)
+        count_mode = parse_count_mode(request.args)
+        match_mode = parse_match_mode(request.args)
+    except ValueError as e:
+        return jsonify({"message": str(e)}), 400
+
+    query = User.query.options(*User.serialization_options(fieldset))
 
     # Apply filters based on query parameters
     if status_filter:
         query = query.filter_by(status=status_filter)  # Assuming a 'status' field in User model
     if username_search:
-        query = query.filter(User.username.ilike(f"%{username_search}%"))
+        query = query.filter(text_filter(User.username, username_search, match_mode))
     if email_search:
-        query = query.filter(User.email.ilike(f"%{email_search}%"))
+        query = query.filter(text_filter(User.email, email_search, match_mode))
     if role_id_filter:
         query = query.filter(User.roles.any(Role.id == role_id_filter))
     if role_name_filter:
-        query = query.filter(User.roles.any(Role.name.ilike(f"%{role_name_filter}%")))
+        query = query.filter(User.roles.any(text_filter(Role.name, role_name_filter, match_mode)))
 
     if get_all:
-        users = query.all()
-        json_users = list(map(lambda x: x.to_json(), users))
-        response_data = {"items": json_users}
-        response = make_response(jsonify(response_data))
-        return response
+        # Streamed in chunks so memory stays flat regardless of table size
+        return stream_items(query, lambda users: [user.to_json(fieldset=fieldset) for user in users])
     else:
-        pagination = query.paginate(page=page, per_page=per_page, error_out=False)
-
-        users = pagination.items
-        json_users = list(map(lambda x: x.to_json(), users))
-
-        pagination_metadata = {
-            "total_items": pagination.total,
-            "total_pages": pagination.pages,
-            "current_page": pagination.page,
-            "per_page": pagination.per_page,
-            "has_next": pagination.has_next,
-            "has_prev": pagination.has_prev,
-            "next_num": pagination.next_num,
-            "prev_num": pagination.prev_num,
-        }
+        users, pagination_metadata = paginate(query, page, per_page, count_mode)
+        json_users = [user.to_json(fieldset=fieldset) for user in users]
 
         response_data = OrderedDict(
             [("items", json_users), ("pagination", pagination_metadata)]
@@ -127,6 +123,8 @@ def update_user(user_id):
         user.roles = roles_to_assign
 
     try:
+        if role_ids is not None or new_username:
+            bump_rbac_version() # The user's cached permissions and principal are now stale
         db.session.commit()
     except Exception as e:
         db.session.rollback()
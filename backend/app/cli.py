@@ -0,0 +1,68 @@
+import click
+from flask.cli import AppGroup
+
+from .config import db
+
+audit_cli = AppGroup("audit", help="Audit log maintenance commands.")
+
+
+@click.command("create-schema")
+def create_schema_command():
+    """Creates missing tables and indexes (and upgrades legacy audit columns). Run before starting the server."""
+    db.create_all()
+    click.echo("Database schema is up to date.")
+
+
+@audit_cli.command("rebuild-search-index")
+def rebuild_search_index_command():
+    """Rebuilds the full-text search index from the audit_logs table."""
+    from .utils.audit_search import rebuild_search_index
+
+    if db.engine.dialect.name != "sqlite":
+        click.echo("Full-text search index is only used with SQLite; nothing to do.")
+        return
+    with db.engine.begin() as connection:
+        count = rebuild_search_index(connection)
+    click.echo(f"Indexed {count} audit log entries.")
+
+
+@audit_cli.command("rotate")
+@click.option("--hot-months", type=int, default=None, help="Months kept in audit_logs (default: AUDIT_HOT_MONTHS).")
+@click.option(
+    "--archive-after-months", type=int, default=None,
+    help="Age in months after which partitions are archived (default: AUDIT_ARCHIVE_AFTER_MONTHS).",
+)
+def rotate_command(hot_months, archive_after_months):
+    """Moves old audit logs into monthly partitions and archives the oldest partitions."""
+    from .utils.audit_partitions import archive_partitions, seal_partitions
+
+    for name, moved in seal_partitions(hot_months):
+        click.echo(f"Moved {moved} audit log entries into {name}.")
+    for name, path in archive_partitions(archive_after_months):
+        click.echo(f"Archived {name} to {path}.")
+
+
+@audit_cli.command("restore")
+@click.argument("period")
+def restore_command(period):
+    """Restores an archived monthly partition (PERIOD is YYYY-MM) so it can be queried again."""
+    from .utils.audit_partitions import restore_partition
+
+    try:
+        restored = restore_partition(period)
+    except ValueError as e:
+        raise click.ClickException(str(e))
+    click.echo(f"Restored {restored} audit log entries for {period}.")
+
+
+@audit_cli.command("rebuild-stats")
+@click.option("--from", "start", type=click.DateTime(["%Y-%m-%d"]), default=None, help="First day to rebuild.")
+@click.option("--to", "end", type=click.DateTime(["%Y-%m-%d"]), default=None, help="Last day to rebuild.")
+def rebuild_stats_command(start, end):
+    """Recomputes the daily audit log rollups from the stored audit logs (archived months are kept)."""
+    from .utils.audit_rollups import rebuild_rollups
+
+    with db.engine.begin() as connection:
+        count, first_day = rebuild_rollups(connection, start and start.date(), end and end.date())
+    since = f" from {first_day}" if first_day else ""
+    click.echo(f"Counted {count} audit log entries into the daily rollups{since}.")
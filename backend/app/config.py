@@ -1,12 +1,15 @@
+import os
+
 from flask import Flask, jsonify
 from flask_sqlalchemy import SQLAlchemy
 from flask_cors import CORS
 from flask_login import LoginManager
-from flask_migrate import Migrate
 
-db = SQLAlchemy()
+from .db_routing import RoutingSession, init_routing
+from .settings import configure_engines, database_config
+
+db = SQLAlchemy(session_options={"class_": RoutingSession})
 login_manager = LoginManager()
-migrate = Migrate()
 
 @login_manager.unauthorized_handler
 def unauthorized():
@@ -23,7 +26,8 @@ def create_app():
         origins=["http://localhost:5173", "http://127.0.0.1:5173"]
     )
 
-    app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite:///databaselocal.db"
+    # DATABASE_URL, pool sizing and SQLite tuning come from the environment (see settings.py)
+    app.config.update(database_config())
     app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
     app.config["SECRET_KEY"] = "your_very_secret_key_here"
     
@@ -33,16 +37,31 @@ def create_app():
     app.config["SESSION_COOKIE_HTTPONLY"] = True
 
     db.init_app(app)
+    configure_engines(app, db)
+    init_routing(app, db)  # Read replicas, if DATABASE_REPLICA_URLS is set
     login_manager.init_app(app)  # Initialize LoginManager with the app
-    migrate.init_app(app, db)
+    if os.environ.get("FLASK_RUN_FROM_CLI") == "true":
+        # Only `flask db ...` needs Flask-Migrate; servers skip importing Alembic (~0.5 s)
+        from flask_migrate import Migrate
+        Migrate(app, db)
     # login_manager.login_view = "auth.login"  # The route name for the login page (we'll create this)
     login_manager.session_protection = "strong"  # Optional: for better security
 
-    # Import models here to avoid circular imports if models need 'db'
-    from .models.user import User  # Import User model
+    # Import here to avoid circular imports if models need 'db'
+    from .utils.principal import load_principal
+    from .utils import change_capture  # noqa: F401 (registers the audit flush listeners)
+    from .utils.compression import init_compression
+
+    init_compression(app)
 
     @login_manager.user_loader
     def load_user(user_id):
-        return User.query.get(int(user_id))
+        # A cached, read-only snapshot; handlers that need the ORM User call current_user.load_user()
+        return load_principal(int(user_id))
+
+    # Maintenance commands, e.g. `flask --app wsgi create-schema` or `flask --app wsgi audit rebuild-search-index`
+    from .cli import audit_cli, create_schema_command
+    app.cli.add_command(audit_cli)
+    app.cli.add_command(create_schema_command)
 
     return app
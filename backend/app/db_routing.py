@@ -0,0 +1,169 @@
+import itertools
+import time
+from threading import Lock
+
+from flask import current_app, g, has_request_context, request, session as cookie_session
+from flask_sqlalchemy.session import Session
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.sql.elements import TextClause
+
+PRIMARY = "primary"
+REPLICA = "replica"
+
+DEFAULT_REPLICA_STALENESS_SECONDS = 5  # Requests this soon after a client's write read the primary
+DEFAULT_REPLICA_MAX_LAG_SECONDS = 10  # Replicas further behind are skipped
+LAG_CHECK_INTERVAL = 5  # Seconds between replication lag checks of a replica
+
+_WROTE_KEY = "db_routing_wrote"  # session.info flag: this request has written
+_WROTE_AT_KEY = "_db_wrote_at"  # Flask session (cookie) key: time of the client's last write
+
+_next_replica = itertools.count()
+_lag_checks = {}  # engine url -> (checked_at, fresh)
+_lag_lock = Lock()
+
+
+def use_primary(view):
+    """Route decorator: run a GET handler on the primary (e.g. reads that must see the latest writes)."""
+    view.db_route = PRIMARY
+    return view
+
+
+def use_replica(view):
+    """Route decorator: run a read-only handler registered for another method (e.g. a POST search) on a replica."""
+    view.db_route = REPLICA
+    return view
+
+
+def _is_read(clause):
+    if clause is None:
+        # session.connection(): the caller is about to run something we cannot see
+        return False
+    if isinstance(clause, TextClause):
+        # Raw SQL is only trusted to be a read when it is a query
+        return clause.text.lstrip().upper().startswith(("SELECT", "WITH"))
+    return getattr(clause, "is_select", False) and getattr(clause, "_for_update_arg", None) is None
+
+
+def _request_replica():
+    return g.get("db_replica") if has_request_context() else None
+
+
+def read_engine(db):
+    """The engine the current request reads from outside db.session: its replica, or the primary."""
+    return _request_replica() or db.engine
+
+
+class RoutingSession(Session):
+    """
+    db.session for read/write splitting: while the current request is routed to a
+    replica (see init_routing), SELECTs run on that replica. Flushes, DML and any
+    other statement run on the primary, and so does everything after them in the
+    same request, so a request reads its own writes.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None:
+            if self._flushing or not _is_read(clause):
+                self.info[_WROTE_KEY] = True
+            elif not self.info.get(_WROTE_KEY):
+                replica = _request_replica()
+                if replica is not None:
+                    return replica
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+def replication_lag(connection):
+    """Seconds a replica is behind its primary (0 where it cannot be measured, e.g. SQLite)."""
+    if connection.dialect.name == "postgresql":
+        # An idle primary sends no transactions; a replica that replayed everything it received is current
+        return float(connection.execute(text(
+            "SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0"
+            " ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) END"
+        )).scalar())
+    return 0.0
+
+
+def _is_fresh(engine, max_lag):
+    key = str(engine.url)
+    now = time.monotonic()
+    with _lag_lock:
+        checked = _lag_checks.get(key)
+    if checked is not None and now - checked[0] < LAG_CHECK_INTERVAL:
+        return checked[1]
+    try:
+        with engine.connect() as connection:
+            fresh = replication_lag(connection) <= max_lag
+    except DBAPIError:
+        # An unreachable replica is skipped until the next check
+        fresh = False
+    with _lag_lock:
+        _lag_checks[key] = (now, fresh)
+    return fresh
+
+
+def _choose_replica(engines):
+    """The next replica (round robin) within the lag limit, or None to use the primary."""
+    max_lag = current_app.config.get("DB_REPLICA_MAX_LAG_SECONDS", DEFAULT_REPLICA_MAX_LAG_SECONDS)
+    start = next(_next_replica)
+    for offset in range(len(engines)):
+        engine = engines[(start + offset) % len(engines)]
+        if _is_fresh(engine, max_lag):
+            return engine
+    return None
+
+
+def _route_request():
+    engines = current_app.extensions.get("db_replicas")
+    if not engines:
+        return
+    view = current_app.view_functions.get(request.endpoint)
+    route = getattr(view, "db_route", None) or (REPLICA if request.method in ("GET", "HEAD") else PRIMARY)
+    if route != REPLICA:
+        return
+    # Staleness guard: a client that just wrote reads the primary until replicas have caught up
+    wrote_at = cookie_session.get(_WROTE_AT_KEY)
+    window = current_app.config.get("DB_REPLICA_STALENESS_SECONDS", DEFAULT_REPLICA_STALENESS_SECONDS)
+    if wrote_at is not None and time.time() - wrote_at < window:
+        return
+    g.db_replica = _choose_replica(engines)
+
+
+def _replica_url(db, url):
+    if url != "readonly":
+        return url
+    # Local stand-in: the primary SQLite file opened read-only
+    primary = db.engines[None].url
+    if primary.get_backend_name() != "sqlite" or primary.database in (None, "", ":memory:"):
+        raise ValueError("A 'readonly' replica needs a file-based SQLite primary database.")
+    return f"sqlite:///file:{primary.database}?mode=ro&uri=true"
+
+
+def init_routing(app, db):
+    """
+    Creates engines for SQLALCHEMY_REPLICA_URIS and routes requests between them and
+    the primary: GET and HEAD handlers read from a replica unless decorated with
+    @use_primary, other methods use the primary unless decorated with @use_replica.
+    Without replicas every request uses the primary.
+    """
+    from .settings import configure_sqlite  # Avoid circular import
+
+    urls = app.config.get("SQLALCHEMY_REPLICA_URIS") or []
+    if not urls:
+        return
+    options = dict(app.config.get("SQLALCHEMY_ENGINE_OPTIONS", {}))
+    engines = []
+    with app.app_context():
+        for url in urls:
+            engine = create_engine(_replica_url(db, url), **options)
+            if engine.dialect.name == "sqlite" and app.config.get("SQLITE_PROFILE") == "tuned":
+                configure_sqlite(engine, app.config["SQLITE_PRAGMAS"])
+            engines.append(engine)
+    app.extensions["db_replicas"] = engines
+    app.before_request(_route_request)
+
+    @app.after_request
+    def _remember_write(response):
+        if db.session.registry.has() and db.session.info.get(_WROTE_KEY):
+            cookie_session[_WROTE_AT_KEY] = time.time()
+        return response
@@ -0,0 +1,67 @@
+from functools import cached_property
+from threading import Lock
+
+from flask import Blueprint
+from werkzeug.utils import import_string
+
+
+class LazyView:
+    """A view function imported on its first call (Flask's "lazily loading views" pattern)."""
+
+    def __init__(self, import_name):
+        self.import_name = import_name
+        self.__module__, self.__name__ = import_name.rsplit(".", 1)
+
+    @cached_property
+    def view(self):
+        return import_string(self.import_name)
+
+    @property
+    def db_route(self):
+        # Route decorator setting (see db_routing), read before the view runs
+        return getattr(self.view, "db_route", None)
+
+    def __call__(self, *args, **kwargs):
+        return self.view(*args, **kwargs)
+
+
+def lazy_blueprint(name, module, rules):
+    """
+    A blueprint with the URL rules of `module`'s blueprint `name` whose views are imported
+    on first request. `rules` is [(rule, view function name, methods, options)]; keep it in
+    sync with the module's @route decorators (benchmarks/bench_startup.py checks it).
+    """
+    blueprint = Blueprint(name, __name__)
+    for rule, view_name, methods, options in rules:
+        blueprint.add_url_rule(
+            rule, endpoint=view_name, view_func=LazyView(f"{module}.{view_name}"), methods=methods, **options
+        )
+    return blueprint
+
+
+class LazyMount:
+    """
+    WSGI middleware sending requests under `prefix` to a separate WSGI app that `factory`
+    builds on the first such request; everything else goes to `app`. For self-contained
+    pages (e.g. the Swagger UI) that need nothing from the main app.
+    """
+
+    def __init__(self, app, prefix, factory):
+        self.app = app
+        self.prefix = prefix.rstrip("/")
+        self.factory = factory
+        self._mounted = None
+        self._lock = Lock()
+
+    def _mounted_app(self):
+        if self._mounted is None:
+            with self._lock:
+                if self._mounted is None:
+                    self._mounted = self.factory()
+        return self._mounted
+
+    def __call__(self, environ, start_response):
+        path = environ.get("PATH_INFO", "")
+        if path == self.prefix or path.startswith(self.prefix + "/"):
+            return self._mounted_app()(environ, start_response)
+        return self.app(environ, start_response)
@@ -4,5 +4,9 @@ from .role import Role, role_permissions
 from .permission import Permission
 from .category import Category
 from .audit_log import AuditLog
+from .audit_log_partition import AuditLogPartition
+from .audit_lookup import AuditIpAddress, AuditUserAgent
+from .audit_log_stat import AuditLogDailyStat
+from .cache_version import CacheVersion
 
-__all__ = ["AuditLog", "Contact", "User", "Role", "Permission", "Category"]
+__all__ = ["AuditLog", "AuditLogDailyStat", "AuditLogPartition", "AuditIpAddress", "AuditUserAgent", "CacheVersion", "Contact", "User", "Role", "Permission", "Category"]
@@ -1,6 +1,29 @@
 from datetime import datetime, timezone
 from ..config import db  # Assuming db is your SQLAlchemy instance
-import json
+from ..utils.fieldsets import Fieldset
+from ..utils.serializers import compile_row_serializer
+from ..utils.audit_search import ensure_search_index
+from ..utils.audit_payloads import decode_json_value, expand_deltas
+from ..utils.audit_lookups import decode_lookups, upgrade_legacy_columns
+from sqlalchemy import event
+from sqlalchemy.orm import object_session
+from sqlalchemy.schema import CreateIndex
+from functools import lru_cache
+
+
+def format_timestamp(timestamp):
+    """Formats a stored timestamp as ISO 8601 UTC with milliseconds, e.g. "2025-06-03T08:15:59.123Z"."""
+    if timestamp.tzinfo is None:
+        # If naive, assume it's UTC because that's what we store
+        timestamp = timestamp.replace(tzinfo=timezone.utc)
+    else:
+        # If already timezone-aware, convert to UTC explicitly
+        timestamp = timestamp.astimezone(timezone.utc)
+    return timestamp.isoformat(timespec='milliseconds').replace('+00:00', 'Z')
+
+
+def _user_details(user_id, username):
+    return {'id': user_id, 'username': username}
 
 
 class AuditLog(db.Model):
@@ -14,53 +37,134 @@ class AuditLog(db.Model):
     entity_type = db.Column(db.String(100), nullable=False)  # e.g., 'Category', 'Permission', 'Role'
     entity_id = db.Column(db.Integer, nullable=True)  # ID of the record being audited
     field_name = db.Column(db.String(100), nullable=True)  # The specific field changed (for UPDATEs)
-    old_value = db.Column(db.Text, nullable=True)  # Stored as JSON string
-    new_value = db.Column(db.Text, nullable=True)  # Stored as JSON string
+    old_value = db.Column(db.Text, nullable=True)  # Stored as JSON string, optionally compressed (see utils.audit_payloads)
+    new_value = db.Column(db.Text, nullable=True)  # Stored as JSON string, or a delta for collection changes
     description = db.Column(db.Text, nullable=True)  # Human-readable description
-    ip_address = db.Column(db.String(45), nullable=True)  # IPv4 or IPv6
-    user_agent = db.Column(db.Text, nullable=True)
+    # Client IP and User-Agent are interned in lookup tables (see utils.audit_lookups)
+    ip_address_id = db.Column(db.Integer, db.ForeignKey('audit_ip_addresses.id'), nullable=True)
+    user_agent_id = db.Column(db.Integer, db.ForeignKey('audit_user_agents.id'), nullable=True)
 
     # Relationship to User model for easier access to user details
     user = db.relationship('User', backref='audit_logs', lazy=True)
 
+    # One index per filter/sort of the audit log list (see tests/test_audit_indexes.py).
+    # Single-column indexes end in the row id, so they also serve the "<column>, id" sort orders.
+    __table_args__ = (
+        db.Index("ix_audit_logs_timestamp", "timestamp"),
+        db.Index("ix_audit_logs_entity_timestamp", "entity_type", "entity_id", "timestamp"),
+        db.Index("ix_audit_logs_entity_type", "entity_type"),
+        db.Index("ix_audit_logs_action_type", "action_type"),
+        db.Index("ix_audit_logs_user_id", "user_id"),
+        # Finds the latest row of a delta chain when writing a collection change
+        db.Index("ix_audit_logs_entity_field", "entity_type", "entity_id", "field_name"),
+    )
+
     def __repr__(self):
         return (
             f"<AuditLog {self.action_type} {self.entity_type}:{self.entity_id} "
             f"by User:{self.user_id} at {self.timestamp}>"
         )
 
-    def to_json(self):
+    # Sparse fieldsets: JSON key -> column attribute, and optional expansions -> keys they add
+    JSON_COLUMNS = {
+        "id": "id",
+        "user_id": "user_id",
+        "timestamp": "timestamp",
+        "action_type": "action_type",
+        "entity_type": "entity_type",
+        "entity_id": "entity_id",
+        "field_name": "field_name",
+        "old_value": "old_value",
+        "new_value": "new_value",
+        "description": "description",
+        "ip_address": "ip_address_id",  # Lookup ids until decode_rows
+        "user_agent": "user_agent_id",
+    }
+    JSON_INCLUDES = {"user": ("user_details",)}
+    DEFAULT_INCLUDE = ("user",)
+
+    @staticmethod
+    def row_serializer(fieldset=None, source=None):
+        """
+        Returns a compiled serializer producing the same dicts as `to_json` straight from
+        result rows. The query must join `User` when the 'user' include is requested.
+        Pass the serialized page to `decode_rows` for IP addresses, user agents and
+        delta-encoded collection changes.
+
+        Args:
+            source: The entity the rows are selected from; AuditLog (default) or an
+                    alias over the hot table and its partitions (see utils.audit_partitions).
+        """
+        if fieldset is None:
+            fieldset = Fieldset(include=AuditLog.DEFAULT_INCLUDE)
+        return _compile_row_serializer(fieldset.fields, fieldset.include, source or AuditLog)
+
+    @staticmethod
+    def decode_rows(items, session=None):
+        """
+        Finishes serialized audit logs in place, a page at a time: resolves interned IP
+        addresses and user agents and rebuilds delta-encoded collection changes.
+        Queries run on `session` (default: db.session).
+        """
+        return expand_deltas(decode_lookups(items, session), session)
+
+    def to_json(self, fieldset=None):
         """Converts the AuditLog object to a JSON-serializable dictionary."""
-        utc_aware_timestamp = self.timestamp
-        if utc_aware_timestamp.tzinfo is None:
-            # If naive, assume it's UTC because that's what we store
-            utc_aware_timestamp = utc_aware_timestamp.replace(tzinfo=timezone.utc)
-        else:
-            # If already timezone-aware, convert to UTC explicitly
-            utc_aware_timestamp = utc_aware_timestamp.astimezone(timezone.utc)
-
-        # Format to ISO 8601 string, with milliseconds and 'Z' for UTC
-        # Example: "2025-06-03T08:15:59.123Z"
-        timestamp_iso_utc = utc_aware_timestamp.isoformat(timespec='milliseconds').replace('+00:00', 'Z')
-
-        data = {
-            "id": self.id,
-            "user_id": self.user_id,
-            "timestamp": timestamp_iso_utc,
-            "action_type": self.action_type,
-            "entity_type": self.entity_type,
-            "entity_id": self.entity_id,
-            "field_name": self.field_name,
-            "old_value": json.loads(self.old_value) if self.old_value else None,
-            "new_value": json.loads(self.new_value) if self.new_value else None,
-            "description": self.description,
-            "ip_address": self.ip_address,
-            "user_agent": self.user_agent
-        }
-        if self.user:
+        if fieldset is None:
+            fieldset = Fieldset(include=AuditLog.DEFAULT_INCLUDE)
+
+        data = fieldset.columns(self, AuditLog.JSON_COLUMNS)
+
+        if "timestamp" in data:
+            data["timestamp"] = format_timestamp(self.timestamp)
+        if "old_value" in data:
+            data["old_value"] = decode_json_value(self.old_value)
+        if "new_value" in data:
+            data["new_value"] = decode_json_value(self.new_value)
+
+        AuditLog.decode_rows([data], object_session(self))
+
+        if fieldset.includes("user") and self.user:
             # IMPORTANT: Adjust this based on what 'User' attribute you want to display
             data['user_details'] = {
                 'id': self.user.id,
                 'username': getattr(self.user, 'username', None) or getattr(self.user, 'email', 'Unknown')
             }
         return data
+
+
+# Transforms applied to the raw column values by the compiled serializer
+_ROW_TRANSFORMS = {
+    "timestamp": format_timestamp,
+    "old_value": decode_json_value,
+    "new_value": decode_json_value,
+}
+
+
+@lru_cache(maxsize=64)
+def _compile_row_serializer(fields, include, source):
+    """One compiled function per response shape (fields, include) and source entity."""
+    from .user import User  # Avoid circular import
+
+    shape = []
+    for key, attr in AuditLog.JSON_COLUMNS.items():
+        if fields is None or key in fields:
+            shape.append((key, getattr(source, attr), _ROW_TRANSFORMS.get(key)))
+    if "user" in include:
+        # The query inner-joins User, so every row has user details
+        shape.append(("user_details", (User.id, User.username), _user_details))
+    return compile_row_serializer(shape, name="serialize_audit_log")
+
+
+@event.listens_for(db.metadata, "after_create")
+def _create_indexes(target, connection, **kw):
+    # create_all only indexes new tables; this adds indexes introduced since to existing ones
+    for index in AuditLog.__table__.indexes:
+        connection.execute(CreateIndex(index, if_not_exists=True))
+
+
+@event.listens_for(db.metadata, "after_create")
+def _create_search_index(target, connection, **kw):
+    # The FTS5 search index and its sync triggers live next to the tables (SQLite only)
+    ensure_search_index(connection)
+    upgrade_legacy_columns(connection)
@@ -0,0 +1,21 @@
+from ..config import db
+
+
+class AuditLogPartition(db.Model):
+    """
+    Catalog of sealed monthly audit log partitions.
+
+    Months older than the hot window are moved out of `audit_logs` into their own
+    table (`name`, e.g. 'audit_logs_2025_01'); once past the retention window the
+    table is dumped to a compressed archive file and dropped (`archive_path` set).
+    """
+    __tablename__ = "audit_log_partitions"
+
+    name = db.Column(db.String(50), primary_key=True)
+    period_start = db.Column(db.DateTime, nullable=False)  # Inclusive, UTC
+    period_end = db.Column(db.DateTime, nullable=False)  # Exclusive, UTC
+    row_count = db.Column(db.Integer, nullable=False, default=0)
+    archive_path = db.Column(db.String(255), nullable=True)  # Archived partitions are not queryable
+
+    def __repr__(self):
+        return f"<AuditLogPartition {self.name} rows={self.row_count}{' archived' if self.archive_path else ''}>"
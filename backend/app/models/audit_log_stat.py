@@ -0,0 +1,18 @@
+from ..config import db
+
+
+class AuditLogDailyStat(db.Model):
+    """
+    Daily rollup of audit events: how many events of one action and entity type a user
+    caused on one (UTC) day. Maintained as audit rows are written (see utils.audit_rollups).
+    """
+    __tablename__ = "audit_log_daily_stats"
+
+    day = db.Column(db.Date, primary_key=True)
+    action_type = db.Column(db.String(50), primary_key=True)
+    entity_type = db.Column(db.String(100), primary_key=True)
+    user_id = db.Column(db.Integer, primary_key=True, autoincrement=False)  # 0 for events without a user
+    count = db.Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"<AuditLogDailyStat {self.day} {self.action_type} {self.entity_type} user:{self.user_id} = {self.count}>"
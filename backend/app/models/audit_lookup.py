@@ -0,0 +1,23 @@
+from ..config import db
+
+
+class AuditIpAddress(db.Model):
+    """Distinct client IP addresses seen in audit logs, referenced by id (see utils.audit_lookups)."""
+    __tablename__ = "audit_ip_addresses"
+
+    id = db.Column(db.Integer, primary_key=True)
+    value = db.Column(db.String(45), unique=True, nullable=False)  # IPv4 or IPv6
+
+    def __repr__(self):
+        return f"<AuditIpAddress {self.value}>"
+
+
+class AuditUserAgent(db.Model):
+    """Distinct User-Agent headers seen in audit logs, referenced by id (see utils.audit_lookups)."""
+    __tablename__ = "audit_user_agents"
+
+    id = db.Column(db.Integer, primary_key=True)
+    value = db.Column(db.Text, unique=True, nullable=False)
+
+    def __repr__(self):
+        return f"<AuditUserAgent {self.value[:40]}>"
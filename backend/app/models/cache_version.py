@@ -0,0 +1,18 @@
+from ..config import db
+
+
+class CacheVersion(db.Model):
+    """
+    Persisted version counters for data that workers cache in-process.
+
+    Write paths bump the counter of a scope (e.g. 'rbac') in the same
+    transaction as the change; every worker compares it with the version its
+    local caches were built from.
+    """
+    __tablename__ = "cache_versions"
+
+    scope = db.Column(db.String(50), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"<CacheVersion {self.scope}={self.version}>"
@@ -1,4 +1,6 @@
 from ..config import db
+from ..utils.fieldsets import Fieldset
+from ..utils.text_search import register_search_index
 
 class Category(db.Model):
     __tablename__ = "categories"
@@ -20,31 +22,79 @@ class Category(db.Model):
         # (modify delete logic to handle this)
     )
 
-    def to_json(self, include_usage=False, include_affected_permissions=False):
+    # Sparse fieldsets: JSON key -> column attribute, and optional expansions -> keys they add
+    JSON_COLUMNS = {"id": "id", "name": "name", "description": "description", "status": "status"}
+    JSON_INCLUDES = {"usage": ("usage",), "affected_permissions": ("usage", "affected_permissions")}
+
+    # Change capture: audit rows are written at flush time (see utils.change_capture)
+    AUDIT_ENTITY = "Category"
+    AUDIT_FIELDS = ("name", "description", "status")
+
+    @staticmethod
+    def serialization_options(fieldset=None):
+        """Loader options for the columns `to_json` reads."""
+        return fieldset.load_options(Category, Category.JSON_COLUMNS) if fieldset is not None else ()
+
+    @staticmethod
+    def load_affected_permissions(category_ids):
+        """
+        Fetches the permissions of many categories in one query, for `to_json(include_usage=True)`.
+        Returns a dict of category id -> list of {"id", "name", "status"} permission dicts.
+        """
+        from .permission import Permission  # Avoid circular import
+        affected_permissions = {category_id: [] for category_id in category_ids}
+        if not affected_permissions:
+            return affected_permissions
+        rows = db.session.execute(
+            db.select(Permission.category_id, Permission.id, Permission.name, Permission.status)
+            .where(Permission.category_id.in_(affected_permissions.keys()))
+            .order_by(Permission.id)
+        )
+        for category_id, perm_id, perm_name, perm_status in rows:
+            affected_permissions[category_id].append({"id": perm_id, "name": perm_name, "status": perm_status})
+        return affected_permissions
+
+    def to_json(self, include_usage=False, include_affected_permissions=False, affected_permissions=None,
+                fieldset=None):
         """
         Converts the Category object to a JSON-serializable dictionary.
         Args:
             include_usage (bool): If True, includes 'usage' (count of affected permissions).
             include_affected_permissions (bool): If True, includes 'affected_permissions'
                                                  (list of permission dicts).
+            affected_permissions (list, optional): Permissions preloaded with
+                                                   `load_affected_permissions`; queried when omitted.
+            fieldset (Fieldset, optional): Sparse fieldset; overrides the include_* flags.
         """
-        data = {
-            "id": self.id,
-            "name": self.name,
-            "description": self.description,
-            "status": self.status
-        }
+        if fieldset is not None:
+            include_usage = fieldset.includes("usage") and fieldset.wants("usage")
+            include_affected_permissions = (
+                fieldset.includes("affected_permissions") and fieldset.wants("affected_permissions")
+            )
+        else:
+            fieldset = Fieldset()
 
-        if include_usage or include_affected_permissions:
-            # Efficiently count associated permissions
-            data["usage"] = self.permissions.count()
+        data = fieldset.columns(self, Category.JSON_COLUMNS)
 
-            if include_affected_permissions:
-                data["affected_permissions"] = [
+        if include_usage or include_affected_permissions:
+            if affected_permissions is None:
+                if not include_affected_permissions:
+                    # Efficiently count associated permissions
+                    data["usage"] = self.permissions.count()
+                    return data
+                affected_permissions = [
                     {"id": perm.id, "name": perm.name, "status": perm.status}
                     for perm in self.permissions.all()
                 ]
+            data["usage"] = len(affected_permissions)
+
+            if include_affected_permissions:
+                data["affected_permissions"] = affected_permissions
         return data
 
     def __repr__(self):
-        return f"<Category {self.name}>"
\ No newline at end of file
+        return f"<Category {self.name}>"
+
+
+# Index-backed case-insensitive prefix/substring search (see utils.text_search)
+register_search_index(Category.__table__, "name")
@@ -1,4 +1,5 @@
 from ..config import db
+from ..utils.fieldsets import Fieldset
 
 class Contact(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -13,14 +14,22 @@ class Contact(db.Model):
     # so you don't typically need db.relationship('User', backref='contacts') here
     # if it's already in the User model.
 
-    def to_json(self):
-        return {
-            "id": self.id,
-            "firstName": self.first_name,
-            "lastName": self.last_name,
-            "email": self.email,
-            "user_id": self.user_id
-        }
+    # Sparse fieldsets: JSON key -> column attribute
+    JSON_COLUMNS = {
+        "id": "id",
+        "firstName": "first_name",
+        "lastName": "last_name",
+        "email": "email",
+        "user_id": "user_id",
+    }
+
+    @staticmethod
+    def serialization_options(fieldset=None):
+        """Loader options for the columns `to_json` reads."""
+        return fieldset.load_options(Contact, Contact.JSON_COLUMNS) if fieldset is not None else ()
+
+    def to_json(self, fieldset=None):
+        return (fieldset or Fieldset()).columns(self, Contact.JSON_COLUMNS)
 
     def __repr__(self):
         return f"<Contact {self.first_name} {self.last_name} (Owner: {self.user_id})>"
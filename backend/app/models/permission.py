@@ -1,4 +1,7 @@
 from ..config import db
+from sqlalchemy.orm import joinedload
+from ..utils.fieldsets import Fieldset
+from ..utils.text_search import register_search_index
 
 class Permission(db.Model):
     __tablename__ = "permissions"
@@ -20,44 +23,100 @@ class Permission(db.Model):
     # Existing backref for roles (assuming it's defined in Role model)
     # roles = db.relationship('Role', secondary=role_permission_table, back_populates='permissions')
 
-    def to_json(self, include_usage=False, include_category_details=False):
+    # Sparse fieldsets: JSON key -> column attribute, and optional expansions -> keys they add
+    JSON_COLUMNS = {
+        "id": "id",
+        "name": "name",
+        "description": "description",
+        "category_id": "category_id",
+        "status": "status",
+    }
+    JSON_INCLUDES = {"category": ("category",), "usage": ("usage", "affected_roles")}
+
+    # Change capture: audit rows are written at flush time (see utils.change_capture)
+    AUDIT_ENTITY = "Permission"
+    AUDIT_FIELDS = ("name", "description", "category_id", "status")
+    AUDIT_REFERENCES = {"category_id": "Category"}  # Logged as "from '<old category>' to '<new category>'"
+
+    @staticmethod
+    def serialization_options(fieldset=None):
+        """Loader options for the columns and relationships `to_json` reads (the category is joined in)."""
+        if fieldset is None:
+            return (joinedload(Permission.category_obj),)
+        options = list(fieldset.load_options(Permission, Permission.JSON_COLUMNS, required=("category_id",)))
+        if fieldset.includes("category"):
+            options.append(joinedload(Permission.category_obj))
+        return tuple(options)
+
+    @staticmethod
+    def load_affected_roles(permission_ids):
+        """
+        Fetches the roles of many permissions in one query, for `to_json(include_usage=True)`.
+        Returns a dict of permission id -> list of {"id", "name"} role dicts.
+        """
+        from .role import Role, role_permissions  # Avoid circular import
+        affected_roles = {permission_id: [] for permission_id in permission_ids}
+        if not affected_roles:
+            return affected_roles
+        rows = db.session.execute(
+            db.select(role_permissions.c.permission_id, Role.id, Role.name)
+            .join(Role, Role.id == role_permissions.c.role_id)
+            .where(role_permissions.c.permission_id.in_(affected_roles.keys()))
+            .order_by(Role.id)
+        )
+        for permission_id, role_id, role_name in rows:
+            affected_roles[permission_id].append({"id": role_id, "name": role_name})
+        return affected_roles
+
+    def to_json(self, include_usage=False, include_category_details=False, affected_roles=None, fieldset=None):
         """
         Converts the Permission object to a JSON-serializable dictionary.
         Args:
             include_usage (bool): If True, includes 'usage' (count of affected roles)
                                   and 'affected_roles' (list of role dicts).
             include_category_details (bool): If True, includes the associated category's details.
+            affected_roles (list, optional): Roles preloaded with `load_affected_roles`;
+                                             queried per permission when omitted.
+            fieldset (Fieldset, optional): Sparse fieldset; overrides the include_* flags.
         """
-        data = {
-            "id": self.id,
-            "name": self.name,
-            "description": self.description,
-            "category_id": self.category_id,
-            "status": self.status
-        }
-
-        if include_category_details and self.category_obj:  # Use category_obj from the backref
-            data["category"] = {
-                "id": self.category_obj.id,
-                "name": self.category_obj.name,
-                "description": self.category_obj.description
-            }
-        elif self.category_id and not self.category_obj:
-            # Handle case where category_id exists but object couldn't be loaded (e.g., category deleted)
-            data["category"] = {"id": self.category_id, "name": "Category Not Found", "description": None}
-        else:
-            data["category"] = None  # No category associated
+        if fieldset is None:
+            fieldset = Fieldset(include=[
+                name for name, requested in (("category", include_category_details), ("usage", include_usage))
+                if requested
+            ])
+
+        data = fieldset.columns(self, Permission.JSON_COLUMNS)
+
+        if fieldset.wants("category"):
+            if not fieldset.includes("category") or not self.category_id:
+                data["category"] = None  # No category associated, or details not requested
+            elif self.category_obj:  # Use category_obj from the backref
+                data["category"] = {
+                    "id": self.category_obj.id,
+                    "name": self.category_obj.name,
+                    "description": self.category_obj.description
+                }
+            else:
+                # Handle case where category_id exists but object couldn't be loaded (e.g., category deleted)
+                data["category"] = {"id": self.category_id, "name": "Category Not Found", "description": None}
 
         # --- FOR USAGE TRACKING ---
-        if include_usage:
-            # `self.roles` is available due to the backref in the Role model's relationship
-            data["usage"] = self.roles.count()  # Efficiently count associated roles
-            # Fetch and format affected roles if requested
-            data["affected_roles"] = [
-                {"id": role.id, "name": role.name} for role in self.roles.all()
-            ]
+        if fieldset.includes("usage"):
+            if affected_roles is None:
+                # `self.roles` is available due to the backref in the Role model's relationship
+                affected_roles = [
+                    {"id": role.id, "name": role.name} for role in self.roles.all()
+                ]
+            if fieldset.wants("usage"):
+                data["usage"] = len(affected_roles)
+            if fieldset.wants("affected_roles"):
+                data["affected_roles"] = affected_roles
         # --- END NEW ADDITION ---
         return data
 
     def __repr__(self):
         return f"<Permission {self.name}>"
+
+
+# Index-backed case-insensitive prefix/substring search (see utils.text_search)
+register_search_index(Permission.__table__, "name")
@@ -1,5 +1,9 @@
 from ..config import db
+from sqlalchemy.orm import selectinload
 from .permission import Permission
+from ..utils import permission_cache
+from ..utils.fieldsets import Fieldset
+from ..utils.text_search import register_search_index
 
 # Junction table for Role-Permission many-to-many relationship
 role_permissions = db.Table(
@@ -22,22 +26,55 @@ class Role(db.Model):
         backref=db.backref('roles', lazy='dynamic')
     )
 
+    @property
+    def permission_mask(self):
+        """Precomputed bitmask of this role's permissions, as of the last committed RBAC change."""
+        return permission_cache.get_role_mask(self.id)
+
     def has_permission(self, permission_name):
         """Check if this role has a specific permission."""
-        return any(permission.name == permission_name for permission in self.permissions)
+        return bool(self.permission_mask & permission_cache.permission_bit(permission_name))
+
+    # Sparse fieldsets: JSON key -> column attribute, and optional expansions -> keys they add
+    JSON_COLUMNS = {"id": "id", "name": "name", "description": "description"}
+    JSON_INCLUDES = {"permissions": ("permissions",), "permissions.category": ()}
+    DEFAULT_INCLUDE = ("permissions", "permissions.category")
+
+    # Change capture: audit rows are written at flush time (see utils.change_capture)
+    AUDIT_ENTITY = "Role"
+    AUDIT_FIELDS = ("name", "description")
+    AUDIT_COLLECTIONS = ("permissions",)
 
-    def to_json(self, include_permission_category_details=True):
-        current_permissions = self.permissions.all() if hasattr(self.permissions, 'all') else self.permissions
+    @staticmethod
+    def serialization_options(fieldset=None):
+        """Loader options for the columns and relationship graph `to_json` reads (permissions and their categories)."""
+        if fieldset is None:
+            fieldset = Fieldset(include=Role.DEFAULT_INCLUDE)
+        options = list(fieldset.load_options(Role, Role.JSON_COLUMNS))
+        if fieldset.includes("permissions"):
+            options.append(
+                selectinload(Role.permissions).options(
+                    *Permission.serialization_options(fieldset.nested("permissions"))
+                )
+            )
+        return tuple(options)
 
-        return {
-            "id": self.id,
-            "name": self.name,
-            "description": self.description,
-            "permissions": [
-                p.to_json(include_category_details=include_permission_category_details)
-                for p in current_permissions
-            ]
-        }
+    def to_json(self, include_permission_category_details=True, fieldset=None):
+        if fieldset is None:
+            fieldset = Fieldset(
+                include=Role.DEFAULT_INCLUDE if include_permission_category_details else ("permissions",)
+            )
+
+        data = fieldset.columns(self, Role.JSON_COLUMNS)
+        if fieldset.includes("permissions"):
+            current_permissions = self.permissions.all() if hasattr(self.permissions, 'all') else self.permissions
+            permission_fieldset = fieldset.nested("permissions")
+            data["permissions"] = [p.to_json(fieldset=permission_fieldset) for p in current_permissions]
+        return data
 
     def __repr__(self):
         return f"<Role {self.name}>"
+
+
+# Index-backed case-insensitive prefix/substring search (see utils.text_search)
+register_search_index(Role.__table__, "name")
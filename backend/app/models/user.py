@@ -1,7 +1,11 @@
 from ..config import db
+from sqlalchemy.orm import selectinload
 from flask_login import UserMixin
 from werkzeug.security import generate_password_hash, check_password_hash
 from .role import Role
+from ..utils import permission_cache
+from ..utils.fieldsets import Fieldset
+from ..utils.text_search import register_search_index
 
 # Junction table for User-Role many-to-many relationship
 user_roles = db.Table(
@@ -28,31 +32,66 @@ class User(UserMixin, db.Model):
         backref=db.backref('users', lazy='dynamic')
     )
 
+    # Sparse fieldsets: JSON key -> column attribute, and optional expansions -> keys they add
+    JSON_COLUMNS = {"id": "id", "username": "username", "email": "email"}
+    JSON_INCLUDES = {
+        "roles": ("roles",),
+        "roles.permissions": (),
+        "roles.permissions.category": (),
+    }
+    DEFAULT_INCLUDE = ("roles", "roles.permissions", "roles.permissions.category")
+
+    @staticmethod
+    def serialization_options(fieldset=None):
+        """Loader options for the columns and relationship graph `to_json` reads (roles -> permissions -> categories)."""
+        if fieldset is None:
+            fieldset = Fieldset(include=User.DEFAULT_INCLUDE)
+        options = list(fieldset.load_options(User, User.JSON_COLUMNS))
+        if fieldset.includes("roles"):
+            options.append(selectinload(User.roles).options(*Role.serialization_options(fieldset.nested("roles"))))
+        return tuple(options)
+
     def set_password(self, password):
         self.password_hash = generate_password_hash(password)
 
     def check_password(self, password):
         return check_password_hash(self.password_hash, password)
 
+    @property
+    def permission_mask(self):
+        """Bitmask of all permissions granted via the user's roles (OR of the role masks, cached)."""
+        return permission_cache.get_permission_mask(self.id)
+
+    def get_permission_names(self):
+        """Returns the names of all permissions granted via the user's roles (cached)."""
+        return permission_cache.get_permission_names(self.id)
+
     def has_permission(self, permission_name):
         """Check if the user has a specific permission via their roles."""
-        for role in self.roles:
-            if role.has_permission(permission_name):
-                return True
-        return False
+        return bool(self.permission_mask & permission_cache.permission_bit(permission_name))
+
+    def load_user(self, *options):
+        """Mirrors Principal.load_user() so handlers can treat `current_user` uniformly."""
+        return self
 
     def is_admin(self):
         """Helper to quickly check if user has 'Admin' role, if needed."""
         return any(role.name == 'Admin' for role in self.roles)
 
-    def to_json(self):
-        return {
-            "id": self.id,
-            "username": self.username,
-            "email": self.email,
-            "roles": [role.to_json() for role in self.roles]
-            # Do NOT include password_hash in JSON responses
-        }
+    def to_json(self, fieldset=None):
+        if fieldset is None:
+            fieldset = Fieldset(include=User.DEFAULT_INCLUDE)
+
+        # Do NOT include password_hash in JSON responses
+        data = fieldset.columns(self, User.JSON_COLUMNS)
+        if fieldset.includes("roles"):
+            role_fieldset = fieldset.nested("roles")
+            data["roles"] = [role.to_json(fieldset=role_fieldset) for role in self.roles]
+        return data
 
     def __repr__(self):
         return f"<User {self.username}>"
+
+
+# Index-backed case-insensitive prefix/substring search (see utils.text_search)
+register_search_index(User.__table__, "username", "email")
@@ -0,0 +1,149 @@
+import os
+
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+
+DEFAULT_DATABASE_URL = "sqlite:///databaselocal.db"  # Relative to the instance folder
+
+SQLITE_PROFILES = ("tuned", "default")
+
+# PRAGMAs the 'tuned' SQLite profile runs on every new connection (values overridable, see below)
+DEFAULT_SQLITE_BUSY_TIMEOUT_MS = 5000
+DEFAULT_SQLITE_CACHE_SIZE_KB = 64 * 1024
+DEFAULT_SQLITE_MMAP_SIZE = 256 * 1024 * 1024
+
+DEFAULT_POOL_RECYCLE = 1800  # seconds; below typical server/proxy idle timeouts
+
+
+def _env_int(environ, name, default=None):
+    value = environ.get(name)
+    if value in (None, ""):
+        return default
+    try:
+        return int(value)
+    except ValueError:
+        raise ValueError(f"Environment variable {name} must be an integer, got '{value}'.")
+
+
+def _env_bool(environ, name, default):
+    value = environ.get(name)
+    if value in (None, ""):
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+def database_config(environ=None):
+    """
+    The database settings for app.config, read from the environment:
+
+    DATABASE_URL              SQLAlchemy URL (default: SQLite file in the instance folder)
+    DB_POOL_SIZE              connections kept open per process
+    DB_MAX_OVERFLOW           extra connections allowed under load
+    DB_POOL_TIMEOUT           seconds to wait for a free connection
+    DB_POOL_RECYCLE           seconds before a connection is replaced (server databases, default 1800)
+    DB_POOL_PRE_PING          check connections before use (server databases, default on)
+    DB_STATEMENT_TIMEOUT_MS   per-statement time limit (PostgreSQL, MySQL)
+    SQLITE_PROFILE            'tuned' (default) or 'default' (no PRAGMAs)
+    SQLITE_BUSY_TIMEOUT_MS, SQLITE_CACHE_SIZE_KB, SQLITE_MMAP_SIZE   tuned profile values
+    DATABASE_REPLICA_URLS     comma-separated read replica URLs; 'readonly' opens the SQLite
+                              primary file read-only (see db_routing.py)
+    DB_REPLICA_STALENESS_SECONDS   a client reads the primary this long after its last write (default 5)
+    DB_REPLICA_MAX_LAG_SECONDS     replicas further behind are not used (default 10)
+
+    Unset pool settings keep SQLAlchemy's defaults.
+
+    Raises:
+        ValueError: For malformed values.
+    """
+    environ = os.environ if environ is None else environ
+    database_url = environ.get("DATABASE_URL") or DEFAULT_DATABASE_URL
+    if database_url.startswith("postgres://"):
+        # Heroku-style URLs; SQLAlchemy only knows the 'postgresql' name
+        database_url = "postgresql://" + database_url[len("postgres://"):]
+    url = make_url(database_url)
+    backend = url.get_backend_name()
+    in_memory = backend == "sqlite" and url.database in (None, "", ":memory:")
+
+    engine_options = {}
+    # In-memory SQLite uses a single shared connection; pool sizing does not apply
+    if not in_memory:
+        for option, name in (
+            ("pool_size", "DB_POOL_SIZE"),
+            ("max_overflow", "DB_MAX_OVERFLOW"),
+            ("pool_timeout", "DB_POOL_TIMEOUT"),
+        ):
+            value = _env_int(environ, name)
+            if value is not None:
+                engine_options[option] = value
+    if backend != "sqlite":
+        engine_options["pool_recycle"] = _env_int(environ, "DB_POOL_RECYCLE", DEFAULT_POOL_RECYCLE)
+        engine_options["pool_pre_ping"] = _env_bool(environ, "DB_POOL_PRE_PING", True)
+    else:
+        engine_options["pool_pre_ping"] = _env_bool(environ, "DB_POOL_PRE_PING", False)
+
+    statement_timeout = _env_int(environ, "DB_STATEMENT_TIMEOUT_MS")
+    if statement_timeout:
+        if backend == "postgresql":
+            engine_options["connect_args"] = {"options": f"-c statement_timeout={statement_timeout}"}
+        elif backend == "mysql":
+            engine_options["connect_args"] = {"init_command": f"SET SESSION max_execution_time={statement_timeout}"}
+
+    sqlite_profile = environ.get("SQLITE_PROFILE", "tuned").lower()
+    if sqlite_profile not in SQLITE_PROFILES:
+        raise ValueError(f"Invalid SQLITE_PROFILE '{sqlite_profile}'. Use one of: {', '.join(SQLITE_PROFILES)}.")
+
+    replica_urls = [u.strip() for u in environ.get("DATABASE_REPLICA_URLS", "").split(",") if u.strip()]
+
+    config = {
+        "SQLALCHEMY_DATABASE_URI": url.render_as_string(hide_password=False),
+        "SQLALCHEMY_ENGINE_OPTIONS": engine_options,
+        "SQLALCHEMY_REPLICA_URIS": replica_urls,
+        "SQLITE_PROFILE": sqlite_profile,
+        "SQLITE_PRAGMAS": {
+            "busy_timeout": _env_int(environ, "SQLITE_BUSY_TIMEOUT_MS", DEFAULT_SQLITE_BUSY_TIMEOUT_MS),
+            # Negative cache_size is in KiB rather than pages
+            "cache_size": -_env_int(environ, "SQLITE_CACHE_SIZE_KB", DEFAULT_SQLITE_CACHE_SIZE_KB),
+            "mmap_size": _env_int(environ, "SQLITE_MMAP_SIZE", DEFAULT_SQLITE_MMAP_SIZE),
+        },
+    }
+    for key in ("DB_REPLICA_STALENESS_SECONDS", "DB_REPLICA_MAX_LAG_SECONDS"):
+        value = _env_int(environ, key)
+        if value is not None:
+            config[key] = value
+    return config
+
+
+def configure_sqlite(engine, pragmas):
+    """
+    Applies the tuned SQLite profile to every new connection of `engine`:
+    WAL journaling (readers and the writer no longer block each other),
+    synchronous=NORMAL (durable at checkpoints, no fsync per commit in WAL),
+    a busy timeout instead of immediate 'database is locked' errors, and
+    larger page cache and memory-mapped I/O.
+    """
+    in_memory = engine.url.database in (None, "", ":memory:")
+    read_only = engine.url.query.get("mode") == "ro"
+
+    @event.listens_for(engine, "connect")
+    def _set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            if not in_memory and not read_only:
+                # Persistent in the database file (read-only connections follow the writer's mode);
+                # WAL is not available for in-memory databases
+                cursor.execute("PRAGMA journal_mode=WAL")
+            cursor.execute("PRAGMA synchronous=NORMAL")
+            for name, value in pragmas.items():
+                cursor.execute(f"PRAGMA {name}={int(value)}")
+        finally:
+            cursor.close()
+
+
+def configure_engines(app, db):
+    """Engine-level settings that cannot be expressed as create_engine() options."""
+    if app.config.get("SQLITE_PROFILE") != "tuned":
+        return
+    with app.app_context():
+        engine = db.engine
+        if engine.dialect.name == "sqlite":
+            configure_sqlite(engine, app.config["SQLITE_PRAGMAS"])
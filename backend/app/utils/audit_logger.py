@@ -1,11 +1,12 @@
-from flask import request, current_app # Import current_app for proper logging
+from flask import has_request_context, request
 from flask_login import current_user
-from ..config import db
-from ..models import AuditLog # Relative import to the AuditLog model
+from .audit_sink import get_audit_sink
+from .audit_payloads import encode_json_value
 
+from datetime import datetime, timezone
 import json
 
-def log_audit_event(
+def build_audit_row(
     action_type: str,
     entity_type: str,
     entity_id: int = None,
@@ -15,7 +16,8 @@ def log_audit_event(
     description: str = None
 ):
     """
-    Logs an audit event to the database.
+    Builds the audit_logs row for an event: the acting user, IP address and user agent
+    of the current request, JSON-encoded values and a default description.
 
     Args:
         action_type (str): Type of action (e.g., 'CREATE', 'UPDATE', 'DELETE', 'LOGIN').
@@ -26,14 +28,15 @@ def log_audit_event(
         new_value (any, optional): The value of the field/entity after the change. Defaults to None.
         description (str, optional): A human-readable description of the event. Defaults to None.
     """
-    user_id = current_user.id if current_user.is_authenticated else None
-    # Use request context safely
-    ip_address = request.remote_addr if request else 'N/A'
-    user_agent = request.headers.get('User-Agent') if request else 'N/A'
+    # Use request context safely (events can also come from the CLI or seed scripts)
+    in_request = has_request_context()
+    user_id = current_user.id if in_request and current_user.is_authenticated else None
+    ip_address = request.remote_addr if in_request else 'N/A'
+    user_agent = request.headers.get('User-Agent') if in_request else 'N/A'
 
-    # Convert old_value/new_value to JSON strings
-    old_value_str = json.dumps(old_value, default=str) if old_value is not None else None # default=str handles datetimes
-    new_value_str = json.dumps(new_value, default=str) if new_value is not None else None # default=str handles datetimes
+    # Convert old_value/new_value to JSON strings (compressed when AUDIT_COMPRESS_PAYLOADS is on)
+    old_value_str = encode_json_value(old_value)
+    new_value_str = encode_json_value(new_value)
 
     # Construct a default description if not provided
     if not description:
@@ -42,10 +45,10 @@ def log_audit_event(
         elif action_type == 'UPDATE':
             if field_name:
                 # Attempt to get readable old/new values, handling JSON strings
-                old_display = json.loads(old_value_str) if old_value_str else 'N/A'
-                new_display = json.loads(new_value_str) if new_value_str else 'N/A'
-                if isinstance(old_display, dict): old_display = json.dumps(old_display)
-                if isinstance(new_display, dict): new_display = json.dumps(new_display)
+                old_display = old_value if old_value is not None else 'N/A'
+                new_display = new_value if new_value is not None else 'N/A'
+                if isinstance(old_display, dict): old_display = json.dumps(old_display, default=str)
+                if isinstance(new_display, dict): new_display = json.dumps(new_display, default=str)
 
                 description = (
                     f"Updated {entity_type} (ID: {entity_id}) - "
@@ -58,8 +61,10 @@ def log_audit_event(
         else:
             description = f"{action_type} action on {entity_type}"
 
-    audit_log_entry = AuditLog(
+    # Captured now: the row may be written after this request is gone
+    return dict(
         user_id=user_id,
+        timestamp=datetime.now(timezone.utc),
         action_type=action_type,
         entity_type=entity_type,
         entity_id=entity_id,
@@ -71,10 +76,17 @@ def log_audit_event(
         user_agent=user_agent
     )
 
-    try:
-        db.session.add(audit_log_entry)
-        db.session.commit()
-    except Exception as e:
-        db.session.rollback()
-        # Use Flask's app.logger for consistent logging within your application
-        current_app.logger.error(f"Error logging audit event: {e}", exc_info=True)
\ No newline at end of file
+
+def log_audit_event(action_type, entity_type, entity_id=None, field_name=None,
+                    old_value=None, new_value=None, description=None):
+    """
+    Logs an audit event to the database (see `build_audit_row` for the arguments).
+
+    The event is queued and written in bulk by the app's audit sink, outside the
+    caller's session and transaction. Changes to Role, Permission and Category are
+    captured automatically at flush time (see change_capture) and need no call here.
+    """
+    # Bulk-inserted in the background (or synchronously, see AuditSink); errors are logged by the sink
+    get_audit_sink().submit(
+        build_audit_row(action_type, entity_type, entity_id, field_name, old_value, new_value, description)
+    )
@@ -0,0 +1,177 @@
+from collections import OrderedDict
+from threading import Lock
+
+from sqlalchemy import inspect, insert, select, text
+
+from ..config import db
+from .audit_rollups import record_rollups
+
+CACHE_SIZE = 4096  # Entries per mapping and kind; user agents and IPs repeat heavily
+
+# Audit row key -> (lookup model name, audit_logs id column)
+LOOKUP_COLUMNS = {
+    "ip_address": ("AuditIpAddress", "ip_address_id"),
+    "user_agent": ("AuditUserAgent", "user_agent_id"),
+}
+
+
+class _LRU:
+    """A small thread-safe LRU mapping."""
+
+    def __init__(self, size):
+        self._size = size
+        self._data = OrderedDict()
+        self._lock = Lock()
+
+    def get(self, key):
+        with self._lock:
+            value = self._data.get(key)
+            if value is not None:
+                self._data.move_to_end(key)
+            return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            if len(self._data) > self._size:
+                self._data.popitem(last=False)
+
+
+# Per kind: value -> id (write path) and id -> value (read path). Lookup rows are never
+# updated or deleted, so entries only go stale if the lookup tables are recreated.
+_ids = {key: _LRU(CACHE_SIZE) for key in LOOKUP_COLUMNS}
+_values = {key: _LRU(CACHE_SIZE) for key in LOOKUP_COLUMNS}
+
+
+def _model(key):
+    return db.Model.registry._class_registry[LOOKUP_COLUMNS[key][0]]
+
+
+def _intern(connection, key, values):
+    """Ids for `values`, inserting the missing ones in the connection's transaction."""
+    table = _model(key).__table__
+    dialect = connection.dialect.name
+    if dialect in ("sqlite", "postgresql"):
+        if dialect == "sqlite":
+            from sqlalchemy.dialects.sqlite import insert as dialect_insert
+        else:
+            from sqlalchemy.dialects.postgresql import insert as dialect_insert
+        # Concurrent writers may intern the same value; the unique constraint keeps one
+        connection.execute(dialect_insert(table).on_conflict_do_nothing(), [{"value": v} for v in values])
+    else:
+        existing = set(connection.execute(select(table.c.value).where(table.c.value.in_(values))).scalars())
+        missing = [{"value": v} for v in values if v not in existing]
+        if missing:
+            connection.execute(insert(table), missing)
+    return dict(connection.execute(select(table.c.value, table.c.id).where(table.c.value.in_(values))).all())
+
+
+def encode_rows(connection, rows):
+    """
+    Replaces the ip_address/user_agent strings of audit rows (as built by build_audit_row)
+    with lookup ids, in place, interning unseen values in the connection's transaction.
+
+    Returns the newly learned {(key, value): id} mappings; pass them to `remember` once
+    the transaction has committed, so a rolled back id is never cached.
+    """
+    learned = {}
+    for key, (_, id_column) in LOOKUP_COLUMNS.items():
+        ids = {}
+        for row in rows:
+            value = row.get(key)
+            if value is not None and value not in ids:
+                ids[value] = _ids[key].get(value)
+        missing = {value for value, id_ in ids.items() if id_ is None}
+        if missing:
+            interned = _intern(connection, key, missing)
+            ids.update(interned)
+            learned.update(((key, value), id_) for value, id_ in interned.items())
+        for row in rows:
+            value = row.pop(key, None)
+            row[id_column] = None if value is None else ids[value]
+    return learned
+
+
+def remember(learned):
+    """Caches mappings returned by `encode_rows` after their transaction committed."""
+    for (key, value), id_ in learned.items():
+        _ids[key].put(value, id_)
+        _values[key].put(id_, value)
+
+
+def insert_audit_rows(connection, rows):
+    """
+    Inserts audit rows (as built by build_audit_row) and counts them in the daily rollups.
+    Returns the mappings to `remember` after commit.
+    """
+    from ..models import AuditLog  # Avoid circular import
+
+    learned = encode_rows(connection, rows)
+    connection.execute(insert(AuditLog.__table__), rows)
+    record_rollups(connection, rows)
+    return learned
+
+
+def decode_lookups(items, session=None):
+    """
+    Replaces ip_address/user_agent lookup ids in serialized audit logs (in place) with
+    their values, from the cache or with one query per kind for the ids it misses.
+    """
+    session = session or db.session
+    for key in LOOKUP_COLUMNS:
+        # Already decoded values (strings) are left alone
+        ids = {item[key] for item in items if isinstance(item.get(key), int)}
+        if not ids:
+            continue
+        values = {}
+        for id_ in ids:
+            value = _values[key].get(id_)
+            if value is not None:
+                values[id_] = value
+        missing = ids - values.keys()
+        if missing:
+            table = _model(key).__table__
+            for id_, value in session.execute(select(table.c.id, table.c.value).where(table.c.id.in_(missing))):
+                _values[key].put(id_, value)
+                values[id_] = value
+        for item in items:
+            if isinstance(item.get(key), int):
+                item[key] = values.get(item[key])
+    return items
+
+
+def _upgrade_legacy_table(connection, name):
+    columns = {column["name"] for column in inspect(connection).get_columns(name)}
+    if "ip_address" not in columns or "ip_address_id" in columns:
+        return
+    for key, (_, id_column) in LOOKUP_COLUMNS.items():
+        lookup = _model(key).__tablename__
+        connection.execute(text(f"ALTER TABLE {name} ADD COLUMN {id_column} INTEGER REFERENCES {lookup} (id)"))
+        connection.execute(text(
+            f"INSERT OR IGNORE INTO {lookup} (value) SELECT DISTINCT {key} FROM {name} WHERE {key} IS NOT NULL"
+        ))
+        connection.execute(text(
+            f"UPDATE {name} SET {id_column} = (SELECT id FROM {lookup} WHERE value = {name}.{key})"
+        ))
+        connection.execute(text(f"ALTER TABLE {name} DROP COLUMN {key}"))
+
+
+def upgrade_legacy_columns(connection):
+    """
+    Moves audit log tables created before the lookup tables existed (SQLite), audit_logs
+    and its sealed partitions, from the inline ip_address/user_agent columns to lookup ids.
+    """
+    from ..models import AuditLogPartition  # Avoid circular import
+
+    if connection.dialect.name != "sqlite":
+        return
+    names = ["audit_logs"]
+    inspector = inspect(connection)
+    if inspector.has_table(AuditLogPartition.__tablename__):
+        names.extend(connection.execute(
+            select(AuditLogPartition.name).where(AuditLogPartition.archive_path.is_(None))
+        ).scalars())
+    for name in names:
+        if inspector.has_table(name):
+            _upgrade_legacy_table(connection, name)
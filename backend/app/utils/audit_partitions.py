@@ -0,0 +1,281 @@
+import gzip
+import json
+import os
+from datetime import datetime, timezone
+from functools import lru_cache
+
+from flask import current_app
+from sqlalchemy import Column, Index, MetaData, Table, and_, delete, func, insert, select, union_all
+from sqlalchemy.orm import aliased
+
+from ..config import db
+from .audit_lookups import LOOKUP_COLUMNS, encode_rows, remember
+
+DEFAULT_HOT_MONTHS = 3  # The current month and the two before it stay in audit_logs
+DEFAULT_ARCHIVE_AFTER_MONTHS = 12  # Partitions older than this are archived to compressed files
+
+RESTORE_BATCH = 5000
+
+# Partition tables are created on demand, never by create_all
+_partition_metadata = MetaData()
+
+
+def _utcnow():
+    # Timestamps are stored as naive UTC
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def _month_start(value):
+    return datetime(value.year, value.month, 1)
+
+
+def _add_months(month_start, months):
+    years, month = divmod(month_start.month - 1 + months, 12)
+    return datetime(month_start.year + years, month + 1, 1)
+
+
+def partition_name(period_start):
+    return f"audit_logs_{period_start:%Y_%m}"
+
+
+def partition_table(name):
+    """The Table for a monthly partition: audit_logs' columns and indexes."""
+    from ..models import AuditLog  # Avoid circular import
+
+    table = _partition_metadata.tables.get(name)
+    if table is None:
+        columns = [
+            Column(column.name, column.type, primary_key=column.primary_key, nullable=column.nullable)
+            for column in AuditLog.__table__.columns
+        ]
+        table = Table(name, _partition_metadata, *columns)
+        # The same access paths as the hot table
+        for index in AuditLog.__table__.indexes:
+            Index(index.name.replace(AuditLog.__tablename__, name, 1), *(table.c[c.name] for c in index.columns))
+    return table
+
+
+def _hot_cutoff(hot_months, now):
+    return _add_months(_month_start(now or _utcnow()), -(hot_months - 1))
+
+
+def seal_partitions(hot_months=None, now=None):
+    """
+    Moves every month older than the hot window out of audit_logs into its partition
+    table, one transaction per month. Returns [(partition name, rows moved)].
+    """
+    from ..models import AuditLog, AuditLogPartition  # Avoid circular import
+
+    hot_months = hot_months or current_app.config.get("AUDIT_HOT_MONTHS", DEFAULT_HOT_MONTHS)
+    cutoff = _hot_cutoff(hot_months, now)
+    source = AuditLog.__table__
+    column_names = [column.name for column in source.columns]
+
+    oldest = db.session.execute(select(func.min(source.c.timestamp))).scalar()
+    if oldest is None or oldest >= cutoff:
+        return []
+
+    moved_counts = []
+    period = _month_start(oldest)
+    while period < cutoff:
+        period_end = _add_months(period, 1)
+        window = and_(source.c.timestamp >= period, source.c.timestamp < period_end)
+        name = partition_name(period)
+        table = partition_table(name)
+
+        table.create(db.session.connection(), checkfirst=True)
+        moved = db.session.execute(
+            insert(table).from_select(column_names, select(*source.columns).where(window))
+        ).rowcount
+        if moved:
+            db.session.execute(delete(source).where(window))
+            partition = db.session.get(AuditLogPartition, name)
+            if partition is None:
+                partition = AuditLogPartition(name=name, period_start=period, period_end=period_end, row_count=0)
+                db.session.add(partition)
+            partition.row_count += moved
+            moved_counts.append((name, moved))
+        db.session.commit()
+
+        # Skip straight to the next month that has rows: empty months get no table
+        following = db.session.execute(
+            select(func.min(source.c.timestamp)).where(source.c.timestamp >= period_end)
+        ).scalar()
+        if following is None:
+            break
+        period = _month_start(following)
+
+    _union_source.cache_clear()
+    return moved_counts
+
+
+def _archive_dir():
+    return current_app.config.get("AUDIT_ARCHIVE_DIR") or os.path.join(current_app.instance_path, "audit_archive")
+
+
+def _encode_row(row):
+    return {key: value.isoformat() if isinstance(value, datetime) else value for key, value in row.items()}
+
+
+def archive_partitions(archive_after_months=None, now=None):
+    """
+    Dumps partitions that ended before the retention window to gzipped NDJSON files
+    (one row per line) and drops their tables. Returns [(partition name, archive path)].
+    """
+    from ..models import AuditLogPartition  # Avoid circular import
+
+    archive_after_months = archive_after_months or current_app.config.get(
+        "AUDIT_ARCHIVE_AFTER_MONTHS", DEFAULT_ARCHIVE_AFTER_MONTHS
+    )
+    cutoff = _hot_cutoff(archive_after_months, now)
+    archive_dir = _archive_dir()
+    os.makedirs(archive_dir, exist_ok=True)
+
+    partitions = AuditLogPartition.query.filter(
+        AuditLogPartition.period_end <= cutoff, AuditLogPartition.archive_path.is_(None)
+    ).order_by(AuditLogPartition.period_start).all()
+
+    archived = []
+    for partition in partitions:
+        table = partition_table(partition.name)
+        path = os.path.join(archive_dir, f"{partition.name}.ndjson.gz")
+        # Written to a temporary name first so a crash never leaves a truncated archive behind
+        with gzip.open(path + ".tmp", "wt", encoding="utf-8") as archive:
+            rows = db.session.execute(select(table).order_by(table.c.id).execution_options(yield_per=RESTORE_BATCH))
+            for row in rows.mappings():
+                archive.write(json.dumps(_encode_row(row), separators=(",", ":")) + "\n")
+        os.replace(path + ".tmp", path)
+
+        table.drop(db.session.connection())
+        partition.archive_path = path
+        db.session.commit()
+        archived.append((partition.name, path))
+
+    _union_source.cache_clear()
+    return archived
+
+
+def restore_partition(period):
+    """
+    Loads an archived month ('YYYY-MM') back into its partition table so it can be
+    queried again. Returns the number of restored rows.
+
+    Raises:
+        ValueError: If the month has no archived partition.
+    """
+    from ..models import AuditLogPartition  # Avoid circular import
+
+    try:
+        period_start = datetime.strptime(period, "%Y-%m")
+    except ValueError:
+        raise ValueError("Invalid period format. Use YYYY-MM.")
+    partition = db.session.get(AuditLogPartition, partition_name(period_start))
+    if partition is None or not partition.archive_path:
+        raise ValueError(f"No archived audit log partition for {period}.")
+
+    table = partition_table(partition.name)
+    connection = db.session.connection()
+    table.create(connection, checkfirst=True)
+    columns = set(table.c.keys())
+    learned = {}
+
+    def insert_batch(batch):
+        # Archives written before the lookup tables existed carry inline ip_address/user_agent values
+        legacy = [row for row in batch if LOOKUP_COLUMNS.keys() & row.keys()]
+        if legacy:
+            learned.update(encode_rows(connection, legacy))
+        unknown = set().union(*batch) - columns
+        if unknown:
+            # Never drop archived data silently; the archive is kept and nothing is restored
+            db.session.rollback()
+            raise ValueError(
+                f"Archive {partition.archive_path} has columns audit logs no longer have: {', '.join(sorted(unknown))}."
+            )
+        db.session.execute(insert(table), batch)
+        return len(batch)
+
+    restored = 0
+    batch = []
+    with gzip.open(partition.archive_path, "rt", encoding="utf-8") as archive:
+        for line in archive:
+            row = json.loads(line)
+            row["timestamp"] = datetime.fromisoformat(row["timestamp"])
+            batch.append(row)
+            if len(batch) >= RESTORE_BATCH:
+                restored += insert_batch(batch)
+                batch = []
+    if batch:
+        restored += insert_batch(batch)
+
+    archive_path = partition.archive_path
+    partition.archive_path = None
+    db.session.commit()
+    remember(learned)
+    os.remove(archive_path)
+
+    _union_source.cache_clear()
+    return restored
+
+
+def partitions_for_window(start=None, end=None, session=None):
+    """
+    Names of the queryable (not archived) partitions that overlap [start, end], read on
+    `session` (default: db.session).
+    """
+    from ..models import AuditLogPartition  # Avoid circular import
+
+    query = select(AuditLogPartition.name).where(AuditLogPartition.archive_path.is_(None))
+    if start is not None:
+        query = query.where(AuditLogPartition.period_end > start.replace(tzinfo=None))
+    if end is not None:
+        query = query.where(AuditLogPartition.period_start <= end.replace(tzinfo=None))
+    return tuple((session or db.session).execute(query.order_by(AuditLogPartition.period_start)).scalars())
+
+
+def audit_log_tables(start=None, end=None, session=None):
+    """Names of the tables holding queryable audit logs for a [start, end] window."""
+    from ..models import AuditLog  # Avoid circular import
+
+    return (AuditLog.__tablename__, *partitions_for_window(start, end, session))
+
+
+@lru_cache(maxsize=64)
+def _partition_entity(name):
+    from ..models import AuditLog  # Avoid circular import
+
+    # Same column names, no lineage to audit_logs: map the columns by name
+    return aliased(AuditLog, partition_table(name), name=name, adapt_on_names=True)
+
+
+def audit_log_sources(start=None, end=None, session=None):
+    """
+    One entity per table holding queryable audit logs for a [start, end] window: the
+    overlapping partitions, oldest first, then AuditLog. For reading the tables one
+    after the other (e.g. exports) instead of through the union in `audit_log_source`.
+    """
+    from ..models import AuditLog  # Avoid circular import
+
+    return [*map(_partition_entity, partitions_for_window(start, end, session)), AuditLog]
+
+
+@lru_cache(maxsize=32)
+def _union_source(names):
+    from ..models import AuditLog  # Avoid circular import
+
+    selects = [select(*AuditLog.__table__.columns)]
+    selects.extend(select(*partition_table(name).columns) for name in names)
+    return aliased(AuditLog, union_all(*selects).subquery("audit_log_window"))
+
+
+def audit_log_source(start=None, end=None, session=None):
+    """
+    The entity audit log reads should select from for a [start, end] window.
+
+    AuditLog (the hot table) when no sealed partition overlaps the window, otherwise
+    an alias over the hot table UNION ALL the overlapping partitions. The same alias
+    is returned for the same set of partitions, so compiled serializers are reused.
+    """
+    from ..models import AuditLog  # Avoid circular import
+
+    names = partitions_for_window(start, end, session)
+    return _union_source(names) if names else AuditLog
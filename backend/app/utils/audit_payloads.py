@@ -0,0 +1,182 @@
+import base64
+import json
+import zlib
+
+from flask import current_app, has_app_context
+from sqlalchemy import or_, select
+
+from ..config import db
+
+PAYLOAD_ENCODINGS = ("full", "delta")
+DEFAULT_SNAPSHOT_INTERVAL = 20  # A delta chain is at most this long before the next full snapshot
+DEFAULT_COMPRESS_MIN_BYTES = 1024
+
+# Compressed payloads are stored as this prefix + base64(zlib(json)); JSON text never starts with '~'
+COMPRESSED_PREFIX = "~z:"
+
+# Collection UPDATE rows stored as a delta have new_value = {DELTA_KEY: {...}} and no old_value:
+#   base     id of the chain's full snapshot row (same entity_type, entity_id and field_name)
+#   seq      position of this row in the chain, 1 for the first delta after the snapshot
+#   added    [{id, name}] items added by this change
+#   removed  [id] items removed by this change
+DELTA_KEY = "$delta"
+
+
+def _config(key, default):
+    return current_app.config.get(key, default) if has_app_context() else default
+
+
+def encode_json_value(value):
+    """
+    JSON-encodes an old_value/new_value payload. With AUDIT_COMPRESS_PAYLOADS enabled,
+    payloads of at least AUDIT_COMPRESS_MIN_BYTES are zlib-compressed (see decode_json_value).
+    Compressed payloads are not full-text indexed (see audit_search._indexed_payload).
+    """
+    if value is None:
+        return None
+    encoded = json.dumps(value, default=str)  # default=str handles datetimes
+    if _config("AUDIT_COMPRESS_PAYLOADS", False) and len(encoded) >= _config(
+        "AUDIT_COMPRESS_MIN_BYTES", DEFAULT_COMPRESS_MIN_BYTES
+    ):
+        compressed = base64.b64encode(zlib.compress(encoded.encode("utf-8"))).decode("ascii")
+        if len(compressed) + len(COMPRESSED_PREFIX) < len(encoded):
+            return COMPRESSED_PREFIX + compressed
+    return encoded
+
+
+def decode_json_value(value):
+    """Decodes a stored old_value/new_value column (plain or compressed JSON text)."""
+    if not value:
+        return None
+    if value.startswith(COMPRESSED_PREFIX):
+        value = zlib.decompress(base64.b64decode(value[len(COMPRESSED_PREFIX):])).decode("utf-8")
+    return json.loads(value)
+
+
+def _latest_row(connection, entity_type, entity_id, field_name):
+    """
+    The entity's latest row that continues or ends a chain: a change of `field_name`, or
+    a CREATE/DELETE. Ids can be reused after a delete (SQLite does), and a new entity
+    must not chain onto the deleted one's snapshot.
+    """
+    from ..models import AuditLog  # Avoid circular import
+
+    table = AuditLog.__table__
+    return connection.execute(
+        select(table.c.id, table.c.field_name, table.c.new_value)
+        .where(
+            table.c.entity_type == entity_type,
+            table.c.entity_id == entity_id,
+            or_(table.c.field_name == field_name, table.c.action_type.in_(("CREATE", "DELETE"))),
+        )
+        .order_by(table.c.id.desc())
+        .limit(1)
+    ).first()
+
+
+def collection_values(connection, entity_type, entity_id, field_name, old_items, new_items, added, removed):
+    """
+    The (old_value, new_value) to store for a collection change.
+
+    With AUDIT_PAYLOAD_ENCODING='full' (default) these are the full before/after lists.
+    With 'delta', only the added items and removed ids are stored, referencing the last
+    full snapshot of the same collection; every AUDIT_SNAPSHOT_INTERVAL changes (or when
+    no snapshot since the entity's CREATE is found in audit_logs) the full lists are
+    stored again. Delta payloads are not full-text indexed (see audit_search._indexed_payload).
+    """
+    encoding = _config("AUDIT_PAYLOAD_ENCODING", "full")
+    if encoding not in PAYLOAD_ENCODINGS:
+        raise ValueError(f"Invalid AUDIT_PAYLOAD_ENCODING '{encoding}'. Use one of: {', '.join(PAYLOAD_ENCODINGS)}.")
+    if encoding == "full":
+        return old_items, new_items
+
+    interval = _config("AUDIT_SNAPSHOT_INTERVAL", DEFAULT_SNAPSHOT_INTERVAL)
+    latest = _latest_row(connection, entity_type, entity_id, field_name)
+    if latest is None or latest.field_name != field_name:
+        # No earlier change of this collection since the entity was (re)created
+        return old_items, new_items
+    previous = decode_json_value(latest.new_value)
+    if isinstance(previous, dict) and DELTA_KEY in previous:
+        base, seq = previous[DELTA_KEY]["base"], previous[DELTA_KEY]["seq"] + 1
+    elif isinstance(previous, list):
+        base, seq = latest.id, 1
+    else:
+        return old_items, new_items
+    if seq >= interval:
+        return old_items, new_items
+
+    delta = {"base": base, "seq": seq, "added": added, "removed": [item["id"] for item in removed]}
+    return None, {DELTA_KEY: delta}
+
+
+def _is_delta(value):
+    return isinstance(value, dict) and DELTA_KEY in value
+
+
+def _chain_states(session, source, base_id, length):
+    """
+    The collection after the base snapshot and after each of the next `length` deltas,
+    or None when the snapshot is not readable (e.g. archived).
+    """
+    base = session.execute(
+        select(source.entity_type, source.entity_id, source.field_name, source.new_value).where(source.id == base_id)
+    ).first()
+    if base is None:
+        return None
+    rows = session.execute(
+        select(source.new_value)
+        .where(
+            source.entity_type == base.entity_type,
+            source.entity_id == base.entity_id,
+            source.field_name == base.field_name,
+            source.id > base_id,
+        )
+        .order_by(source.id)
+        .limit(length)
+    ).scalars()
+
+    items = {item["id"]: item for item in decode_json_value(base.new_value)}
+    states = [sorted(items.values(), key=lambda x: x["id"])]
+    for value in rows:
+        value = decode_json_value(value)
+        if not _is_delta(value):
+            break
+        delta = value[DELTA_KEY]
+        for item_id in delta["removed"]:
+            items.pop(item_id, None)
+        for item in delta["added"]:
+            items[item["id"]] = item
+        states.append(sorted(items.values(), key=lambda x: x["id"]))
+    return states
+
+
+def expand_deltas(items, session=None):
+    """
+    Replaces delta-encoded new_value payloads in serialized audit logs (in place) with
+    the full before/after lists, replaying each chain from its snapshot once per page.
+    Rows whose snapshot cannot be read keep their delta payload.
+    """
+    deltas = [item for item in items if _is_delta(item.get("new_value"))]
+    if not deltas:
+        return items
+
+    from .audit_partitions import audit_log_source  # Avoid circular import
+
+    session = session or db.session
+    # The partition list comes from the same session (e.g. an export's snapshot) as the chains
+    source = audit_log_source(session=session)
+    chains = {}
+    for item in deltas:
+        delta = item["new_value"][DELTA_KEY]
+        chains[delta["base"]] = max(chains.get(delta["base"], 0), delta["seq"])
+    states = {base: _chain_states(session, source, base, length) for base, length in chains.items()}
+
+    for item in deltas:
+        delta = item["new_value"][DELTA_KEY]
+        chain = states[delta["base"]]
+        if chain is None or len(chain) <= delta["seq"]:
+            continue
+        if "old_value" in item:
+            item["old_value"] = chain[delta["seq"] - 1]
+        item["new_value"] = chain[delta["seq"]]
+    return items
@@ -0,0 +1,158 @@
+from collections import Counter
+from datetime import datetime, time, timedelta, timezone
+
+from sqlalchemy import Date, cast, delete, func, insert, select, update
+
+from ..config import db
+
+# group_by values accepted by the stats endpoint -> rollup column name
+STAT_DIMENSIONS = {
+    "day": "day",
+    "action_type": "action_type",
+    "entity_type": "entity_type",
+    "user": "user_id",
+}
+STAT_SORTS = ("count", "key")
+
+NO_USER = 0  # Rollup key for events without a user (the key is part of the primary key, so not NULL)
+
+
+def _day(timestamp):
+    # Audit timestamps are UTC; naive ones are stored that way
+    if timestamp.tzinfo is not None:
+        timestamp = timestamp.astimezone(timezone.utc)
+    return timestamp.date()
+
+
+def _upsert(connection, counts):
+    from ..models import AuditLogDailyStat  # Avoid circular import
+
+    table = AuditLogDailyStat.__table__
+    rows = [
+        {"day": day, "action_type": action_type, "entity_type": entity_type, "user_id": user_id, "count": count}
+        for (day, action_type, entity_type, user_id), count in counts.items()
+    ]
+    dialect = connection.dialect.name
+    if dialect in ("sqlite", "postgresql"):
+        if dialect == "sqlite":
+            from sqlalchemy.dialects.sqlite import insert as dialect_insert
+        else:
+            from sqlalchemy.dialects.postgresql import insert as dialect_insert
+        statement = dialect_insert(table)
+        connection.execute(
+            statement.on_conflict_do_update(
+                index_elements=[column.name for column in table.primary_key],
+                set_={"count": table.c.count + statement.excluded.count},
+            ),
+            rows,
+        )
+        return
+    for row in rows:
+        key = [table.c[name] == row[name] for name in ("day", "action_type", "entity_type", "user_id")]
+        if not connection.execute(update(table).where(*key).values(count=table.c.count + row["count"])).rowcount:
+            connection.execute(insert(table), row)
+
+
+def record_rollups(connection, rows):
+    """
+    Adds audit rows (as built by build_audit_row) to the daily rollups, in the
+    transaction that inserts them: one upsert per (day, action, entity type, user).
+    """
+    counts = Counter(
+        (_day(row["timestamp"]), row["action_type"], row["entity_type"], row.get("user_id") or NO_USER)
+        for row in rows
+    )
+    if counts:
+        _upsert(connection, counts)
+
+
+def rebuild_rollups(connection, start=None, end=None):
+    """
+    Recomputes the rollups of the days in [start, end] (dates, either may be None) from
+    the stored audit logs: the hot table and every sealed, non-archived partition.
+    Returns (number of audit logs counted, first day rebuilt or None).
+
+    Archived months are not readable, so the rollups up to the end of the newest
+    archived partition are kept as they are; the rebuild starts after it.
+    """
+    from ..models import AuditLogDailyStat, AuditLogPartition  # Avoid circular import
+    from .audit_partitions import audit_log_source  # Avoid circular import
+
+    archived_until = connection.execute(
+        select(func.max(AuditLogPartition.period_end)).where(AuditLogPartition.archive_path.isnot(None))
+    ).scalar()
+    if archived_until is not None and (start is None or start < archived_until.date()):
+        start = archived_until.date()
+
+    source = audit_log_source()
+    if connection.dialect.name == "sqlite":
+        day = func.date(source.timestamp)
+    else:
+        day = cast(source.timestamp, Date)
+    user_id = func.coalesce(source.user_id, NO_USER)
+    grouped = (
+        select(day, source.action_type, source.entity_type, user_id, func.count())
+        .group_by(day, source.action_type, source.entity_type, user_id)
+    )
+    table = AuditLogDailyStat.__table__
+    rebuilt = []
+    if start is not None:
+        grouped = grouped.where(source.timestamp >= datetime.combine(start, time.min))
+        rebuilt.append(table.c.day >= start)
+    if end is not None:
+        grouped = grouped.where(source.timestamp < datetime.combine(end + timedelta(days=1), time.min))
+        rebuilt.append(table.c.day <= end)
+    connection.execute(delete(table).where(*rebuilt))
+    connection.execute(
+        insert(table).from_select(["day", "action_type", "entity_type", "user_id", "count"], grouped)
+    )
+    counted = connection.execute(select(func.coalesce(func.sum(table.c.count), 0)).where(*rebuilt)).scalar()
+    return counted, start
+
+
+def query_stats(group_by, start=None, end=None, action_type=None, entity_type=None, user_id=None,
+                sort="count", limit=None):
+    """
+    Aggregates the rollups: event counts per `group_by` dimensions (see STAT_DIMENSIONS)
+    for the days in [start, end], optionally filtered by exact action type, entity type
+    and user. Returns (rows as dicts, total count).
+
+    sort='count' lists the largest groups first (top-N with `limit`), sort='key' orders
+    by the grouped dimensions (e.g. a time series by day).
+    """
+    from ..models import AuditLogDailyStat, User  # Avoid circular import
+
+    filters = []
+    if start is not None:
+        filters.append(AuditLogDailyStat.day >= start)
+    if end is not None:
+        filters.append(AuditLogDailyStat.day <= end)
+    if action_type:
+        filters.append(AuditLogDailyStat.action_type == action_type)
+    if entity_type:
+        filters.append(AuditLogDailyStat.entity_type == entity_type)
+    if user_id is not None:
+        filters.append(AuditLogDailyStat.user_id == user_id)
+
+    total_count = func.sum(AuditLogDailyStat.count)
+    keys = [getattr(AuditLogDailyStat, STAT_DIMENSIONS[name]) for name in group_by]
+    query = select(*keys, total_count.label("count")).where(*filters).group_by(*keys)
+    if "user" in group_by:
+        query = query.add_columns(User.username).outerjoin(User, User.id == AuditLogDailyStat.user_id) \
+            .group_by(User.username)
+    query = query.order_by(*keys) if sort == "key" else query.order_by(total_count.desc(), *keys)
+    if limit:
+        query = query.limit(limit)
+
+    items = []
+    for row in db.session.execute(query).mappings():
+        item = {name: row[STAT_DIMENSIONS[name]] for name in group_by}
+        if "day" in item:
+            item["day"] = item["day"].isoformat()
+        if "user" in item:
+            item["user"] = {"id": item["user"] or None, "username": row["username"]}
+        item["count"] = row["count"]
+        items.append(item)
+
+    total = db.session.execute(select(func.coalesce(total_count, 0)).where(*filters)).scalar()
+    return items, total
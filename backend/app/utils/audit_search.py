@@ -0,0 +1,168 @@
+import re
+
+from sqlalchemy import bindparam, literal_column, select, text
+from sqlalchemy.sql import column, table
+
+from ..config import db
+
+FTS_TABLE = "audit_logs_fts"
+
+# The indexed columns, in FTS column order, and their bm25 weights (higher = more important)
+FTS_COLUMNS = (
+    ("username", 2.0),
+    ("description", 3.0),
+    ("entity_type", 2.0),
+    ("field_name", 1.5),
+    ("old_value", 1.0),
+    ("new_value", 1.0),
+)
+
+# Lightweight (non-metadata) handle so create_all never tries to create it as a plain table
+audit_logs_fts = table(FTS_TABLE, column("rowid"), column("rank"))
+
+_COLUMN_LIST = ", ".join(name for name, _ in FTS_COLUMNS)
+
+
+def _indexed_payload(value):
+    """
+    SQL for the indexed text of an old_value/new_value column. Compressed ('~z:') and delta
+    ('$delta') payloads are encoded blobs, not the value itself, so they are left out of
+    the index: those rows are still found by their description, entity type and field name.
+    """
+    return f"""CASE WHEN {value} GLOB '~z:*' OR {value} GLOB '{{"$delta"*' THEN NULL ELSE {value} END"""
+
+
+# One row per audit log, rowid = audit_logs.id; usernames are denormalized so search needs no join
+_FTS_ROW_SELECT = f"""
+    SELECT audit_logs.id, users.username, audit_logs.description, audit_logs.entity_type,
+           audit_logs.field_name, {_indexed_payload("audit_logs.old_value")},
+           {_indexed_payload("audit_logs.new_value")}
+    FROM audit_logs LEFT JOIN users ON users.id = audit_logs.user_id
+"""
+
+_FTS_DDL = (
+    f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        {_COLUMN_LIST},
+        tokenize = 'unicode61 remove_diacritics 2',
+        prefix = '2 3'
+    )
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS audit_logs_fts_insert AFTER INSERT ON audit_logs BEGIN
+        INSERT INTO {FTS_TABLE} (rowid, {_COLUMN_LIST})
+        VALUES (new.id, (SELECT username FROM users WHERE id = new.user_id), new.description,
+                new.entity_type, new.field_name, {_indexed_payload("new.old_value")},
+                {_indexed_payload("new.new_value")});
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS audit_logs_fts_update AFTER UPDATE ON audit_logs BEGIN
+        DELETE FROM {FTS_TABLE} WHERE rowid = old.id;
+        INSERT INTO {FTS_TABLE} (rowid, {_COLUMN_LIST})
+        VALUES (new.id, (SELECT username FROM users WHERE id = new.user_id), new.description,
+                new.entity_type, new.field_name, {_indexed_payload("new.old_value")},
+                {_indexed_payload("new.new_value")});
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS audit_logs_fts_delete AFTER DELETE ON audit_logs BEGIN
+        DELETE FROM {FTS_TABLE} WHERE rowid = old.id;
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS audit_logs_fts_username AFTER UPDATE OF username ON users BEGIN
+        UPDATE {FTS_TABLE} SET username = new.username
+        WHERE rowid IN (SELECT id FROM audit_logs WHERE user_id = new.id);
+    END
+    """,
+)
+
+# Dropped before the DDL runs so databases created with older trigger definitions pick up the current ones
+_FTS_TRIGGERS = ("audit_logs_fts_insert", "audit_logs_fts_update", "audit_logs_fts_delete", "audit_logs_fts_username")
+
+# engine url -> whether the FTS table exists; checked once per process
+_available = {}
+
+
+def _search_index_exists(connection):
+    return connection.execute(
+        text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"), {"name": FTS_TABLE}
+    ).first() is not None
+
+
+def ensure_search_index(connection):
+    """
+    Creates the FTS5 index and the triggers that keep it in sync with audit_logs (SQLite only).
+    A newly created index is filled from the existing rows. Safe to run on every start.
+    """
+    if connection.dialect.name != "sqlite":
+        return False
+    created = not _search_index_exists(connection)
+    for trigger in _FTS_TRIGGERS:
+        connection.execute(text(f"DROP TRIGGER IF EXISTS {trigger}"))
+    for statement in _FTS_DDL:
+        connection.execute(text(statement))
+    if created:
+        weights = ", ".join(str(weight) for _, weight in FTS_COLUMNS)
+        # Persist the column weights so `rank` is our weighted bm25
+        connection.execute(
+            text(f"INSERT INTO {FTS_TABLE} ({FTS_TABLE}, rank) VALUES ('rank', :rank)"),
+            {"rank": f"bm25({weights})"},
+        )
+        _fill_search_index(connection)
+    _available[str(connection.engine.url)] = True
+    return True
+
+
+def _fill_search_index(connection):
+    connection.execute(text(f"INSERT INTO {FTS_TABLE} (rowid, {_COLUMN_LIST}) {_FTS_ROW_SELECT}"))
+    connection.execute(text(f"INSERT INTO {FTS_TABLE} ({FTS_TABLE}) VALUES ('optimize')"))
+
+
+def rebuild_search_index(connection):
+    """
+    Re-creates the index contents from audit_logs and users (e.g. after a bulk import
+    that bypassed the triggers). Returns the number of indexed rows.
+    """
+    ensure_search_index(connection)
+    connection.execute(text(f"DELETE FROM {FTS_TABLE}"))
+    _fill_search_index(connection)
+    return connection.execute(text(f"SELECT COUNT(*) FROM {FTS_TABLE}")).scalar()
+
+
+def search_index_available():
+    """True if full-text search can be used on the current database."""
+    engine = db.engine
+    key = str(engine.url)
+    if key not in _available:
+        if engine.dialect.name != "sqlite":
+            _available[key] = False
+        else:
+            with engine.connect() as connection:
+                _available[key] = _search_index_exists(connection)
+    return _available[key]
+
+
+def to_match_query(term):
+    """
+    Turns free text into a safe FTS5 query: every word must match the start of a token,
+    so 'adm perm' finds 'admin' ... 'permissions'. Returns None if the text has no words.
+    """
+    words = re.findall(r"[^\W_]+", term)
+    if not words:
+        return None
+    return " ".join(f'"{word}"*' for word in words)
+
+
+def search_subquery(match_query):
+    """
+    Subquery of (audit_log_id, relevance) for the rows matching `match_query`.
+    Higher relevance is a better match.
+    """
+    match = literal_column(FTS_TABLE).op("MATCH")(bindparam("fts_query", match_query))
+    return (
+        select(audit_logs_fts.c.rowid.label("audit_log_id"), (-audit_logs_fts.c.rank).label("relevance"))
+        .where(match)
+        .subquery("search")
+    )
@@ -0,0 +1,126 @@
+import atexit
+import queue
+import threading
+import time
+
+from flask import current_app
+from ..config import db
+from .audit_lookups import insert_audit_rows, remember
+
+SINK_MODES = ("async", "sync")
+
+DEFAULT_QUEUE_SIZE = 10000
+DEFAULT_BATCH_SIZE = 200
+DEFAULT_FLUSH_INTERVAL = 0.5  # seconds an event may wait for a batch to fill
+DEFAULT_ENQUEUE_TIMEOUT = 0.05  # seconds a request waits for queue space before writing itself
+
+_STOP = object()
+_create_lock = threading.Lock()
+
+
+class AuditSink:
+    """
+    Buffers audit rows in a bounded queue and bulk-inserts them from a background thread,
+    once AUDIT_BATCH_SIZE rows are waiting or AUDIT_FLUSH_INTERVAL seconds have passed.
+
+    - Backpressure: when the queue is full, the caller writes its own row synchronously.
+    - Shutdown: queued rows are flushed at interpreter exit.
+    - AUDIT_SINK_MODE='sync' writes every row immediately (no thread).
+    """
+
+    def __init__(self, app):
+        config = app.config
+        self.app = app
+        self.mode = config.get("AUDIT_SINK_MODE", "async")
+        if self.mode not in SINK_MODES:
+            raise ValueError(f"Invalid AUDIT_SINK_MODE '{self.mode}'. Use one of: {', '.join(SINK_MODES)}.")
+        self.batch_size = config.get("AUDIT_BATCH_SIZE", DEFAULT_BATCH_SIZE)
+        self.flush_interval = config.get("AUDIT_FLUSH_INTERVAL", DEFAULT_FLUSH_INTERVAL)
+        self.enqueue_timeout = config.get("AUDIT_ENQUEUE_TIMEOUT", DEFAULT_ENQUEUE_TIMEOUT)
+        self._queue = queue.Queue(maxsize=config.get("AUDIT_QUEUE_SIZE", DEFAULT_QUEUE_SIZE))
+        self._thread = None
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def submit(self, row):
+        """Queues one audit_logs row (a dict of column values)."""
+        if self.mode == "sync" or self._closed:
+            self._write([row])
+            return
+        self._ensure_started()
+        try:
+            self._queue.put(row, timeout=self.enqueue_timeout)
+        except queue.Full:
+            # The writer is behind: slow this caller down instead of growing the queue
+            self._write([row])
+
+    def flush(self):
+        """Blocks until every queued row has been written."""
+        if self._thread is not None and self._thread.is_alive():
+            self._queue.join()
+
+    def close(self, timeout=5):
+        """Writes the queued rows and stops the writer thread; later rows are written synchronously."""
+        self._closed = True
+        if self._thread is not None and self._thread.is_alive():
+            self._queue.put(_STOP)
+            self._thread.join(timeout)
+
+    def _ensure_started(self):
+        # Also restarts the writer in a forked worker, where the parent's thread does not exist
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="audit-sink", daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size and batch[-1] is not _STOP:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+
+            rows = [row for row in batch if row is not _STOP]
+            stopping = len(rows) != len(batch)
+            if rows:
+                self._write(rows)
+            for _ in batch:
+                self._queue.task_done()
+
+    def _write(self, rows):
+        with self.app.app_context():
+            try:
+                # One transaction (and one fsync) per batch; rows are copied since interning rewrites them
+                with db.engine.begin() as connection:
+                    learned = insert_audit_rows(connection, [dict(row) for row in rows])
+                remember(learned)
+            except Exception as e:
+                if len(rows) > 1:
+                    # Don't lose the whole batch to one bad row
+                    for row in rows:
+                        self._write([row])
+                    return
+                # Use Flask's app.logger for consistent logging within your application
+                self.app.logger.error(f"Error logging audit event: {e}", exc_info=True)
+
+
+def get_audit_sink(app=None):
+    """Returns the app's audit sink, creating it on first use."""
+    app = app or current_app._get_current_object()
+    sink = app.extensions.get("audit_sink")
+    if sink is None:
+        with _create_lock:
+            sink = app.extensions.get("audit_sink")
+            if sink is None:
+                sink = app.extensions["audit_sink"] = AuditSink(app)
+                atexit.register(sink.close)
+    return sink
@@ -0,0 +1,39 @@
+from sqlalchemy import text
+
+from ..config import db
+
+# Low-cardinality audit log columns whose partial-match filters are resolved to exact values
+VALUE_COLUMNS = ("action_type", "entity_type")
+
+# Walks the column's index from one distinct value to the next (a "skip scan"), so it costs
+# one index probe per distinct value instead of a scan of the table
+_DISTINCT_SQL = """
+    WITH RECURSIVE distinct_values(value) AS (
+        SELECT min({column}) FROM {table}
+        UNION ALL
+        SELECT (SELECT min({column}) FROM {table} WHERE {column} > distinct_values.value)
+        FROM distinct_values WHERE distinct_values.value IS NOT NULL
+    )
+    SELECT value FROM distinct_values WHERE value IS NOT NULL
+"""
+
+
+def distinct_values(column, tables, session=None):
+    """The distinct values of an indexed audit log column across `tables` (audit_logs and partitions)."""
+    if column not in VALUE_COLUMNS:
+        raise ValueError(f"Unsupported column '{column}'.")
+    session = session or db.session
+    values = set()
+    for table in tables:
+        values.update(session.execute(text(_DISTINCT_SQL.format(column=column, table=table))).scalars())
+    return values
+
+
+def matching_values(column, term, tables, session=None):
+    """
+    The values of `column` containing `term`, case-insensitively: the same rows as
+    ILIKE '%term%', as an exact IN list the column's index can serve.
+    Queries run on `session` (default: db.session).
+    """
+    term = term.lower()
+    return sorted(value for value in distinct_values(column, tables, session) if term in value.lower())
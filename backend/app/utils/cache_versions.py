@@ -0,0 +1,113 @@
+from threading import Lock
+import time
+
+from flask import current_app, g, has_app_context, has_request_context
+from sqlalchemy import event, select, update
+from sqlalchemy.exc import IntegrityError
+
+from ..config import db
+
+# Scopes with their own persisted counter
+RBAC = 'rbac'  # Roles, permissions and role assignments
+
+DEFAULT_CHECK_INTERVAL_MS = 1000
+
+# Last versions read from the database by this process, and when they were read
+_versions = {}
+_checked_at = None
+_lock = Lock()
+
+
+def bump_version(*scopes):
+    """
+    Increments the persisted version of each scope inside the current transaction.
+
+    Call this before `db.session.commit()` in any write path that changes cached
+    data: the bump commits or rolls back together with the change, and every
+    worker drops its local caches once it sees the new version.
+    """
+    from ..models import CacheVersion  # Avoid circular import with models
+
+    for scope in scopes:
+        result = db.session.execute(
+            update(CacheVersion)
+            .where(CacheVersion.scope == scope)
+            .values(version=CacheVersion.version + 1)
+        )
+        if result.rowcount == 0:
+            try:
+                with db.session.begin_nested():
+                    db.session.add(CacheVersion(scope=scope, version=1))
+            except IntegrityError:
+                # Another worker created the row first; bump it instead
+                db.session.execute(
+                    update(CacheVersion)
+                    .where(CacheVersion.scope == scope)
+                    .values(version=CacheVersion.version + 1)
+                )
+    db.session.info['cache_versions_bumped'] = True
+
+
+def _check_interval():
+    if has_app_context():
+        return current_app.config.get('CACHE_VERSION_CHECK_INTERVAL_MS', DEFAULT_CHECK_INTERVAL_MS) / 1000.0
+    return DEFAULT_CHECK_INTERVAL_MS / 1000.0
+
+
+def _refresh():
+    """Reads every scope's version with one small query."""
+    global _versions, _checked_at
+    from ..models import CacheVersion  # Avoid circular import with models
+
+    # Always from the primary: a lagging replica would keep revoked permissions cached
+    versions = dict(db.session.execute(
+        select(CacheVersion.scope, CacheVersion.version), bind_arguments={"bind": db.engine}
+    ).all())
+    with _lock:
+        _versions = versions
+        _checked_at = time.monotonic()
+    return versions
+
+
+def _current_versions():
+    # At most one read per request...
+    if has_request_context():
+        versions = g.get('_cache_versions')
+        if versions is not None:
+            return versions
+
+    # ...and at most one read per check interval across requests
+    if _checked_at is not None and time.monotonic() - _checked_at < _check_interval():
+        versions = _versions
+    else:
+        versions = _refresh()
+
+    if has_request_context():
+        g._cache_versions = versions
+    return versions
+
+
+def get_version(scope):
+    """Returns the latest known version of a scope (0 if it was never bumped)."""
+    return _current_versions().get(scope, 0)
+
+
+def expire_local_versions():
+    """Forces the next get_version() call to re-read the versions from the database."""
+    global _checked_at
+    with _lock:
+        _checked_at = None
+    if has_request_context():
+        g.pop('_cache_versions', None)
+
+
+@event.listens_for(db.session, 'after_commit')
+def _expire_after_bump(session):
+    # Changes committed by this process are visible to it immediately
+    if session.info.pop('cache_versions_bumped', False):
+        expire_local_versions()
+
+
+@event.listens_for(db.session, 'after_rollback')
+def _discard_rolled_back_bump(session):
+    session.info.pop('cache_versions_bumped', None)
@@ -0,0 +1,135 @@
+from sqlalchemy import event, inspect, select
+from sqlalchemy.orm.attributes import NO_VALUE
+
+from ..config import db
+from .audit_logger import build_audit_row
+from .audit_payloads import collection_values
+from .audit_lookups import insert_audit_rows, remember
+
+# Models opt in with class attributes:
+#   AUDIT_ENTITY      entity_type written to the audit log, e.g. 'Role'
+#   AUDIT_FIELDS      column attributes whose changes are logged, one UPDATE row per field
+#   AUDIT_COLLECTIONS relationship attributes logged as sorted [{id, name}] lists with added/removed names
+#                     (or as deltas, see AUDIT_PAYLOAD_ENCODING in utils.audit_payloads)
+#   AUDIT_REFERENCES  foreign key attribute -> model name, described by the referenced row's name
+
+_DELETED_KEY = "change_capture_deleted"
+_LEARNED_KEY = "change_capture_lookups"
+
+
+def _audited(obj):
+    return getattr(type(obj), "AUDIT_ENTITY", None) is not None
+
+
+def _item_details(items):
+    return sorted(({"id": item.id, "name": getattr(item, "name", None)} for item in items), key=lambda x: x["id"])
+
+
+def _snapshot(obj):
+    """Audited fields and collections of `obj` (for CREATE and DELETE rows)."""
+    model = type(obj)
+    data = {"id": obj.id}
+    for field in model.AUDIT_FIELDS:
+        data[field] = getattr(obj, field)
+    for name in getattr(model, "AUDIT_COLLECTIONS", ()):
+        data[name] = _item_details(getattr(obj, name))
+    return data
+
+
+def _label(obj):
+    return f"{type(obj).AUDIT_ENTITY.lower()} '{getattr(obj, 'name', obj.id)}' (ID: {obj.id})"
+
+
+def _reference_name(connection, model_name, value):
+    if value is None:
+        return "None"
+    model = db.Model.registry._class_registry[model_name]
+    name = connection.execute(select(model.name).where(model.id == value)).scalar()
+    return name if name is not None else "None"
+
+
+def _update_rows(connection, obj):
+    model = type(obj)
+    state = inspect(obj)
+    rows = []
+
+    for field in model.AUDIT_FIELDS:
+        history = state.attrs[field].history
+        if not history.has_changes():
+            continue
+        old = history.deleted[0] if history.deleted else None
+        new = history.added[0] if history.added else None
+        if old is NO_VALUE or old == new:
+            continue
+        description = f"Updated {_label(obj)}: changed '{field}'"
+        reference = getattr(model, "AUDIT_REFERENCES", {}).get(field)
+        if reference:
+            description += (
+                f" from '{_reference_name(connection, reference, old)}'"
+                f" to '{_reference_name(connection, reference, new)}'"
+            )
+        rows.append(build_audit_row("UPDATE", model.AUDIT_ENTITY, obj.id, field, old, new, description))
+
+    for name in getattr(model, "AUDIT_COLLECTIONS", ()):
+        history = state.attrs[name].history
+        if not (history.added or history.deleted):
+            continue
+        description = f"Updated {_label(obj)}: {name} changed."
+        if history.added:
+            description += f" Added: {', '.join(item['name'] for item in _item_details(history.added))}."
+        if history.deleted:
+            description += f" Removed: {', '.join(item['name'] for item in _item_details(history.deleted))}."
+        old_value, new_value = collection_values(
+            connection, model.AUDIT_ENTITY, obj.id, name,
+            _item_details([*history.unchanged, *history.deleted]),
+            _item_details([*history.unchanged, *history.added]),
+            _item_details(history.added),
+            _item_details(history.deleted),
+        )
+        rows.append(build_audit_row("UPDATE", model.AUDIT_ENTITY, obj.id, name, old_value, new_value, description))
+    return rows
+
+
+@event.listens_for(db.session, "before_flush")
+def _capture_deletes(session, flush_context, instances):
+    # Deleted rows are snapshotted while they (and their collections) can still be loaded
+    for obj in session.deleted:
+        if _audited(obj):
+            session.info.setdefault(_DELETED_KEY, []).append(build_audit_row(
+                "DELETE", type(obj).AUDIT_ENTITY, obj.id, old_value=_snapshot(obj),
+                description=f"Deleted {_label(obj)}",
+            ))
+
+
+@event.listens_for(db.session, "after_flush")
+def _write_changes(session, flush_context):
+    """
+    Writes audit rows for the audited objects this flush created, changed or deleted,
+    using attribute history, in the flush's own transaction.
+    """
+    connection = session.connection()
+    rows = session.info.pop(_DELETED_KEY, [])
+    for obj in session.new:
+        if _audited(obj):
+            rows.append(build_audit_row(
+                "CREATE", type(obj).AUDIT_ENTITY, obj.id, new_value=_snapshot(obj),
+                description=f"Created {_label(obj)}",
+            ))
+    for obj in session.dirty:
+        if _audited(obj) and obj not in session.deleted:
+            rows.extend(_update_rows(connection, obj))
+
+    if rows:
+        # Interned lookup ids are only cached once this transaction commits
+        session.info.setdefault(_LEARNED_KEY, {}).update(insert_audit_rows(connection, rows))
+
+
+@event.listens_for(db.session, "after_commit")
+def _remember_lookups(session):
+    remember(session.info.pop(_LEARNED_KEY, {}))
+
+
+@event.listens_for(db.session, "after_rollback")
+def _discard_deletes(session):
+    session.info.pop(_DELETED_KEY, None)
+    session.info.pop(_LEARNED_KEY, None)
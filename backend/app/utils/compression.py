@@ -0,0 +1,207 @@
+import hashlib
+import zlib
+from collections import OrderedDict
+from threading import Lock
+
+from flask import request
+
+try:
+    import brotli
+except ImportError:  # Optional: `pip install brotli`
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # Optional: `pip install zstandard`
+    zstandard = None
+
+DEFAULT_MIN_SIZE = 1024  # bytes; smaller bodies gain little and cost a header
+DEFAULT_LEVEL = 6  # gzip/deflate, 1-9
+DEFAULT_BR_LEVEL = 4  # brotli, 0-11; higher levels are too slow for dynamic responses
+DEFAULT_ZSTD_LEVEL = 3  # zstd, 1-22
+DEFAULT_CACHE_BYTES = 16 * 1024 * 1024  # compressed bodies kept per process
+
+COMPRESSIBLE_MIMETYPES = (
+    "application/json",
+    "application/x-ndjson",
+    "text/csv",
+    "text/html",
+    "text/plain",
+    "application/javascript",
+)
+
+
+class _Compressor:
+    """One incremental compressor: compress() returns what is ready, flush() ends a block, finish() the stream."""
+
+    def __init__(self, encoding, level):
+        self.encoding = encoding
+        if encoding == "br":
+            self._obj = brotli.Compressor(quality=level)
+        elif encoding == "zstd":
+            self._obj = zstandard.ZstdCompressor(level=level).compressobj()
+        else:
+            # wbits: 31 = gzip header and trailer, 15 = zlib stream (HTTP 'deflate')
+            self._obj = zlib.compressobj(level, zlib.DEFLATED, 31 if encoding == "gzip" else 15)
+
+    def compress(self, data):
+        if self.encoding == "br":
+            return self._obj.process(data)
+        return self._obj.compress(data)
+
+    def flush(self):
+        # Emits everything compressed so far, so a streamed chunk reaches the client now
+        if self.encoding == "br":
+            return self._obj.flush()
+        if self.encoding == "zstd":
+            return self._obj.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+        return self._obj.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self):
+        if self.encoding == "br":
+            return self._obj.finish()
+        return self._obj.flush()
+
+
+def available_encodings():
+    """Supported Content-Encodings, most preferred first (the optional ones when installed)."""
+    encodings = []
+    if brotli is not None:
+        encodings.append("br")  # Smallest JSON bodies at comparable speed
+    if zstandard is not None:
+        encodings.append("zstd")
+    return encodings + ["gzip", "deflate"]
+
+
+def _levels(config):
+    return {
+        "zstd": config.get("COMPRESS_ZSTD_LEVEL", DEFAULT_ZSTD_LEVEL),
+        "br": config.get("COMPRESS_BR_LEVEL", DEFAULT_BR_LEVEL),
+        "gzip": config.get("COMPRESS_LEVEL", DEFAULT_LEVEL),
+        "deflate": config.get("COMPRESS_LEVEL", DEFAULT_LEVEL),
+    }
+
+
+def choose_encoding(encodings):
+    """The encoding from `encodings` with the highest Accept-Encoding quality (ties: our order), or None."""
+    accepted = request.accept_encodings
+    best, best_quality = None, 0
+    for encoding in encodings:
+        quality = accepted[encoding]
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+def compress_bytes(data, encoding, level):
+    compressor = _Compressor(encoding, level)
+    return compressor.compress(data) + compressor.finish()
+
+
+def compress_chunks(chunks, encoding, level):
+    """Compresses a stream of byte chunks as it goes, flushing after every chunk."""
+    compressor = _Compressor(encoding, level)
+    for chunk in chunks:
+        data = compressor.compress(chunk) + compressor.flush()
+        if data:
+            yield data
+    yield compressor.finish()
+
+
+class _CompressedCache:
+    """
+    Compressed bodies by (body digest, encoding, level), least recently used evicted first,
+    bounded by their total size. The key is the content itself, so an entry can never be
+    served for a different body.
+    """
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self._data = OrderedDict()
+        self._size = 0
+        self._lock = Lock()
+
+    def get(self, key):
+        with self._lock:
+            value = self._data.get(key)
+            if value is not None:
+                self._data.move_to_end(key)
+            return value
+
+    def put(self, key, value):
+        if len(value) > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._data.pop(key, None)
+            if previous is not None:
+                self._size -= len(previous)
+            self._data[key] = value
+            self._size += len(value)
+            while self._size > self.max_bytes:
+                _, evicted = self._data.popitem(last=False)
+                self._size -= len(evicted)
+
+
+def _is_cacheable(response):
+    # Bodies the client may not store are not kept by the server either
+    return not response.cache_control.no_store
+
+
+def init_compression(app):
+    """
+    Compresses responses for clients that accept it (Accept-Encoding): zstd or brotli when
+    those packages are installed, else gzip or deflate. Applies to COMPRESSIBLE_MIMETYPES
+    bodies of at least COMPRESS_MIN_SIZE bytes and to every streamed response of those
+    types (compressed chunk by chunk). Responses that already have a Content-Encoding
+    (e.g. the gzip audit export), files and partial content are left alone.
+
+    Non-streamed results are cached by content (COMPRESS_CACHE_BYTES, 0 disables), so a
+    payload served to many clients, like the full permission tree, is compressed once.
+
+    Config: COMPRESS_ENABLED, COMPRESS_MIN_SIZE, COMPRESS_LEVEL (gzip/deflate),
+    COMPRESS_BR_LEVEL, COMPRESS_ZSTD_LEVEL, COMPRESS_CACHE_BYTES.
+    """
+    encodings = available_encodings()
+    cache = _CompressedCache(app.config.get("COMPRESS_CACHE_BYTES", DEFAULT_CACHE_BYTES))
+
+    @app.after_request
+    def _compress_response(response):
+        config = app.config
+        if not config.get("COMPRESS_ENABLED", True):
+            return response
+        if (
+            response.mimetype not in COMPRESSIBLE_MIMETYPES
+            or response.status_code < 200 or response.status_code in (204, 206, 304)
+            or response.direct_passthrough
+            or "Content-Encoding" in response.headers
+        ):
+            return response
+        # The representation depends on Accept-Encoding even when it is not compressed
+        response.vary.add("Accept-Encoding")
+        encoding = choose_encoding(encodings)
+        if encoding is None:
+            return response
+        level = _levels(config)[encoding]
+
+        if response.is_streamed:
+            body = response.response
+            response.response = compress_chunks(response.iter_encoded(), encoding, level)
+            if hasattr(body, "close"):
+                # Still close the original body (e.g. stream_with_context teardown) when the response is done
+                response.call_on_close(body.close)
+            response.headers.pop("Content-Length", None)
+        else:
+            data = response.get_data()
+            if len(data) < config.get("COMPRESS_MIN_SIZE", DEFAULT_MIN_SIZE):
+                return response
+            key = (hashlib.blake2b(data, digest_size=16).digest(), encoding, level)
+            compressed = cache.get(key) if cache.max_bytes else None
+            if compressed is None:
+                compressed = compress_bytes(data, encoding, level)
+                if cache.max_bytes and _is_cacheable(response):
+                    cache.put(key, compressed)
+            if len(compressed) >= len(data):
+                return response
+            response.set_data(compressed)
+        response.headers["Content-Encoding"] = encoding
+        return response
@@ -0,0 +1,53 @@
+import base64
+import json
+from datetime import datetime
+
+from sqlalchemy import and_, or_
+
+
+def encode_cursor(data):
+    """Encodes a dict as an opaque, URL-safe cursor string. datetimes are tagged so they round-trip."""
+    payload = {
+        key: {"$dt": value.isoformat()} if isinstance(value, datetime) else value
+        for key, value in data.items()
+    }
+    raw = json.dumps(payload, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor):
+    """
+    Decodes a cursor produced by `encode_cursor`.
+
+    Raises:
+        ValueError: If the cursor is malformed.
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        payload = json.loads(raw)
+        if not isinstance(payload, dict):
+            raise ValueError("Invalid cursor.")
+        return {
+            key: datetime.fromisoformat(value["$dt"]) if isinstance(value, dict) and "$dt" in value else value
+            for key, value in payload.items()
+        }
+    except (ValueError, TypeError) as e:
+        raise ValueError("Invalid cursor.") from e
+
+
+def is_scalar(value):
+    """True for the values a cursor may carry into SQL: a string, number, datetime or None."""
+    return value is None or isinstance(value, (str, int, float, datetime))
+
+
+def keyset_condition(column, tiebreaker, value, tiebreaker_value, descending):
+    """
+    Builds the "rows after (value, tiebreaker_value)" predicate for an ordering on
+    (column, tiebreaker), both in the same direction.
+
+    Written as `column < v OR (column = v AND tiebreaker < t)` (or `>` when ascending),
+    which an index on (column, tiebreaker) can serve on every backend.
+    """
+    if descending:
+        return or_(column < value, and_(column == value, tiebreaker < tiebreaker_value))
+    return or_(column > value, and_(column == value, tiebreaker > tiebreaker_value))
@@ -0,0 +1,102 @@
+from sqlalchemy.orm import load_only
+
+
+class Fieldset:
+    """
+    Which top-level keys (`fields`) and which optional expansions (`include`) a
+    response should contain.
+
+    Models take a Fieldset in `to_json` and `serialization_options` so that only
+    the requested columns are selected, only the included relationships are
+    loaded, and only the requested keys are serialized.
+    """
+    __slots__ = ("fields", "include")
+
+    def __init__(self, fields=None, include=()):
+        self.fields = fields  # frozenset of keys, or None for all keys
+        self.include = frozenset(include)
+
+    def wants(self, key):
+        """True if the response should contain the given top-level key."""
+        return self.fields is None or key in self.fields
+
+    def includes(self, name):
+        """True if the given expansion (e.g. 'roles' or 'roles.permissions') was requested."""
+        return name in self.include
+
+    def nested(self, name):
+        """Returns the fieldset for an included relationship, with its prefix stripped from the includes."""
+        prefix = name + "."
+        return Fieldset(include=[inc[len(prefix):] for inc in self.include if inc.startswith(prefix)])
+
+    def columns(self, obj, column_map):
+        """Serializes the wanted plain columns of `obj`; `column_map` is JSON key -> attribute name."""
+        return {
+            key: getattr(obj, attr)
+            for key, attr in column_map.items()
+            if self.fields is None or key in self.fields
+        }
+
+    def load_options(self, model, column_map, required=()):
+        """
+        Returns a `load_only` option restricting the SELECT to the wanted columns.
+        Args:
+            required (iterable): Attribute names that must always be loaded (keys used by relationships).
+        """
+        if self.fields is None:
+            return ()
+        attrs = {attr for key, attr in column_map.items() if key in self.fields}
+        attrs.update(required)
+        attrs.update(column.key for column in model.__mapper__.primary_key)
+        return (load_only(*(getattr(model, attr) for attr in sorted(attrs))),)
+
+
+def _split(value):
+    return [part.strip() for part in value.split(",") if part.strip()]
+
+
+def parse_fieldset(args, column_map, includes, default_include=()):
+    """
+    Builds a Fieldset from the `fields` and `include` query parameters.
+
+    Args:
+        args: The request args (`request.args`).
+        column_map (dict): JSON key -> attribute name for the resource's plain columns.
+        includes (dict): Expansion name -> tuple of the top-level keys it adds to the response.
+        default_include (iterable): Expansions used when `include` is not given.
+
+    Raises:
+        ValueError: If an unknown field or include is requested.
+    """
+    include_arg = args.get("include")
+    if include_arg is None:
+        include = set(default_include)
+    else:
+        include = set(_split(include_arg))
+        unknown = sorted(include - set(includes))
+        if unknown:
+            raise ValueError(f"Unknown include(s): {', '.join(unknown)}. Allowed: {', '.join(sorted(includes))}")
+        # 'roles.permissions' implies 'roles'
+        for name in list(include):
+            parts = name.split(".")
+            include.update(".".join(parts[:i]) for i in range(1, len(parts)))
+
+    fields = None
+    fields_arg = args.get("fields")
+    if fields_arg:
+        allowed = set(column_map)
+        for keys in includes.values():
+            allowed.update(keys)
+        fields = set(_split(fields_arg))
+        unknown = sorted(fields - allowed)
+        if unknown:
+            raise ValueError(f"Unknown field(s): {', '.join(unknown)}. Allowed: {', '.join(sorted(allowed))}")
+        # Explicitly included expansions are always part of the response
+        if include_arg is not None:
+            for name in include:
+                fields.update(includes.get(name, ()))
+        # Expansions whose keys were not asked for are not loaded
+        include = {name for name in include if fields.intersection(includes[name.split(".")[0]])}
+        fields = frozenset(fields)
+
+    return Fieldset(fields, include)
@@ -0,0 +1,165 @@
+from collections import OrderedDict
+from threading import Lock
+import math
+import time
+
+from flask import current_app, has_app_context
+from sqlalchemy import event, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.sql.util import find_tables
+
+from ..config import db
+
+COUNT_MODES = ("exact", "estimated", "none")
+
+DEFAULT_COUNT_CACHE_SIZE = 512
+DEFAULT_COUNT_CACHE_TTL = 30  # seconds; bounds staleness from writes made by other processes
+
+# Per-table write counters, bumped by every INSERT/UPDATE/DELETE this process runs
+_table_versions = {}
+
+# (sql, params) -> (count, table versions it was computed under, expires_at), least recently used first
+_counts = OrderedDict()
+_lock = Lock()
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _bump_table_version(conn, cursor, statement, parameters, context, executemany):
+    if context is None or not (context.isinsert or context.isupdate or context.isdelete):
+        return
+    table = getattr(getattr(context, "compiled", None), "statement", None)
+    table = getattr(table, "table", None)
+    if table is not None:
+        with _lock:
+            _table_versions[table.name] = _table_versions.get(table.name, 0) + 1
+
+
+def parse_count_mode(args, default="exact"):
+    """
+    Reads the `count` query parameter (exact, estimated or none).
+    Raises ValueError for other values.
+    """
+    mode = args.get("count", default).lower()
+    if mode not in COUNT_MODES:
+        raise ValueError(f"Invalid count mode '{mode}'. Use one of: {', '.join(COUNT_MODES)}.")
+    return mode
+
+
+def _config(key, default):
+    return current_app.config.get(key, default) if has_app_context() else default
+
+
+def _versions_for(table_names):
+    return tuple((name, _table_versions.get(name, 0)) for name in table_names)
+
+
+def _cache_key(statement):
+    compiled = statement.compile(dialect=db.engine.dialect)
+    return str(compiled), tuple(sorted((key, repr(value)) for key, value in compiled.params.items()))
+
+
+def _estimate_table_rows(table_name):
+    """Row count from the planner statistics (sqlite_stat1 after ANALYZE, pg_class), or None."""
+    dialect = db.engine.dialect.name
+    try:
+        if dialect == "sqlite":
+            stat = db.session.execute(
+                text("SELECT stat FROM sqlite_stat1 WHERE tbl = :table LIMIT 1"), {"table": table_name}
+            ).scalar()
+            return int(stat.split()[0]) if stat else None
+        if dialect == "postgresql":
+            estimate = db.session.execute(
+                text("SELECT reltuples::bigint FROM pg_class WHERE relname = :table"), {"table": table_name}
+            ).scalar()
+            return estimate if estimate is not None and estimate >= 0 else None
+    except SQLAlchemyError:
+        # No statistics table yet (e.g. ANALYZE never ran)
+        db.session.rollback()
+    return None
+
+
+def count_query(query, mode="exact", refresh=False):
+    """
+    Counts the rows of a (filtered) query.
+
+    Exact counts are cached per normalized statement (SQL + parameters) until one of
+    the tables it reads is written to by this process, or COUNT_CACHE_TTL seconds pass.
+
+    Args:
+        mode (str): 'exact' runs COUNT(*) unless a valid cached count exists;
+                    'estimated' prefers planner statistics for unfiltered single-table
+                    queries, then any cached count even if stale, then an exact count;
+                    'none' returns None.
+        refresh (bool): Ignore the cached count and store a freshly computed one.
+    """
+    if mode == "none":
+        return None
+
+    statement = query.order_by(None).statement
+    table_names = sorted({table.name for table in find_tables(statement, include_joins=True)})
+    key = _cache_key(statement)
+    now = time.monotonic()
+
+    with _lock:
+        versions = _versions_for(table_names)
+        entry = None if refresh else _counts.get(key)
+        if entry is not None:
+            count, entry_versions, expires_at = entry
+            if mode == "estimated" or (entry_versions == versions and expires_at > now):
+                _counts.move_to_end(key)
+                return count
+
+    if mode == "estimated" and not refresh and len(table_names) == 1 and statement.whereclause is None:
+        estimate = _estimate_table_rows(table_names[0])
+        if estimate is not None:
+            return estimate
+
+    count = query.order_by(None).count()
+    ttl = _config("COUNT_CACHE_TTL", DEFAULT_COUNT_CACHE_TTL)
+    max_size = _config("COUNT_CACHE_SIZE", DEFAULT_COUNT_CACHE_SIZE)
+    with _lock:
+        _counts[key] = (count, versions, now + ttl)
+        _counts.move_to_end(key)
+        while len(_counts) > max_size:
+            _counts.popitem(last=False)
+    return count
+
+
+def paginate(query, page, per_page, count="exact"):
+    """
+    Offset pagination with a cached, estimated or skipped total.
+
+    Returns (items, pagination metadata) with the same metadata keys the endpoints
+    have always returned; total_items and total_pages are None when count='none'.
+    """
+    # Same clamping as Flask-SQLAlchemy's paginate(error_out=False)
+    page = page if page and page > 0 else 1
+    per_page = per_page if per_page and per_page > 0 else 20
+
+    # One extra row tells us whether there is a next page, whatever the (cached) total says
+    items = query.offset((page - 1) * per_page).limit(per_page + 1).all()
+    has_next = len(items) > per_page
+    items = items[:per_page]
+    total = total_pages = None
+    if count != "none":
+        total = count_query(query, count)
+        seen = (page - 1) * per_page + len(items)
+        # A cached count that contradicts this page is stale (e.g. another worker wrote rows);
+        # the last page gives the exact total, an empty page only when it is the first
+        stale = total <= seen if has_next else (items or page == 1) and total != seen
+        if count == "exact" and stale:
+            total = count_query(query, count, refresh=True)
+        total_pages = math.ceil(total / per_page) if total else 0
+
+    metadata = {
+        "total_items": total,
+        "total_pages": total_pages,
+        "current_page": page,
+        "per_page": per_page,
+        "has_next": has_next,
+        "has_prev": page > 1,
+        "next_num": page + 1 if has_next else None,
+        "prev_num": page - 1 if page > 1 else None,
+    }
+    return items, metadata
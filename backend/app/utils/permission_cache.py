@@ -0,0 +1,171 @@
+from threading import Lock
+
+from flask import g, has_request_context
+from sqlalchemy import select
+
+from ..config import db
+from . import cache_versions
+
+_lock = Lock()
+
+# Interning table for the current version, see _RbacSnapshot
+_snapshot = None
+
+# (user_id, rbac_version) -> permission bitmask
+_user_masks = {}
+_user_masks_version = None
+
+
+class _RbacSnapshot:
+    """
+    Interned view of the RBAC tables for one RBAC version.
+
+    Permissions get dense bit positions in primary key order, so a set of
+    permissions is a plain int no wider than the permission count, and the same
+    mask means the same rights in every process at that version. Masks are only
+    meaningful under the version they were built for (every cache is keyed by it).
+    """
+    __slots__ = ("version", "bits", "names", "role_masks")
+
+    def __init__(self, version, bits, role_masks):
+        self.version = version
+        self.bits = bits  # permission name -> single-bit mask
+        self.names = {bit: name for name, bit in bits.items()}
+        self.role_masks = role_masks  # role id -> OR of its permission bits
+
+
+def get_rbac_version():
+    """
+    Returns the current RBAC version number.
+    It is persisted in the `cache_versions` table, so a change made by any worker
+    process invalidates the caches of all of them.
+    """
+    return cache_versions.get_version(cache_versions.RBAC)
+
+
+def bump_rbac_version():
+    """
+    Marks every cached permission set and mask as stale.
+    Call this before committing any change to roles, permissions or role
+    assignments; the bump is part of the same transaction.
+    """
+    cache_versions.bump_version(cache_versions.RBAC)
+
+
+def _load_snapshot(version):
+    """Builds the permission interning table and role masks with two queries."""
+    from ..models import Permission, role_permissions  # Avoid circular import with models
+
+    # Read from the primary: a lagging replica would cache revoked rights under the new version
+    primary = {"bind": db.engine}
+    permissions = db.session.execute(
+        select(Permission.id, Permission.name).order_by(Permission.id), bind_arguments=primary
+    ).all()
+    id_bits = {permission_id: 1 << position for position, (permission_id, _) in enumerate(permissions)}
+    bits = {name: id_bits[permission_id] for permission_id, name in permissions}
+    role_masks = {}
+    for role_id, permission_id in db.session.execute(
+        select(role_permissions.c.role_id, role_permissions.c.permission_id), bind_arguments=primary
+    ):
+        role_masks[role_id] = role_masks.get(role_id, 0) | id_bits.get(permission_id, 0)
+    return _RbacSnapshot(version, bits, role_masks)
+
+
+def _get_snapshot():
+    global _snapshot
+    snapshot = _snapshot
+    version = get_rbac_version()
+    if snapshot is None or snapshot.version != version:
+        snapshot = _load_snapshot(version)
+        with _lock:
+            _snapshot = snapshot
+    return snapshot
+
+
+def permission_bit(permission_name):
+    """Returns the bitmask for a single permission name, or 0 if the permission does not exist."""
+    return _get_snapshot().bits.get(permission_name, 0)
+
+
+def permission_mask(*permission_names):
+    """Returns the OR of the bits of several permission names."""
+    bits = _get_snapshot().bits
+    mask = 0
+    for name in permission_names:
+        mask |= bits.get(name, 0)
+    return mask
+
+
+def get_role_mask(role_id):
+    """Returns the precomputed permission bitmask of a role."""
+    return _get_snapshot().role_masks.get(role_id, 0)
+
+
+def mask_to_names(mask):
+    """Expands a permission bitmask back into a frozenset of permission names."""
+    names = _get_snapshot().names
+    result = []
+    while mask:
+        bit = mask & -mask
+        name = names.get(bit)
+        if name is not None:
+            result.append(name)
+        mask ^= bit
+    return frozenset(result)
+
+
+def _load_user_mask(user_id):
+    """ORs together the masks of all roles assigned to a user."""
+    from ..models import user_roles  # Avoid circular import with models
+
+    role_masks = _get_snapshot().role_masks
+    mask = 0
+    for role_id in db.session.execute(
+        select(user_roles.c.role_id).where(user_roles.c.user_id == user_id),
+        bind_arguments={"bind": db.engine},  # From the primary, like the snapshot
+    ).scalars():
+        mask |= role_masks.get(role_id, 0)
+    return mask
+
+
+def get_permission_mask(user_id):
+    """
+    Returns the effective permission bitmask of a user.
+
+    The mask is memoized for the current request on `flask.g` and shared across
+    requests in a process-wide cache keyed by (user_id, rbac_version).
+    """
+    global _user_masks_version
+    version = get_rbac_version()
+    key = (user_id, version)
+
+    request_cache = None
+    if has_request_context():
+        request_cache = g.setdefault('_permission_masks', {})
+        mask = request_cache.get(key)
+        if mask is not None:
+            return mask
+
+    mask = _user_masks.get(key)
+    if mask is None:
+        mask = _load_user_mask(user_id)
+        with _lock:
+            if _user_masks_version != version:
+                # Masks built under older versions can never be served again
+                _user_masks.clear()
+                _user_masks_version = version
+            _user_masks[key] = mask
+
+    if request_cache is not None:
+        request_cache[key] = mask
+    return mask
+
+
+def get_permission_names(user_id):
+    """Returns the effective permission names of a user as a frozenset."""
+    return mask_to_names(get_permission_mask(user_id))
+
+
+def has_permission(user_id, permission_name):
+    """Checks a single permission with one dict lookup and one AND."""
+    return bool(get_permission_mask(user_id) & permission_bit(permission_name))
@@ -0,0 +1,126 @@
+from collections import OrderedDict
+from threading import Lock
+import time
+
+from flask import current_app
+from sqlalchemy import select
+
+from ..config import db
+from . import permission_cache
+
+# user_id -> (Principal, rbac_version, expires_at), least recently used first
+_principals = OrderedDict()
+_lock = Lock()
+
+DEFAULT_CACHE_SIZE = 1024
+DEFAULT_CACHE_TTL = 60  # seconds
+
+
+class Principal:
+    """
+    Immutable snapshot of an authenticated user, used as Flask-Login's `current_user`.
+
+    It carries only what read handlers need (id, username, role ids and the
+    permission bitmask), so permission checks never touch the ORM. Handlers
+    that need the full `User` row call `load_user()`.
+    """
+    __slots__ = ("id", "username", "role_ids", "permission_mask")
+
+    is_authenticated = True
+    is_active = True
+    is_anonymous = False
+
+    def __init__(self, id, username, role_ids, permission_mask):
+        object.__setattr__(self, "id", id)
+        object.__setattr__(self, "username", username)
+        object.__setattr__(self, "role_ids", role_ids)
+        object.__setattr__(self, "permission_mask", permission_mask)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("Principal is immutable")
+
+    def get_id(self):
+        return str(self.id)
+
+    @property
+    def permissions(self):
+        """The effective permission names as a frozenset."""
+        return permission_cache.mask_to_names(self.permission_mask)
+
+    def get_permission_names(self):
+        return self.permissions
+
+    def has_permission(self, permission_name):
+        """Check if the user has a specific permission via their roles."""
+        return bool(self.permission_mask & permission_cache.permission_bit(permission_name))
+
+    def load_user(self, *options):
+        """
+        Loads the full ORM `User` for this principal (for write handlers and full serialization).
+        Args:
+            *options: Loader options, e.g. `User.serialization_options()` before calling `to_json`.
+        """
+        from ..models import User  # Avoid circular import with models
+        return db.session.get(User, self.id, options=options)
+
+    def __eq__(self, other):
+        return isinstance(other, Principal) and other.id == self.id
+
+    def __hash__(self):
+        return hash(self.id)
+
+    def __repr__(self):
+        return f"<Principal {self.username}>"
+
+
+def _fetch_principal(user_id):
+    """Loads a principal with a single query; role masks come from the RBAC interning table."""
+    from ..models import User, user_roles  # Avoid circular import with models
+
+    rows = db.session.execute(
+        select(User.id, User.username, user_roles.c.role_id)
+        .outerjoin(user_roles, user_roles.c.user_id == User.id)
+        .where(User.id == user_id),
+        bind_arguments={"bind": db.engine},  # Role assignments from the primary, like the RBAC version
+    ).all()
+    if not rows:
+        return None
+
+    role_ids = tuple(sorted(row.role_id for row in rows if row.role_id is not None))
+    mask = 0
+    for role_id in role_ids:
+        mask |= permission_cache.get_role_mask(role_id)
+    return Principal(rows[0].id, rows[0].username, role_ids, mask)
+
+
+def load_principal(user_id):
+    """
+    Returns the `Principal` for a user id, or None if the user does not exist.
+
+    Principals are kept in a small LRU cache with a TTL; entries built under an
+    older RBAC version are discarded.
+    """
+    version = permission_cache.get_rbac_version()
+    now = time.monotonic()
+
+    with _lock:
+        entry = _principals.get(user_id)
+        if entry is not None:
+            principal, entry_version, expires_at = entry
+            if entry_version == version and expires_at > now:
+                _principals.move_to_end(user_id)
+                return principal
+            del _principals[user_id]
+
+    principal = _fetch_principal(user_id)
+    if principal is None:
+        return None
+
+    max_size = current_app.config.get("PRINCIPAL_CACHE_SIZE", DEFAULT_CACHE_SIZE)
+    ttl = current_app.config.get("PRINCIPAL_CACHE_TTL", DEFAULT_CACHE_TTL)
+    with _lock:
+        if version == permission_cache.get_rbac_version():
+            _principals[user_id] = (principal, version, now + ttl)
+            while len(_principals) > max_size:
+                _principals.popitem(last=False)
+    return principal
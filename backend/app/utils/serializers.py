@@ -0,0 +1,57 @@
+class RowSerializer:
+    """
+    A compiled row -> dict function together with the columns it expects, in order.
+
+    Select exactly `columns` (e.g. `query.with_entities(*serializer.columns)`) and
+    pass each result row (a Core `Row`, a tuple or any sequence) to `serialize`.
+    No ORM instances are built, so read-only endpoints skip the identity map.
+    """
+    __slots__ = ("columns", "serialize")
+
+    def __init__(self, columns, serialize):
+        self.columns = columns
+        self.serialize = serialize
+
+    def __call__(self, row):
+        return self.serialize(row)
+
+
+def compile_row_serializer(fields, name="serialize_row"):
+    """
+    Generates a specialized function that builds one dict literal from row positions.
+
+    Args:
+        fields (iterable): (json_key, source, transform) triples. `source` is a column
+            expression or a tuple of them; `transform` is None (copy the value) or a
+            callable that receives the source value(s) as positional arguments.
+        name (str): Name of the generated function, shown in tracebacks and profiles.
+
+    Returns:
+        RowSerializer
+    """
+    columns = []
+    positions = {}
+    namespace = {}
+    entries = []
+
+    def position(column):
+        key = id(column)
+        if key not in positions:
+            positions[key] = len(columns)
+            columns.append(column)
+        return positions[key]
+
+    for index, (json_key, source, transform) in enumerate(fields):
+        sources = source if isinstance(source, tuple) else (source,)
+        args = ", ".join(f"row[{position(column)}]" for column in sources)
+        if transform is None:
+            expression = args
+        else:
+            transform_name = f"_transform_{index}"
+            namespace[transform_name] = transform
+            expression = f"{transform_name}({args})"
+        entries.append(f"        {json_key!r}: {expression},")
+
+    source_code = "\n".join([f"def {name}(row):", "    return {", *entries, "    }"])
+    exec(compile(source_code, f"<row serializer {name}>", "exec"), namespace)
+    return RowSerializer(tuple(columns), namespace[name])
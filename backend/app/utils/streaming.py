@@ -0,0 +1,109 @@
+import zlib
+from contextlib import contextmanager
+from itertools import islice
+
+from flask import Response, current_app, request, stream_with_context
+
+DEFAULT_CHUNK_SIZE = 500
+
+NDJSON_MIMETYPE = "application/x-ndjson"
+
+
+def wants_ndjson():
+    """True if the client asked for newline-delimited JSON (`format=ndjson` or an NDJSON Accept header)."""
+    if request.args.get("format", "").lower() == "ndjson":
+        return True
+    return request.accept_mimetypes.best == NDJSON_MIMETYPE
+
+
+def iter_chunks(query, chunk_size=None):
+    """
+    Yields lists of at most `chunk_size` ORM objects from `query`.
+    Rows are fetched with `yield_per`, so only one chunk is held in memory at a time.
+    """
+    chunk_size = chunk_size or current_app.config.get("STREAM_CHUNK_SIZE", DEFAULT_CHUNK_SIZE)
+    rows = iter(query.yield_per(chunk_size))
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def stream_items(query, serialize_chunk, chunk_size=None):
+    """
+    Streams every row of `query` as `{"items": [...]}` (or NDJSON, one item per line).
+
+    Args:
+        query: The (filtered) query to stream.
+        serialize_chunk (callable): Turns a list of ORM objects into a list of JSON-serializable dicts;
+                                    it gets a whole chunk so it can batch any per-row lookups.
+        chunk_size (int, optional): Rows per chunk, defaults to the STREAM_CHUNK_SIZE config.
+    """
+    json_provider = current_app.json
+    ndjson = wants_ndjson()
+
+    def dumps(item):
+        # Same encoder settings as jsonify, in compact form
+        return json_provider.dumps(item, separators=(",", ":"))
+
+    def generate():
+        if ndjson:
+            for chunk in iter_chunks(query, chunk_size):
+                yield "".join(dumps(item) + "\n" for item in serialize_chunk(chunk))
+            return
+
+        yield '{"items":['
+        first = True
+        for chunk in iter_chunks(query, chunk_size):
+            items = ",".join(dumps(item) for item in serialize_chunk(chunk))
+            if items:
+                yield items if first else "," + items
+                first = False
+        yield "]}\n"
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype=NDJSON_MIMETYPE if ndjson else "application/json",
+    )
+
+
+def wants_gzip():
+    """True if the client accepts a gzip Content-Encoding."""
+    return "gzip" in request.accept_encodings
+
+
+def gzip_chunks(chunks, level=6):
+    """
+    Compresses a stream of str chunks into gzip member data as it goes,
+    holding at most one chunk (plus zlib's window) in memory.
+    """
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)  # wbits=31: gzip header and trailer
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode("utf-8"))
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+@contextmanager
+def read_snapshot(engine):
+    """
+    A connection of its own (not the request session's) holding one read-only
+    transaction, so every statement run on it sees the same snapshot.
+
+    SQLite: an explicit deferred BEGIN (the driver only opens transactions for writes);
+    the snapshot does not block writers in WAL mode. Other backends: REPEATABLE READ.
+    """
+    with engine.connect() as connection:
+        if connection.dialect.name == "sqlite":
+            connection.exec_driver_sql("BEGIN")
+        else:
+            connection = connection.execution_options(isolation_level="REPEATABLE READ")
+            connection.begin()
+            if connection.dialect.name == "postgresql":
+                connection.exec_driver_sql("SET TRANSACTION READ ONLY")
+        try:
+            yield connection
+        finally:
+            connection.rollback()
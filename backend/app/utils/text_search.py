@@ -0,0 +1,141 @@
+from flask import current_app, has_app_context
+from sqlalchemy import Index, and_, event, func, literal, select, text
+from sqlalchemy.schema import CreateIndex
+from sqlalchemy.sql import column as sql_column, table as sql_table
+
+from ..config import db
+
+MATCH_MODES = ("substring", "prefix")
+DEFAULT_MATCH_MODE = "substring"
+
+# Trigrams only exist for 3+ characters; shorter substring terms fall back to ILIKE
+MIN_TRIGRAM_TERM = 3
+
+# Sorts after every character a real name can contain, so [term, term + MAX_CHAR) is "starts with term"
+_MAX_CHAR = "\U0010ffff"
+
+# table name -> searchable column names
+_search_columns = {}
+
+# (engine url, table name) -> whether the trigram index exists; checked once per process
+_available = {}
+
+
+def register_search_index(table, *column_names):
+    """
+    Makes `column_names` of `table` searchable without a table scan:
+
+    - prefix matches use an index on lower(column) (all backends);
+    - substring matches use an FTS5 trigram index, `<table>_search` (SQLite).
+
+    The indexes are created by create_all, also for tables that already exist.
+    """
+    for name in column_names:
+        Index(f"ix_{table.name}_{name}_lower", func.lower(table.c[name]))
+    _search_columns[table.name] = column_names
+
+
+def _trigram_table(table_name):
+    return f"{table_name}_search"
+
+
+def _trigram_ddl(table_name, column_names):
+    search = _trigram_table(table_name)
+    columns = ", ".join(column_names)
+    new_values = ", ".join(f"new.{name}" for name in column_names)
+    old_values = ", ".join(f"old.{name}" for name in column_names)
+    return (
+        f"""
+        CREATE VIRTUAL TABLE IF NOT EXISTS {search} USING fts5(
+            {columns}, content = '{table_name}', content_rowid = 'id', tokenize = 'trigram'
+        )
+        """,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS {search}_insert AFTER INSERT ON {table_name} BEGIN
+            INSERT INTO {search} (rowid, {columns}) VALUES (new.id, {new_values});
+        END
+        """,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS {search}_delete AFTER DELETE ON {table_name} BEGIN
+            INSERT INTO {search} ({search}, rowid, {columns}) VALUES ('delete', old.id, {old_values});
+        END
+        """,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS {search}_update AFTER UPDATE OF {columns} ON {table_name} BEGIN
+            INSERT INTO {search} ({search}, rowid, {columns}) VALUES ('delete', old.id, {old_values});
+            INSERT INTO {search} (rowid, {columns}) VALUES (new.id, {new_values});
+        END
+        """,
+    )
+
+
+def _table_exists(connection, name):
+    return connection.execute(
+        text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"), {"name": name}
+    ).first() is not None
+
+
+@event.listens_for(db.metadata, "after_create")
+def ensure_search_indexes(target, connection, **kw):
+    """Creates missing lower() indexes and (SQLite) trigram indexes with their sync triggers."""
+    for table_name in _search_columns:
+        for index in target.tables[table_name].indexes:
+            # Reflection skips expression indexes, so checkfirst cannot see them
+            connection.execute(CreateIndex(index, if_not_exists=True))
+
+    if connection.dialect.name != "sqlite":
+        return
+    for table_name, column_names in _search_columns.items():
+        search = _trigram_table(table_name)
+        created = not _table_exists(connection, search)
+        for statement in _trigram_ddl(table_name, column_names):
+            connection.execute(text(statement))
+        if created:
+            # Index the rows that existed before the search table did
+            connection.execute(text(f"INSERT INTO {search} ({search}) VALUES ('rebuild')"))
+        _available[(str(connection.engine.url), table_name)] = True
+
+
+def _trigram_available(table_name):
+    engine = db.engine
+    key = (str(engine.url), table_name)
+    if key not in _available:
+        if engine.dialect.name != "sqlite" or table_name not in _search_columns:
+            _available[key] = False
+        else:
+            with engine.connect() as connection:
+                _available[key] = _table_exists(connection, _trigram_table(table_name))
+    return _available[key]
+
+
+def parse_match_mode(args):
+    """
+    Reads the `match` query parameter (substring or prefix); defaults to the
+    SEARCH_MATCH_MODE config. Raises ValueError for other values.
+    """
+    default = current_app.config.get("SEARCH_MATCH_MODE", DEFAULT_MATCH_MODE) if has_app_context() else DEFAULT_MATCH_MODE
+    mode = args.get("match", default).lower()
+    if mode not in MATCH_MODES:
+        raise ValueError(f"Invalid match mode '{mode}'. Use one of: {', '.join(MATCH_MODES)}.")
+    return mode
+
+
+def text_filter(attribute, term, mode=DEFAULT_MATCH_MODE):
+    """
+    Case-insensitive search predicate for a column registered with `register_search_index`.
+
+    'prefix' is a range on lower(column), served by its expression index.
+    'substring' keeps the ILIKE '%term%' semantics, answered by the trigram index when available.
+    """
+    column = attribute.expression
+    if mode == "prefix":
+        lowered = func.lower(column)
+        low = func.lower(literal(term))
+        return and_(lowered >= low, lowered < low.concat(_MAX_CHAR))
+
+    table_name = column.table.name
+    if len(term) >= MIN_TRIGRAM_TERM and _trigram_available(table_name):
+        search = sql_table(_trigram_table(table_name), sql_column("rowid"), sql_column(column.name))
+        matches = select(search.c.rowid).where(search.c[column.name].like(f"%{term}%"))
+        return column.table.c.id.in_(matches)
+    return column.ilike(f"%{term}%")
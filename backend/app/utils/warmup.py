@@ -0,0 +1,62 @@
+from flask_login import login_user
+from sqlalchemy import select
+
+from ..config import db
+from . import cache_versions, permission_cache
+from .audit_search import search_index_available
+from .principal import Principal
+
+# Read endpoints served on most page loads; warming them compiles and caches their statements.
+# Lazily loaded blueprints (see LAZY_BLUEPRINTS) are left out so workers boot without them.
+WARMUP_REQUESTS = (
+    ("/api/app/roles", {}),
+    ("/api/app/permissions", {}),
+    ("/api/app/categories", {}),
+    ("/api/app/users", {}),
+)
+
+
+def _warmup_principal():
+    """An in-process principal holding every permission, so warm-up requests pass the permission checks."""
+    from ..models import Permission  # Avoid circular import
+
+    names = db.session.execute(select(Permission.name)).scalars().all()
+    return Principal(0, "warmup", (), permission_cache.permission_mask(*names))
+
+
+def warm_up(app):
+    """
+    Prepares a freshly started worker before it takes traffic: opens its first database
+    connection, loads the RBAC snapshot and cache versions, and runs the hot read
+    endpoints once so their SQL is compiled into the engine's statement cache.
+
+    Returns the number of warm-up requests that succeeded; failures (e.g. before the
+    schema exists) are logged and do not stop the worker.
+    """
+    adapter = app.url_map.bind("localhost")
+    warmed = 0
+    with app.app_context():
+        try:
+            cache_versions.expire_local_versions()
+            principal = _warmup_principal()
+            search_index_available()
+        except Exception as e:
+            app.logger.warning(f"Worker warm-up skipped: {e}")
+            db.session.remove()
+            return warmed
+
+    for path, query in WARMUP_REQUESTS:
+        try:
+            endpoint, view_args = adapter.match(path, method="GET")
+        except Exception:
+            continue  # Blueprint not registered
+        with app.test_request_context(path, query_string=query):
+            try:
+                login_user(principal)
+                app.view_functions[endpoint](**view_args)
+                warmed += 1
+            except Exception as e:
+                app.logger.warning(f"Warm-up request {path} failed: {e}")
+            finally:
+                db.session.rollback()
+    return warmed
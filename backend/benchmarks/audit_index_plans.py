@@ -0,0 +1,126 @@
+"""
+Shared helpers for the audit log query plan checks: the filter and sort combinations
+the list endpoint supports, a seeded SQLite app, and EXPLAIN QUERY PLAN of each
+SELECT a list request issues. Used by tests/test_audit_indexes.py (small table) and
+benchmarks/check_audit_indexes.py (large table, with timings).
+"""
+import itertools
+import re
+import time
+from datetime import datetime, timedelta
+
+from flask import Flask
+from flask_login import LoginManager, login_user
+from sqlalchemy import event, insert
+
+from app.config import db
+from app.models import AuditLog, Permission, Role, User, role_permissions, user_roles
+
+USERS = 500
+ENTITY_TYPES = ("Role", "Permission", "Category", "User", "Contact", "Session")
+ACTION_TYPES = ("CREATE", "UPDATE", "DELETE", "LOGIN")
+START = datetime(2026, 1, 1)
+BATCH = 50000
+
+# Every filter the UI sends, alone; combinations are checked against each sort
+FILTERS = {
+    "none": {},
+    "entity_type": {"entity_type": "Role"},
+    "entity": {"entity_type": "Role", "entity_id": "42"},
+    "action_type": {"action_type": "UPDATE"},
+    "user_id": {"user_id": "7"},
+    "date range": {"from_date": "2026-01-10", "to_date": "2026-01-12"},
+    "entity + date range": {"entity_type": "Role", "entity_id": "42", "from_date": "2026-01-10"},
+}
+SORTS = ("timestamp", "user", "action", "entity")
+PAGINATION = {"offset": {"page": "3"}, "cursor": {"pagination": "cursor"}}
+
+COMBINATIONS = list(itertools.product(FILTERS, SORTS, ("desc", "asc"), PAGINATION))
+
+# How a plan reads audit_logs: SCAN (every row, in table or index order) or SEARCH (an index range)
+_SCAN = re.compile(r"^SCAN audit_logs\b(?P<index>.*USING .*INDEX)?")
+_FULL_SORT = re.compile(r"^USE TEMP B-TREE FOR ORDER BY$")
+
+
+def make_app():
+    """A bare app on an in-memory SQLite database (the audit log view is called directly)."""
+    app = Flask(__name__)
+    app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite://"
+    app.config["SECRET_KEY"] = "check-audit-indexes"
+    db.init_app(app)
+    LoginManager(app)
+    return app
+
+
+def seed(rows):
+    db.session.execute(insert(User), [
+        {"id": i, "username": f"user{i}", "email": f"user{i}@example.com", "password_hash": "x"}
+        for i in range(1, USERS + 1)
+    ])
+    db.session.execute(insert(Permission), [{"id": 1, "name": "audit.read.all"}])
+    db.session.execute(insert(Role), [{"id": 1, "name": "Auditor"}])
+    db.session.execute(insert(role_permissions), [{"role_id": 1, "permission_id": 1}])
+    db.session.execute(insert(user_roles), [{"user_id": 1, "role_id": 1}])
+    for start in range(0, rows, BATCH):
+        db.session.execute(insert(AuditLog), [
+            {
+                "user_id": i % USERS + 1,
+                "timestamp": START + timedelta(seconds=i * 30),
+                "action_type": ACTION_TYPES[i % len(ACTION_TYPES)],
+                "entity_type": ENTITY_TYPES[i % len(ENTITY_TYPES)],
+                "entity_id": i % 1000,
+                "description": f"event {i}",
+            }
+            for i in range(start, min(start + BATCH, rows))
+        ])
+    db.session.commit()
+
+
+def plan(connection, statement, parameters):
+    rows = connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters).all()
+    return [row[-1] for row in rows]
+
+
+def problems(lines):
+    """
+    Plan lines showing a full scan: a table scan of audit_logs, or an index scan whose
+    rows all have to be sorted. Sorting rows found with an index SEARCH is fine, and so
+    is walking an index in ORDER BY order (LIMIT stops it early).
+    """
+    scans = [line for line in lines if _SCAN.match(line)]
+    bad = [line for line in scans if not _SCAN.match(line).group("index")]
+    if scans and not bad:
+        bad = [line for line in lines if _FULL_SORT.match(line)]
+    return bad
+
+
+def explain_list_request(app, filter_name, sort_by, sort_order, pagination):
+    """
+    Calls the audit log list view as the auditor (user 1) inside `app`'s app context.
+    Returns ([(SELECT statement on audit_logs, its plan lines)], seconds the request took).
+    """
+    from app.api.audit_logs import get_audit_logs
+
+    query = {**FILTERS[filter_name], **PAGINATION[pagination], "sort_by": sort_by, "sort_order": sort_order}
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append((statement, parameters))
+
+    event.listen(db.engine, "before_cursor_execute", record)
+    try:
+        with app.test_request_context("/api/app/audit-logs", query_string=query):
+            login_user(db.session.get(User, 1))
+            started = time.perf_counter()
+            response = get_audit_logs()
+            elapsed = time.perf_counter() - started
+            status = response[1] if isinstance(response, tuple) else response.status_code
+            if status != 200:
+                raise RuntimeError(f"{query} returned {status}")
+    finally:
+        event.remove(db.engine, "before_cursor_execute", record)
+
+    executed = [(s, p) for s, p in statements if s.lstrip().upper().startswith("SELECT") and "audit_logs" in s]
+    with db.engine.connect() as connection:
+        plans = [(statement, plan(connection, statement, parameters)) for statement, parameters in executed]
+    return plans, elapsed
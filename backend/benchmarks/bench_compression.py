@@ -0,0 +1,121 @@
+"""
+Benchmark: response compression (app.utils.compression) on the large JSON endpoints.
+
+Seeds a temporary SQLite database with seed_db.py plus `--users` users, `--roles` roles
+and `--permissions` permissions, logs in as admin and requests each endpoint with every
+available Content-Encoding. Prints body sizes and best-of request times, first with a
+cold compression cache and then warm (the cache only applies to non-streamed bodies).
+
+Usage:
+    python benchmarks/bench_compression.py [--users 500] [--roles 50] [--permissions 300] [--repeat 3]
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+BACKEND = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+# Add the backend directory to the system path to allow imports like app.config
+sys.path.insert(0, BACKEND)
+
+ENDPOINTS = (
+    "/api/app/users?get_all=true",
+    "/api/app/permissions?get_all=true&include_usage=true",
+    "/api/app/categories?include_affected_permissions=true",
+)
+
+
+def seed(users, roles, permissions):
+    from sqlalchemy import insert, select
+
+    from app.config import db
+    from app.models import Category, Permission, Role, User, role_permissions, user_roles
+
+    categories = db.session.execute(select(Category.id)).scalars().all()
+    first_permission = db.session.execute(select(db.func.max(Permission.id))).scalar() + 1
+    db.session.execute(insert(Permission), [
+        {"id": first_permission + i, "name": f"bench.permission.{i}", "description": f"Benchmark permission number {i}.",
+         "category_id": categories[i % len(categories)], "status": "active"}
+        for i in range(permissions)
+    ])
+    first_role = db.session.execute(select(db.func.max(Role.id))).scalar() + 1
+    db.session.execute(insert(Role), [
+        {"id": first_role + i, "name": f"Bench role {i}", "description": f"Benchmark role number {i}."}
+        for i in range(roles)
+    ])
+    db.session.execute(insert(role_permissions), [
+        {"role_id": first_role + i, "permission_id": first_permission + (i * 7 + j) % permissions}
+        for i in range(roles) for j in range(permissions // 5)
+    ])
+    first_user = db.session.execute(select(db.func.max(User.id))).scalar() + 1
+    db.session.execute(insert(User), [
+        {"id": first_user + i, "username": f"bench{i}", "email": f"bench{i}@example.com", "password_hash": "x"}
+        for i in range(users)
+    ])
+    db.session.execute(insert(user_roles), [
+        {"user_id": first_user + i, "role_id": first_role + (i + k) % roles}
+        for i in range(users) for k in range(2)
+    ])
+    db.session.commit()
+
+
+def timed_get(client, url, encoding, repeat):
+    headers = {"Accept-Encoding": encoding} if encoding else {}
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        response = client.get(url, headers=headers)
+        body = response.get_data()  # Streamed bodies are produced (and compressed) here
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    assert response.status_code == 200, f"{url} returned {response.status_code}"
+    # Streamed responses are sent without a Content-Length
+    return best, len(body), response.headers.get("Content-Encoding"), "Content-Length" not in response.headers
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=500)
+    parser.add_argument("--roles", type=int, default=50)
+    parser.add_argument("--permissions", type=int, default=300)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp()
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(directory, 'bench.db')}"
+    subprocess.run([sys.executable, "seed_db.py"], cwd=BACKEND, check=True, capture_output=True)
+
+    from app import register_blueprints
+    from app.config import create_app
+    from app.utils.compression import available_encodings
+
+    app = create_app()
+    register_blueprints(app)
+    app.config["SESSION_COOKIE_SECURE"] = False
+    with app.app_context():
+        seed(args.users, args.roles, args.permissions)
+
+    client = app.test_client()
+    login = client.post("/api/auth/login", json={"identifier": "admin", "password": "adminpassword"})
+    assert login.status_code == 200, "admin login failed"
+
+    print(f"{args.users} users, {args.roles} roles, {args.permissions} permissions; "
+          f"encodings available: {', '.join(available_encodings())}\n")
+    for url in ENDPOINTS:
+        identity_time, identity_size, _, streamed = timed_get(client, url, None, args.repeat)
+        print(f"{url} ({'streamed' if streamed else 'buffered'})")
+        print(f"  {'identity':10s}{identity_size:10d} B{'':9s}{identity_time * 1000:9.2f} ms")
+        for encoding in available_encodings():
+            cold_time, size, used, _ = timed_get(client, url, encoding, 1)
+            warm_time, _, _, _ = timed_get(client, url, encoding, args.repeat)
+            assert used == encoding, f"{url}: asked for {encoding}, got {used}"
+            print(f"  {encoding:10s}{size:10d} B{identity_size / size:7.1f}x{cold_time * 1000:9.2f} ms"
+                  f"  {warm_time * 1000:7.2f} ms warm")
+        print()
+
+
+if __name__ == "__main__":
+    main()
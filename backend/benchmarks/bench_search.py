@@ -0,0 +1,103 @@
+"""
+Benchmark: user search with ILIKE '%term%' vs. the indexed prefix and substring
+matches from app.utils.text_search.
+
+Seeds an in-memory SQLite database with `--users` users (1M by default; building
+the indexes takes a while), checks every mode returns the same rows as ILIKE, and
+prints the query plan and best-of timings for a few search terms.
+
+Usage:
+    python benchmarks/bench_search.py [--users 1000000] [--repeat 3]
+"""
+import argparse
+import os
+import sys
+import time
+
+# Add the backend directory to the system path to allow imports like app.config
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from flask import Flask
+from sqlalchemy import func, insert, select
+
+from app.config import db
+from app.models import User
+from app.utils.text_search import text_filter
+
+TERMS = ("user12345", "User9999", "ser42", "xyz")
+PAGE_SIZE = 10
+BATCH = 50000
+
+
+def seed(users):
+    for start in range(0, users, BATCH):
+        db.session.execute(insert(User), [
+            {"username": f"user{i}", "email": f"user{i}@example.com", "password_hash": "x"}
+            for i in range(start, min(start + BATCH, users))
+        ])
+    db.session.commit()
+
+
+def search(condition):
+    """One page plus the total, like the list endpoint."""
+    query = select(User.id).where(condition)
+    ids = db.session.execute(query.order_by(User.id).limit(PAGE_SIZE)).scalars().all()
+    total = db.session.execute(select(func.count()).select_from(query.subquery())).scalar()
+    return ids, total
+
+
+def plan(condition):
+    statement = select(User.id).where(condition).compile(db.engine, compile_kwargs={"literal_binds": True})
+    rows = db.session.execute(db.text(f"EXPLAIN QUERY PLAN {statement}")).all()
+    return "; ".join(row[-1] for row in rows)
+
+
+def best_of(fn, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        timings.append(time.perf_counter() - started)
+    return min(timings), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=1000000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    app = Flask(__name__)
+    app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite://"
+    db.init_app(app)
+
+    with app.app_context():
+        started = time.perf_counter()
+        db.create_all()
+        seed(args.users)
+        print(f"Seeded {args.users} users with search indexes in {time.perf_counter() - started:.1f} s\n")
+
+        for term in TERMS:
+            modes = {
+                "ilike (before)": User.username.ilike(f"%{term}%"),
+                "substring": text_filter(User.username, term, "substring"),
+                "prefix": text_filter(User.username, term, "prefix"),
+            }
+            baseline_time, baseline = best_of(lambda: search(modes["ilike (before)"]), args.repeat)
+            print(f"username search '{term}' ({baseline[1]} substring matches)")
+            for name, condition in modes.items():
+                if name == "ilike (before)":
+                    elapsed, result = baseline_time, baseline
+                else:
+                    elapsed, result = best_of(lambda: search(condition), args.repeat)
+                if name == "substring":
+                    assert result == baseline, f"substring search differs from ILIKE for '{term}'"
+                if name == "prefix":
+                    expected = User.username.ilike(f"{term}%")
+                    assert result == search(expected), f"prefix search differs from ILIKE 'term%' for '{term}'"
+                print(f"  {name:15s}{elapsed * 1000:10.2f} ms  {baseline_time / elapsed:7.1f}x   {plan(condition)}")
+            print()
+
+
+if __name__ == "__main__":
+    main()
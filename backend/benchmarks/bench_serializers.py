@@ -0,0 +1,106 @@
+"""
+Microbenchmark: AuditLog.to_json on ORM instances vs. the compiled row serializer.
+
+Seeds an in-memory SQLite database and times the full read path of one audit log
+page (query + serialization) both ways.
+
+Usage:
+    python benchmarks/bench_serializers.py [--rows 20000] [--page-size 500] [--repeat 5]
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+# Add the backend directory to the system path to allow imports like app.config
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from sqlalchemy import create_engine, insert, select
+from sqlalchemy.orm import Session, contains_eager
+
+from app.config import db
+from app.models import AuditIpAddress, AuditLog, AuditUserAgent, User
+
+
+def seed(session, rows):
+    session.execute(insert(User), [
+        {"id": i, "username": f"user{i}", "email": f"user{i}@example.com", "password_hash": "x"}
+        for i in range(1, 51)
+    ])
+    session.execute(insert(AuditIpAddress), [{"id": 1, "value": "127.0.0.1"}])
+    session.execute(insert(AuditUserAgent), [{"id": 1, "value": "Mozilla/5.0 (X11; Linux x86_64)"}])
+    start = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    session.execute(insert(AuditLog), [
+        {
+            "user_id": i % 50 + 1,
+            "timestamp": start + timedelta(seconds=i),
+            "action_type": "UPDATE",
+            "entity_type": "Role",
+            "entity_id": i % 100,
+            "field_name": "permissions",
+            "old_value": json.dumps([{"id": p, "name": f"perm.{p}"} for p in range(5)]),
+            "new_value": json.dumps([{"id": p, "name": f"perm.{p}"} for p in range(6)]),
+            "description": f"Updated role {i % 100}",
+            "ip_address_id": 1,
+            "user_agent_id": 1,
+        }
+        for i in range(rows)
+    ])
+    session.commit()
+
+
+def orm_to_json(session, page_size):
+    logs = (
+        session.query(AuditLog).join(User).options(contains_eager(AuditLog.user))
+        .order_by(AuditLog.timestamp.desc()).limit(page_size).all()
+    )
+    return [log.to_json() for log in logs]
+
+
+def compiled_rows(session, page_size):
+    serializer = AuditLog.row_serializer()
+    rows = session.execute(
+        select(*serializer.columns).select_from(AuditLog).join(User)
+        .order_by(AuditLog.timestamp.desc()).limit(page_size)
+    )
+    return AuditLog.decode_rows(list(map(serializer.serialize, rows)), session)
+
+
+def best_of(fn, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        timings.append(time.perf_counter() - started)
+    return min(timings), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=20000)
+    parser.add_argument("--page-size", type=int, default=500)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    engine = create_engine("sqlite://")
+    db.metadata.create_all(engine)
+    with Session(engine) as session:
+        seed(session, args.rows)
+
+    with Session(engine) as session:
+        orm_time, orm_result = best_of(lambda: orm_to_json(session, args.page_size), args.repeat)
+        session.expunge_all()
+    with Session(engine) as session:
+        compiled_time, compiled_result = best_of(lambda: compiled_rows(session, args.page_size), args.repeat)
+
+    assert orm_result == compiled_result, "Compiled serializer output differs from to_json"
+
+    print(f"{args.page_size} rows per page, best of {args.repeat}")
+    print(f"  ORM + to_json:      {orm_time * 1000:8.2f} ms")
+    print(f"  compiled serializer:{compiled_time * 1000:8.2f} ms  ({orm_time / compiled_time:.1f}x faster)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+"""
+Benchmark: the 'default' vs. 'tuned' SQLITE_PROFILE (see app/settings.py) under
+concurrent writers.
+
+For each profile, creates a fresh SQLite file, then runs `--writers` threads that
+each commit `--transactions` small audit log transactions (the same insert path as
+the audit sink: lookups, audit_logs, daily rollups) while `--readers` threads page
+through the audit log list query. Prints write throughput, commit latency
+percentiles, reads completed and 'database is locked' errors.
+
+Usage:
+    python benchmarks/bench_sqlite_profiles.py [--writers 8] [--readers 4] [--transactions 200]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timezone
+
+# Add the backend directory to the system path to allow imports like app.config
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from flask import Flask
+from sqlalchemy import select
+from sqlalchemy.exc import OperationalError
+
+from app.config import db
+from app.models import AuditLog
+from app.settings import configure_engines, database_config
+from app.utils.audit_lookups import insert_audit_rows
+
+PROFILES = ("default", "tuned")
+ROWS_PER_TRANSACTION = 5
+PAGE_SIZE = 50
+
+
+def audit_rows(writer, n):
+    return [
+        {
+            "user_id": None,
+            "timestamp": datetime.now(timezone.utc),
+            "action_type": "UPDATE",
+            "entity_type": "Role",
+            "entity_id": writer * 1000 + n,
+            "field_name": "name",
+            "old_value": '"old"',
+            "new_value": '"new"',
+            "description": f"writer {writer} change {n}.{i}",
+            "ip_address": f"10.0.0.{writer}",
+            "user_agent": "bench",
+        }
+        for i in range(ROWS_PER_TRANSACTION)
+    ]
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))] if values else 0.0
+
+
+def run(profile, args):
+    directory = tempfile.mkdtemp()
+    app = Flask(__name__)
+    app.config.update(database_config({
+        "DATABASE_URL": f"sqlite:///{os.path.join(directory, 'bench.db')}",
+        "SQLITE_PROFILE": profile,
+    }))
+    db.init_app(app)
+    configure_engines(app, db)
+    with app.app_context():
+        db.create_all()
+        engine = db.engine
+
+    latencies, errors, reads = [], [0], [0]
+    lock = threading.Lock()
+    done = threading.Event()
+
+    def writer(index):
+        for n in range(args.transactions):
+            started = time.perf_counter()
+            try:
+                with engine.begin() as connection:
+                    insert_audit_rows(connection, audit_rows(index, n))
+            except OperationalError:
+                with lock:
+                    errors[0] += 1
+                continue
+            with lock:
+                latencies.append(time.perf_counter() - started)
+
+    def reader():
+        query = select(AuditLog).order_by(AuditLog.timestamp.desc()).limit(PAGE_SIZE)
+        while not done.is_set():
+            try:
+                with engine.connect() as connection:
+                    connection.execute(query).all()
+            except OperationalError:
+                with lock:
+                    errors[0] += 1
+                continue
+            with lock:
+                reads[0] += 1
+
+    readers = [threading.Thread(target=reader) for _ in range(args.readers)]
+    writers = [threading.Thread(target=writer, args=(i,)) for i in range(args.writers)]
+    started = time.perf_counter()
+    for thread in readers + writers:
+        thread.start()
+    for thread in writers:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    done.set()
+    for thread in readers:
+        thread.join()
+    engine.dispose()
+
+    print(
+        f"{profile:8s}{len(latencies) / elapsed:10.0f} tx/s"
+        f"{percentile(latencies, 0.5) * 1000:10.2f} ms{percentile(latencies, 0.99) * 1000:10.2f} ms"
+        f"{reads[0] / elapsed:10.0f} reads/s{errors[0]:8d}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--writers", type=int, default=8)
+    parser.add_argument("--readers", type=int, default=4)
+    parser.add_argument("--transactions", type=int, default=200, help="Commits per writer.")
+    args = parser.parse_args()
+
+    print(
+        f"{args.writers} writers x {args.transactions} commits ({ROWS_PER_TRANSACTION} audit rows each), "
+        f"{args.readers} readers\n"
+    )
+    print(f"{'profile':8s}{'writes':>14s}{'p50':>13s}{'p99':>13s}{'reads':>18s}{'locked':>8s}")
+    for profile in PROFILES:
+        run(profile, args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""
+Benchmark: cold start of the backend, with a budget check for autoscaling.
+
+1. Import-time profile: `python -X importtime` of the app entry point, top modules by
+   cumulative import time.
+2. Cold start: fresh interpreters that build the app (create_app + register_blueprints)
+   and serve one request, with lazily loaded blueprints (the default) and without.
+3. Checks the lazy URL rules (app.LAZY_BLUEPRINTS) still match the modules' routes.
+
+Exits with status 1 when the median lazy cold start exceeds `--budget-ms`.
+
+Usage:
+    python benchmarks/bench_startup.py [--runs 7] [--budget-ms 1200] [--top 15]
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+BACKEND = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+# Add the backend directory to the system path to allow imports like app.config
+sys.path.insert(0, BACKEND)
+
+# Build the app as wsgi.py does and serve one request; the schema is not needed for it
+COLD_START = """
+from app import register_blueprints
+from app.config import create_app
+app = create_app()
+register_blueprints(app, lazy={lazy})
+assert app.test_client().get("/api/auth/status").status_code == 200
+"""
+
+ENV = {**os.environ, "DATABASE_URL": "sqlite://"}
+
+
+def import_profile(top):
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", COLD_START.format(lazy=True)],
+        cwd=BACKEND, env=ENV, capture_output=True, text=True, check=True,
+    )
+    modules = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        own, cumulative, name = line.split("|")
+        modules.append((int(cumulative), int(own.split(":")[1]), name.rstrip()))
+    # Nested imports are indented by two spaces per level
+    total = sum(cumulative for cumulative, _, name in modules if not name.startswith("  "))
+    print(f"Import-time profile (lazy): {total / 1000:.0f} ms in top-level imports")
+    print(f"  {'cumulative':>10s} {'self':>8s}  module")
+    for cumulative, own, name in sorted(modules, reverse=True)[:top]:
+        print(f"  {cumulative / 1000:8.1f} ms {own / 1000:5.1f} ms  {name.strip()}")
+    print()
+
+
+def cold_start(lazy, runs):
+    timings = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        subprocess.run([sys.executable, "-c", COLD_START.format(lazy=lazy)], cwd=BACKEND, env=ENV, check=True)
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings), min(timings)
+
+
+def route_table(app):
+    return sorted(
+        (rule.rule, rule.endpoint, tuple(sorted(rule.methods)), rule.strict_slashes)
+        for rule in app.url_map.iter_rules()
+        if not rule.endpoint.startswith("swagger_ui.")
+    )
+
+
+def check_lazy_routes():
+    """The lazy app must expose the same routes (and the Swagger UI) as the eager one."""
+    os.environ["DATABASE_URL"] = "sqlite://"
+    from app import register_blueprints
+    from app.config import create_app
+
+    lazy_app, eager_app = create_app(), create_app()
+    register_blueprints(lazy_app, lazy=True)
+    register_blueprints(eager_app, lazy=False)
+    missing = set(route_table(eager_app)) ^ set(route_table(lazy_app))
+    for rule in sorted(missing):
+        print(f"  route differs between eager and lazy registration: {rule}")
+    swagger = lazy_app.test_client().get("/swagger/").status_code
+    if swagger != 200:
+        print(f"  lazy Swagger UI returned {swagger}")
+    return not missing and swagger == 200
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=7)
+    parser.add_argument("--budget-ms", type=float, default=1200)
+    parser.add_argument("--top", type=int, default=15)
+    args = parser.parse_args()
+
+    import_profile(args.top)
+
+    print(f"Cold start to first response ({args.runs} runs, fresh interpreter each)")
+    results = {}
+    for name, lazy in (("eager", False), ("lazy", True)):
+        median, best = cold_start(lazy, args.runs)
+        results[name] = median
+        print(f"  {name:6s} median {median * 1000:7.0f} ms   best {best * 1000:7.0f} ms")
+    print()
+
+    routes_ok = check_lazy_routes()
+    print(f"Lazy routes match eager routes: {'yes' if routes_ok else 'NO'}")
+    within_budget = results["lazy"] * 1000 <= args.budget_ms
+    print(f"Budget {args.budget_ms:.0f} ms: {'ok' if within_budget else 'EXCEEDED'}")
+    sys.exit(0 if routes_ok and within_budget else 1)
+
+
+if __name__ == "__main__":
+    main()
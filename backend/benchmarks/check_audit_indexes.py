@@ -0,0 +1,55 @@
+"""
+Query plan check for the audit log list endpoint on a large table.
+
+Runs the checks of tests/test_audit_indexes.py (which `pytest` runs on a small table;
+both use benchmarks/audit_index_plans.py) on an in-memory SQLite database seeded with
+`--rows` audit logs, and prints the time each filter and sort combination takes. Fails when any query plan scans audit_logs
+without an index or sorts the whole filtered result.
+
+    python benchmarks/check_audit_indexes.py [--rows 200000] [--verbose]
+"""
+import argparse
+import os
+import sys
+import time
+
+# Add the backend directory to the system path to allow imports like app.config
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.config import db
+from benchmarks.audit_index_plans import COMBINATIONS, explain_list_request, make_app, problems, seed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=200000)
+    parser.add_argument("--verbose", action="store_true", help="Print every query plan.")
+    args = parser.parse_args()
+
+    app = make_app()
+    failures = 0
+    with app.app_context():
+        started = time.perf_counter()
+        db.create_all()
+        seed(args.rows)
+        print(f"Seeded {args.rows} audit logs in {time.perf_counter() - started:.1f} s\n")
+
+        for filter_name, sort_by, sort_order, pagination in COMBINATIONS:
+            plans, elapsed = explain_list_request(app, filter_name, sort_by, sort_order, pagination)
+
+            bad = [line for _, lines in plans for line in problems(lines)]
+            label = f"{filter_name:20s} sort={sort_by:9s} {sort_order:4s} {pagination:6s}"
+            print(f"{'FAIL' if bad else 'ok  '}  {label} {elapsed * 1000:8.2f} ms")
+            if bad or args.verbose:
+                for statement, lines in plans:
+                    print(f"        {' '.join(statement.split())[:160]}")
+                    for line in lines:
+                        print(f"          {line}")
+            failures += bool(bad)
+
+    print(f"\n{failures} combination(s) without an index-backed plan")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
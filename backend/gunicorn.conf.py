@@ -0,0 +1,63 @@
+"""
+Production server settings: `gunicorn -c gunicorn.conf.py` (from backend/).
+
+The app is imported once in the master (preload_app) and forked into WEB_CONCURRENCY
+worker processes. Each worker drops the database connections it inherited, warms
+up before accepting requests and flushes its queued audit rows on shutdown.
+
+Environment:
+    PORT                    listen port (default 5000)
+    WEB_CONCURRENCY         worker processes (default: 2 x CPUs + 1)
+    GUNICORN_THREADS        threads per worker (default 1; more uses the gthread worker)
+    GUNICORN_TIMEOUT        seconds before a stuck worker is restarted (default 60)
+    GUNICORN_MAX_REQUESTS   restart a worker after this many requests (default 0, never)
+"""
+import multiprocessing
+import os
+
+wsgi_app = "wsgi:app"
+bind = f"0.0.0.0:{os.environ.get('PORT', '5000')}"
+preload_app = True
+workers = int(os.environ.get("WEB_CONCURRENCY", multiprocessing.cpu_count() * 2 + 1))
+threads = int(os.environ.get("GUNICORN_THREADS", "1"))
+worker_class = "gthread" if threads > 1 else "sync"
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", "60"))
+graceful_timeout = 30  # In-flight requests get this long after SIGTERM
+max_requests = int(os.environ.get("GUNICORN_MAX_REQUESTS", "0"))
+max_requests_jitter = max_requests // 10
+accesslog = "-"
+errorlog = "-"
+
+
+def _engines(app):
+    from app.config import db
+
+    with app.app_context():
+        engines = list(db.engines.values())
+    return engines + app.extensions.get("db_replicas", [])
+
+
+def post_fork(server, worker):
+    # Connections opened by the master (while preloading) must not be shared with the
+    # workers; close=False leaves them to the master and gives this worker empty pools
+    for engine in _engines(server.app.wsgi()):
+        engine.dispose(close=False)
+
+
+def post_worker_init(worker):
+    from app.utils.warmup import warm_up
+
+    warmed = warm_up(worker.wsgi)
+    worker.log.info(f"Worker {worker.pid} warmed up {warmed} endpoints")
+
+
+def worker_exit(server, worker):
+    app = getattr(worker, "wsgi", None)
+    if app is None:
+        return  # The worker failed before loading the app
+    # Write audit rows still queued in this worker before it exits
+    sink = app.extensions.get("audit_sink")
+    if sink is not None:
+        sink.close()
+    for engine in _engines(app):
+        engine.dispose()
@@ -1,15 +1,11 @@
 from app import  register_blueprints
-from app.config import create_app, db
+from app.config import create_app
 
+# Development server. Create the schema first with `flask --app wsgi create-schema`
+# (seed_db.py does it too); production runs `gunicorn -c gunicorn.conf.py`.
 if __name__ == "__main__":
     app = create_app()
 
     register_blueprints(app)
 
-    with app.app_context():
-        # This will create tables based on your models if they don't exist
-        # For more complex migrations, consider Flask-Migrate
-        db.create_all()
-        print("Database tables created (if they didn't exist).")
-
-    app.run(debug=True)
\ No newline at end of file
+    app.run(debug=True)
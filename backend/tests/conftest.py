@@ -0,0 +1,76 @@
+import os
+import sys
+
+import pytest
+
+# Add the backend directory to the system path to allow imports like app.config
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+
+def _clear_process_caches():
+    # These caches assume one database per process; every test has a database of its own
+    from app.utils import audit_lookups, audit_partitions, cache_versions, pagination, permission_cache, principal
+
+    for caches in (audit_lookups._ids, audit_lookups._values):
+        for key in caches:
+            caches[key] = audit_lookups._LRU(audit_lookups.CACHE_SIZE)
+    audit_partitions._union_source.cache_clear()
+    pagination._counts.clear()
+    permission_cache._snapshot = None
+    permission_cache._user_masks = {}
+    permission_cache._user_masks_version = None
+    principal._principals.clear()
+    cache_versions.expire_local_versions()
+
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    """The app on an empty SQLite database of its own, inside an app context."""
+    monkeypatch.setenv("DATABASE_URL", f"sqlite:///{tmp_path / 'test.db'}")
+    from app.config import create_app, db
+
+    _clear_process_caches()
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        for engine in db.engines.values():
+            engine.dispose()
+
+
+@pytest.fixture
+def login(app):
+    """
+    Returns login(*permission_names): creates a user holding those permissions (through a
+    role of their own) and returns a test client logged in as them.
+    """
+    from app import register_blueprints
+    from app.config import db
+    from app.models import Permission, Role, User
+    from app.utils.permission_cache import bump_rbac_version
+
+    register_blueprints(app)
+    app.config["SESSION_COOKIE_SECURE"] = False
+    users = []
+
+    def login(*permission_names):
+        name = f"tester{len(users) + 1}"
+        permissions = []
+        for permission_name in permission_names:
+            permission = Permission.query.filter_by(name=permission_name).first()
+            permissions.append(permission or Permission(name=permission_name))
+        user = User(username=name, email=f"{name}@example.com")
+        user.set_password("testpassword")
+        user.roles = [Role(name=f"{name} role", permissions=permissions)]
+        db.session.add(user)
+        bump_rbac_version()
+        db.session.commit()
+        users.append(user)
+
+        client = app.test_client()
+        response = client.post("/api/auth/login", json={"identifier": name, "password": "testpassword"})
+        assert response.status_code == 200
+        return client
+
+    return login
@@ -0,0 +1,62 @@
+import csv
+import io
+import json
+from datetime import datetime
+
+import pytest
+from sqlalchemy import insert
+
+from app import register_blueprints
+from app.config import db
+from app.models import AuditLog, Permission, Role, User
+from app.utils.audit_partitions import seal_partitions
+
+
+@pytest.fixture
+def client(app):
+    register_blueprints(app)
+    app.config["SESSION_COOKIE_SECURE"] = False
+    auditor = User(username="auditor", email="auditor@example.com")
+    auditor.set_password("auditorpassword")
+    auditor.roles = [Role(name="Auditor", permissions=[Permission(name="audit.read.all")])]
+    db.session.add(auditor)
+    db.session.commit()
+
+    client = app.test_client()
+    response = client.post("/api/auth/login", json={"identifier": "auditor", "password": "auditorpassword"})
+    assert response.status_code == 200
+    return client
+
+
+def _auditor_id():
+    return User.query.filter_by(username="auditor").one().id
+
+
+def test_export_reads_partitions_and_hot_table(client):
+    db.session.execute(insert(AuditLog), [
+        {"user_id": _auditor_id(), "timestamp": timestamp, "action_type": "LOGIN", "entity_type": "User"}
+        for timestamp in (datetime(2025, 1, 5), datetime(2025, 1, 6), datetime(2026, 10, 1))
+    ])
+    db.session.commit()
+    assert seal_partitions(3, now=datetime(2026, 10, 18)) == [("audit_logs_2025_01", 2)]
+
+    response = client.get("/api/app/audit-logs/export?format=ndjson&action_type=login")
+    assert response.status_code == 200
+    items = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert sorted(item["timestamp"][:10] for item in items) == ["2025-01-05", "2025-01-06", "2026-10-01"]
+
+
+def test_csv_export_quotes_formulas(client):
+    # A role renamed to a formula: the names are stored as JSON strings
+    db.session.execute(insert(AuditLog), [{
+        "user_id": _auditor_id(), "timestamp": datetime(2026, 10, 1), "action_type": "UPDATE",
+        "entity_type": "Role", "entity_id": 1, "field_name": "name",
+        "old_value": json.dumps("Auditor"), "new_value": json.dumps("=HYPERLINK(\"http://example.com\")"),
+    }])
+    db.session.commit()
+
+    response = client.get("/api/app/audit-logs/export?format=csv&action_type=UPDATE")
+    assert response.status_code == 200
+    [row] = csv.DictReader(io.StringIO(response.get_data(as_text=True)))
+    assert row["old_value"] == "Auditor"
+    assert row["new_value"] == "'=HYPERLINK(\"http://example.com\")"
@@ -0,0 +1,36 @@
+"""
+Query plan regression tests for the audit log list endpoint.
+
+Calls GET /audit-logs for every supported filter and sort combination (offset and
+cursor pagination) on a small seeded SQLite database and runs EXPLAIN QUERY PLAN on
+each SELECT the endpoint issued. A query fails when it scans the audit_logs table
+without an index or sorts the whole filtered result instead of reading it in index
+order. benchmarks/check_audit_indexes.py runs the same checks on 200k rows with timings;
+both use the helpers in benchmarks/audit_index_plans.py.
+"""
+import pytest
+
+from app.config import db
+from benchmarks.audit_index_plans import COMBINATIONS, explain_list_request, make_app, problems, seed
+
+ROWS = 5000
+
+
+@pytest.fixture(scope="module")
+def index_app():
+    app = make_app()
+    with app.app_context():
+        db.create_all()
+        seed(ROWS)
+        yield app
+        db.session.remove()
+        db.engine.dispose()
+
+
+@pytest.mark.parametrize("filter_name, sort_by, sort_order, pagination", COMBINATIONS,
+                         ids=["-".join(combination).replace(" ", "_") for combination in COMBINATIONS])
+def test_list_queries_use_indexes(index_app, filter_name, sort_by, sort_order, pagination):
+    plans, _ = explain_list_request(index_app, filter_name, sort_by, sort_order, pagination)
+    assert plans, "the endpoint issued no audit_logs query"
+    for statement, lines in plans:
+        assert not problems(lines), f"{' '.join(statement.split())}\n" + "\n".join(lines)
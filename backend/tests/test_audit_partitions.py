@@ -0,0 +1,76 @@
+import gzip
+import json
+from datetime import datetime
+
+import pytest
+from sqlalchemy import text
+
+from app.config import db
+from app.models import AuditLogPartition
+from app.utils.audit_partitions import audit_log_source, partition_table, restore_partition
+
+# A partition sealed before IP addresses and user agents moved to lookup tables
+LEGACY_PARTITION = """
+CREATE TABLE audit_logs_2025_01 (
+    id INTEGER PRIMARY KEY, user_id INTEGER, timestamp DATETIME NOT NULL,
+    action_type VARCHAR(50) NOT NULL, entity_type VARCHAR(100) NOT NULL, entity_id INTEGER,
+    field_name VARCHAR(100), old_value TEXT, new_value TEXT, description TEXT,
+    ip_address VARCHAR(45), user_agent VARCHAR(255)
+)
+"""
+
+LEGACY_ROW = {
+    "id": 1, "user_id": None, "timestamp": "2025-01-05T10:00:00", "action_type": "LOGIN",
+    "entity_type": "User", "entity_id": None, "field_name": None, "old_value": None, "new_value": None,
+    "description": "Logged in", "ip_address": "10.0.0.1", "user_agent": "legacy-agent/1.0",
+}
+
+
+def _register(name, archive_path=None):
+    db.session.add(AuditLogPartition(
+        name=name, period_start=datetime(2025, 1, 1), period_end=datetime(2025, 2, 1),
+        row_count=1, archive_path=archive_path,
+    ))
+    db.session.commit()
+
+
+def _rows(source):
+    return [row.to_json() for row in db.session.query(source)]
+
+
+def test_create_all_upgrades_legacy_partitions(app):
+    db.session.execute(text(LEGACY_PARTITION))
+    columns = ", ".join(LEGACY_ROW)
+    values = ", ".join(f":{key}" for key in LEGACY_ROW)
+    db.session.execute(text(f"INSERT INTO audit_logs_2025_01 ({columns}) VALUES ({values})"), LEGACY_ROW)
+    _register("audit_logs_2025_01")
+
+    db.create_all()
+
+    [row] = _rows(audit_log_source())
+    assert (row["ip_address"], row["user_agent"]) == ("10.0.0.1", "legacy-agent/1.0")
+
+
+def test_restore_interns_legacy_archive_values(app, tmp_path):
+    path = tmp_path / "audit_logs_2025_01.ndjson.gz"
+    with gzip.open(path, "wt", encoding="utf-8") as archive:
+        archive.write(json.dumps(LEGACY_ROW) + "\n")
+    _register("audit_logs_2025_01", str(path))
+
+    assert restore_partition("2025-01") == 1
+    assert not path.exists()
+    [row] = _rows(audit_log_source())
+    assert (row["ip_address"], row["user_agent"]) == ("10.0.0.1", "legacy-agent/1.0")
+
+
+def test_restore_keeps_archive_with_unknown_columns(app, tmp_path):
+    path = tmp_path / "audit_logs_2025_01.ndjson.gz"
+    with gzip.open(path, "wt", encoding="utf-8") as archive:
+        archive.write(json.dumps({**LEGACY_ROW, "session_id": "abc"}) + "\n")
+    _register("audit_logs_2025_01", str(path))
+
+    with pytest.raises(ValueError, match="session_id"):
+        restore_partition("2025-01")
+    assert path.exists()
+    assert db.session.get(AuditLogPartition, "audit_logs_2025_01").archive_path == str(path)
+    assert db.session.execute(partition_table("audit_logs_2025_01").select()).first() is None
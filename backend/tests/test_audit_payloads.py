@@ -0,0 +1,62 @@
+import pytest
+
+from app.config import db
+from app.models import AuditLog, Permission, Role
+from app.utils.audit_payloads import DELTA_KEY, decode_json_value
+
+
+@pytest.fixture
+def permissions(app):
+    app.config["AUDIT_PAYLOAD_ENCODING"] = "delta"
+    permissions = [Permission(name=f"test.permission.{i}") for i in range(1, 7)]
+    db.session.add_all(permissions)
+    db.session.commit()
+    return {permission.id: permission for permission in permissions}
+
+
+def _permission_changes(role_id):
+    logs = AuditLog.query.filter_by(entity_type="Role", entity_id=role_id, field_name="permissions") \
+        .order_by(AuditLog.id).all()
+    return [log.to_json() for log in logs]
+
+
+def _ids(items):
+    return [item["id"] for item in items]
+
+
+def test_changes_are_stored_as_deltas_of_the_last_snapshot(permissions):
+    role = Role(name="Editors", permissions=[permissions[1]])
+    db.session.add(role)
+    db.session.commit()
+    for permission_id in (2, 3):
+        role.permissions.append(permissions[permission_id])
+        db.session.commit()
+
+    stored = [decode_json_value(log.new_value) for log in AuditLog.query.filter_by(field_name="permissions")]
+    assert isinstance(stored[0], list) and DELTA_KEY in stored[1]
+    changes = _permission_changes(role.id)
+    assert [(_ids(c["old_value"]), _ids(c["new_value"])) for c in changes] == [([1], [1, 2]), ([1, 2], [1, 2, 3])]
+
+
+def test_reused_id_does_not_chain_onto_deleted_entity(permissions):
+    deleted = Role(name="Deleted", permissions=[permissions[1]])
+    db.session.add(deleted)
+    db.session.commit()
+    for permission_id in (2, 3):
+        deleted.permissions.append(permissions[permission_id])
+        db.session.commit()
+    role_id = deleted.id
+    db.session.delete(deleted)
+    db.session.commit()
+
+    # SQLite hands the deleted role's id to the next role
+    role = Role(name="Reused", permissions=[permissions[5]])
+    db.session.add(role)
+    db.session.commit()
+    assert role.id == role_id
+    role.permissions.append(permissions[6])
+    db.session.commit()
+
+    change = _permission_changes(role.id)[-1]
+    assert _ids(change["old_value"]) == [5]
+    assert _ids(change["new_value"]) == [5, 6]
@@ -0,0 +1,42 @@
+from datetime import date, datetime
+
+from sqlalchemy import insert, select
+
+from app.config import db
+from app.models import AuditLog, AuditLogDailyStat, AuditLogPartition
+from app.utils.audit_rollups import rebuild_rollups
+
+
+def _counts():
+    rows = db.session.execute(select(AuditLogDailyStat.day, AuditLogDailyStat.count).order_by(AuditLogDailyStat.day))
+    return dict(rows.all())
+
+
+def test_rebuild_keeps_archived_days(app):
+    # January was archived: its logs are gone, its rollup row is all that is left
+    db.session.add(AuditLogPartition(
+        name="audit_logs_2025_01", period_start=datetime(2025, 1, 1), period_end=datetime(2025, 2, 1),
+        row_count=4, archive_path="/archive/audit_logs_2025_01.ndjson.gz",
+    ))
+    db.session.add(AuditLogDailyStat(day=date(2025, 1, 10), action_type="LOGIN", entity_type="User", user_id=0, count=4))
+    db.session.execute(insert(AuditLog), [
+        {"timestamp": datetime(2025, 3, day), "action_type": "LOGIN", "entity_type": "User"} for day in (1, 1, 2)
+    ])
+    db.session.commit()
+
+    with db.engine.begin() as connection:
+        counted, first_day = rebuild_rollups(connection)
+
+    assert (counted, first_day) == (3, date(2025, 2, 1))
+    assert _counts() == {date(2025, 1, 10): 4, date(2025, 3, 1): 2, date(2025, 3, 2): 1}
+
+
+def test_rebuild_range(app):
+    db.session.execute(insert(AuditLog), [
+        {"timestamp": datetime(2025, 3, day), "action_type": "LOGIN", "entity_type": "User"} for day in (1, 2, 3)
+    ])
+    db.session.commit()
+    with db.engine.begin() as connection:
+        connection.execute(AuditLogDailyStat.__table__.delete())
+        assert rebuild_rollups(connection, date(2025, 3, 2), date(2025, 3, 2)) == (1, date(2025, 3, 2))
+    assert _counts() == {date(2025, 3, 2): 1}
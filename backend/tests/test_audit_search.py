@@ -0,0 +1,55 @@
+from sqlalchemy import select, text
+
+from app.config import db
+from app.models import AuditLog, Permission, Role
+from app.utils.audit_payloads import COMPRESSED_PREFIX, DELTA_KEY
+from app.utils.audit_search import FTS_TABLE, rebuild_search_index, search_subquery, to_match_query
+
+
+def _matches(term):
+    search = search_subquery(to_match_query(term))
+    return set(db.session.execute(select(search.c.audit_log_id)).scalars())
+
+
+def _indexed_payloads():
+    return db.session.execute(text(f"SELECT rowid, old_value, new_value FROM {FTS_TABLE} ORDER BY rowid")).all()
+
+
+def test_plain_payloads_are_searchable(app):
+    db.session.add(Permission(name="reports.export"))
+    db.session.commit()
+    log = AuditLog.query.filter_by(entity_type="Permission", action_type="CREATE").one()
+    assert log.id in _matches("reports export")
+
+
+def _grant_more(app, **config):
+    app.config.update(config)
+    permissions = [Permission(name=f"granted.permission.{i}") for i in range(20)]
+    role = Role(name="Auditors", permissions=permissions[:10])
+    db.session.add_all(permissions + [role])
+    db.session.commit()
+    for permission in permissions[10:12]:
+        role.permissions.append(permission)
+        db.session.commit()
+    return AuditLog.query.filter_by(entity_type="Role", action_type="UPDATE").order_by(AuditLog.id.desc()).first()
+
+
+def _assert_not_indexed(encoded):
+    stored = [value for log in AuditLog.query for value in (log.old_value, log.new_value)]
+    assert any(value and encoded(value) for value in stored)
+    for indexed in (_indexed_payloads(), rebuild_search_index(db.session.connection()) and _indexed_payloads()):
+        assert not any(value and encoded(value) for _, *values in indexed for value in values)
+
+
+def test_compressed_payloads_are_not_indexed(app):
+    log = _grant_more(app, AUDIT_COMPRESS_PAYLOADS=True, AUDIT_COMPRESS_MIN_BYTES=1)
+    _assert_not_indexed(lambda value: value.startswith(COMPRESSED_PREFIX))
+    # Still found by its other columns
+    assert log.id in _matches("permissions")
+
+
+def test_delta_payloads_are_not_indexed(app):
+    log = _grant_more(app, AUDIT_PAYLOAD_ENCODING="delta")
+    assert DELTA_KEY in log.new_value
+    _assert_not_indexed(lambda value: DELTA_KEY in value)
+    assert log.id in _matches("permissions")
@@ -0,0 +1,72 @@
+import gzip
+import zlib
+
+import pytest
+
+from app.config import db
+from app.models import Permission, Role
+from app.utils import compression
+
+
+@pytest.fixture
+def client(login):
+    client = login("role.manage", "permission.read.all", "audit.read.all")
+    db.session.add_all([
+        Role(name=f"Role number {i}", description="A role with a fairly repetitive description.")
+        for i in range(40)
+    ])
+    db.session.add_all([Permission(name=f"test.permission.{i}") for i in range(100)])
+    db.session.commit()
+    return client
+
+
+ROLES = "/api/app/roles?per_page=50"
+
+
+def test_large_json_is_gzipped(client):
+    identity = client.get(ROLES)
+    response = client.get(ROLES, headers={"Accept-Encoding": "gzip"})
+    assert "Content-Encoding" not in identity.headers
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert "Accept-Encoding" in response.headers["Vary"]
+    assert int(response.headers["Content-Length"]) < len(identity.data)
+    assert gzip.decompress(response.data) == identity.data
+
+
+def test_encoding_follows_accept_encoding_quality(client):
+    response = client.get(ROLES, headers={"Accept-Encoding": "gzip;q=0.5, deflate"})
+    assert response.headers["Content-Encoding"] == "deflate"
+    assert zlib.decompress(response.data) == client.get(ROLES).data
+    assert "Content-Encoding" not in client.get(ROLES, headers={"Accept-Encoding": "identity"}).headers
+
+
+def test_small_responses_are_not_compressed(client):
+    response = client.get("/api/app/roles?per_page=1&fields=id", headers={"Accept-Encoding": "gzip"})
+    assert "Content-Encoding" not in response.headers
+    # The representation still depends on Accept-Encoding for caches
+    assert "Accept-Encoding" in response.headers["Vary"]
+
+
+def test_streamed_responses_are_compressed_as_they_go(client):
+    url = "/api/app/permissions?get_all=true"
+    response = client.get(url, headers={"Accept-Encoding": "gzip"})
+    assert response.is_streamed and "Content-Length" not in response.headers
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert gzip.decompress(response.get_data()) == client.get(url).get_data()
+
+
+def test_encoded_responses_are_left_alone(client):
+    # The audit export gzips itself; it must not be compressed twice
+    response = client.get("/api/app/audit-logs/export", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert not gzip.decompress(response.get_data()).startswith(b"\x1f\x8b")
+
+
+def test_compressed_bodies_are_cached(client, monkeypatch):
+    calls = []
+    original = compression.compress_bytes
+    monkeypatch.setattr(compression, "compress_bytes", lambda *args: calls.append(args) or original(*args))
+    first = client.get(ROLES, headers={"Accept-Encoding": "gzip"})
+    second = client.get(ROLES, headers={"Accept-Encoding": "gzip"})
+    assert first.data == second.data
+    assert len(calls) == 1
@@ -0,0 +1,117 @@
+import sqlite3
+
+import pytest
+from flask import jsonify
+
+from app.config import db
+from app.db_routing import use_primary, use_replica
+from app.models import Permission, Role
+from app.utils.permission_cache import bump_rbac_version
+
+
+def _request(app, client, method, url, **kwargs):
+    """
+    Sends a request in an app context of its own, as in production: the test's context
+    would otherwise share its flask.g and db.session (and their routing state) with it.
+    """
+    with app.app_context():
+        response = client.open(url, method=method, **kwargs)
+        return response.status_code, response.get_json()
+
+
+@pytest.fixture
+def replica_url(tmp_path, monkeypatch):
+    monkeypatch.setenv("DATABASE_REPLICA_URLS", f"sqlite:///{tmp_path / 'replica.db'}")
+
+
+@pytest.fixture
+def replica(replica_url, app):
+    """A second SQLite database standing in for a replica, with a role the primary does not have."""
+    engine = app.extensions["db_replicas"][0]
+    db.metadata.create_all(engine)
+    with engine.begin() as connection:
+        connection.execute(Role.__table__.insert(), {"name": "Replica only"})
+    app.config["DB_REPLICA_STALENESS_SECONDS"] = 0
+    db.session.add(Role(name="Primary only"))
+    db.session.commit()
+
+    def role_names():
+        return sorted(role.name for role in Role.query)
+
+    @app.route("/routing/read")
+    def plain_read():
+        return jsonify(role_names())
+
+    @app.route("/routing/primary-read")
+    @use_primary
+    def primary_read():
+        return jsonify(role_names())
+
+    @app.route("/routing/replica-search", methods=["POST"])
+    @use_replica
+    def replica_search():
+        return jsonify(role_names())
+
+    @app.route("/routing/write-then-read")
+    def write_then_read():
+        db.session.add(Role(name="Written"))
+        db.session.flush()
+        names = role_names()
+        db.session.rollback()
+        return jsonify(names)
+
+    yield engine
+    engine.dispose()
+
+
+def test_reads_go_to_the_replica(replica, app):
+    client = app.test_client()
+    assert _request(app, client, "GET", "/routing/read") == (200, ["Replica only"])
+    assert _request(app, client, "POST", "/routing/replica-search") == (200, ["Replica only"])
+
+
+def test_use_primary_reads_the_primary(replica, app):
+    assert _request(app, app.test_client(), "GET", "/routing/primary-read") == (200, ["Primary only"])
+
+
+def test_a_request_reads_its_own_writes(replica, app):
+    assert _request(app, app.test_client(), "GET", "/routing/write-then-read") == (200, ["Primary only", "Written"])
+
+
+def test_writes_go_to_the_primary(replica, app, login):
+    client = login("role.manage")
+    status, _ = _request(app, client, "POST", "/api/app/roles", json={"name": "Created"})
+    assert status == 201
+    assert Role.query.filter_by(name="Created").count() == 1
+    with replica.connect() as connection:
+        assert connection.execute(Role.__table__.select().where(Role.name == "Created")).first() is None
+
+
+def test_reads_after_a_write_use_the_primary(replica, app, login):
+    client = login("role.manage")
+    _request(app, client, "POST", "/api/app/roles", json={"name": "Created"})
+    app.config["DB_REPLICA_STALENESS_SECONDS"] = 60
+    names = {role["name"] for role in _request(app, client, "GET", "/api/app/roles")[1]["items"]}
+    assert "Created" in names and "Replica only" not in names
+
+    # Once the window has passed, the client reads the replica again
+    app.config["DB_REPLICA_STALENESS_SECONDS"] = 0
+    names = {role["name"] for role in _request(app, client, "GET", "/api/app/roles")[1]["items"]}
+    assert names == {"Replica only"}
+
+
+def test_revoke_is_denied_while_the_replica_lags(replica_url, app, login):
+    client = login("role.manage")
+    app.config["DB_REPLICA_STALENESS_SECONDS"] = 0
+    # The replica is a copy from before the revoke, and never catches up
+    with sqlite3.connect(db.engine.url.database) as primary, \
+            sqlite3.connect(app.extensions["db_replicas"][0].url.database) as copy:
+        primary.backup(copy)
+    assert _request(app, client, "GET", "/api/app/roles")[0] == 200
+
+    role = Role.query.filter_by(name="tester1 role").one()
+    role.permissions.remove(Permission.query.filter_by(name="role.manage").one())
+    bump_rbac_version()
+    db.session.commit()
+    assert _request(app, client, "GET", "/api/app/roles")[0] == 403
+    app.extensions["db_replicas"][0].dispose()
@@ -0,0 +1,46 @@
+import pytest
+
+from app.config import db
+from app.models import Permission, Role
+
+
+@pytest.fixture
+def client(login):
+    client = login("role.manage")
+    db.session.add(Role(name="Editors", description="Edit things", permissions=[Permission(name="contact.edit")]))
+    db.session.commit()
+    return client
+
+
+def _editors(response):
+    assert response.status_code == 200
+    return next(item for item in response.get_json()["items"] if item["name"] == "Editors")
+
+
+def test_fields_limit_the_keys(client):
+    assert set(_editors(client.get("/api/app/roles?fields=id,name"))) == {"id", "name"}
+
+
+def test_default_response_includes_permissions(client):
+    role = _editors(client.get("/api/app/roles"))
+    assert {"id", "name", "description", "permissions"} <= set(role)
+    assert [permission["name"] for permission in role["permissions"]] == ["contact.edit"]
+
+
+def test_include_adds_its_keys_to_fields(client):
+    role = _editors(client.get("/api/app/roles?fields=name&include=permissions"))
+    assert set(role) == {"name", "permissions"}
+
+
+@pytest.mark.parametrize("query", ["fields=id,secret", "include=owner", "fields=name&include=permissions.owner"])
+def test_unknown_fields_and_includes_are_rejected(client, query):
+    response = client.get(f"/api/app/roles?{query}")
+    assert response.status_code == 400
+    assert "Unknown" in response.get_json()["message"]
+
+
+def test_single_resource_takes_fields(client):
+    role_id = Role.query.filter_by(name="Editors").one().id
+    response = client.get(f"/api/app/roles/{role_id}?fields=description")
+    assert response.get_json() == {"description": "Edit things"}
+    assert client.get(f"/api/app/roles/{role_id}?fields=bogus").status_code == 400
@@ -0,0 +1,85 @@
+import sqlite3
+
+import pytest
+from sqlalchemy import event
+
+from app.config import db
+from app.models import Role
+
+
+@pytest.fixture
+def client(login):
+    client = login("role.manage")  # Creates the role "tester1 role"
+    db.session.add_all([Role(name=f"Team {i}") for i in range(1, 5)])
+    db.session.commit()
+    return client
+
+
+@pytest.fixture
+def count_queries(app):
+    """The number of COUNT queries run since the last call."""
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(db.engine, "before_cursor_execute", record)
+
+    def count_queries():
+        counts = sum("count(*)" in statement.lower() for statement in statements)
+        statements.clear()
+        return counts
+
+    yield count_queries
+    event.remove(db.engine, "before_cursor_execute", record)
+
+
+def _pagination(client, query):
+    response = client.get(f"/api/app/roles?{query}")
+    assert response.status_code == 200
+    return response.get_json()["pagination"]
+
+
+def test_exact_counts_are_cached_per_filter(client, count_queries):
+    assert _pagination(client, "per_page=2")["total_items"] == 5
+    assert count_queries() == 1
+    assert _pagination(client, "per_page=2&page=2")["total_items"] == 5
+    assert count_queries() == 0
+    # Another filter is another cache entry
+    assert _pagination(client, "per_page=2&name_search=team")["total_items"] == 4
+    assert count_queries() == 1
+
+
+def test_own_writes_expire_cached_counts(client, count_queries):
+    assert _pagination(client, "per_page=2")["total_items"] == 5
+    db.session.add(Role(name="Team 5"))
+    db.session.commit()
+    count_queries()
+    assert _pagination(client, "per_page=2")["total_items"] == 6
+    assert count_queries() == 1
+
+
+def test_counts_expire_after_ttl(app, client, count_queries):
+    app.config["COUNT_CACHE_TTL"] = 0
+    _pagination(client, "per_page=2")
+    _pagination(client, "per_page=2")
+    assert count_queries() == 2
+
+
+def test_other_workers_writes_do_not_hide_pages(client):
+    assert _pagination(client, "per_page=5") == {
+        "total_items": 5, "total_pages": 1, "current_page": 1, "per_page": 5,
+        "has_next": False, "has_prev": False, "next_num": None, "prev_num": None,
+    }
+    # Written behind this process's back, as another worker would
+    with sqlite3.connect(db.engine.url.database) as connection:
+        connection.execute("INSERT INTO roles (name) VALUES ('Team 5')")
+    pagination = _pagination(client, "per_page=5")
+    assert pagination["has_next"] and pagination["total_items"] == 6
+
+
+def test_count_none_skips_the_count(client, count_queries):
+    pagination = _pagination(client, "per_page=2&count=none")
+    assert count_queries() == 0
+    assert pagination["total_items"] is None and pagination["has_next"]
+    assert client.get("/api/app/roles?count=maybe").status_code == 400
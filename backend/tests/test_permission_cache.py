@@ -0,0 +1,74 @@
+import pytest
+
+from app.config import db
+from app.models import Permission, Role, User
+from app.utils import permission_cache
+
+
+@pytest.fixture
+def permissions(app):
+    permissions = [Permission(name=f"test.permission.{i}") for i in range(1, 6)]
+    db.session.add_all(permissions)
+    db.session.commit()
+    return permissions
+
+
+def test_bits_are_dense_after_id_churn(permissions):
+    # Deleted ids leave gaps and new rows may get large ids; positions stay 0..n-1
+    for permission in permissions[:3]:
+        db.session.delete(permission)
+    db.session.add(Permission(id=10_000, name="test.permission.late"))
+    permission_cache.bump_rbac_version()
+    db.session.commit()
+
+    names = ("test.permission.4", "test.permission.5", "test.permission.late")
+    bits = [permission_cache.permission_bit(name) for name in names]
+    assert bits == [1, 2, 4]
+    assert permission_cache.permission_bit("test.permission.1") == 0
+
+
+def test_role_masks_round_trip_to_names(permissions):
+    role = Role(name="Editors", permissions=[permissions[1], permissions[3]])
+    db.session.add(role)
+    permission_cache.bump_rbac_version()
+    db.session.commit()
+
+    mask = permission_cache.get_role_mask(role.id)
+    assert mask == permission_cache.permission_mask("test.permission.2", "test.permission.4")
+    assert permission_cache.mask_to_names(mask) == {"test.permission.2", "test.permission.4"}
+    assert role.has_permission("test.permission.2")
+    assert not role.has_permission("test.permission.1")
+
+
+@pytest.fixture
+def editor(permissions):
+    user = User(username="editor", email="editor@example.com", password_hash="x")
+    user.roles = [Role(name="Editors", permissions=permissions[:2])]
+    db.session.add(user)
+    permission_cache.bump_rbac_version()
+    db.session.commit()
+    return user
+
+
+def test_revoke_is_denied_after_bump(editor):
+    role = editor.roles[0]
+    assert permission_cache.has_permission(editor.id, "test.permission.2")
+
+    role.permissions.remove(role.permissions[1])
+    db.session.commit()
+    # Without a bump the cached mask is still served...
+    assert permission_cache.has_permission(editor.id, "test.permission.2")
+
+    permission_cache.bump_rbac_version()
+    db.session.commit()
+    # ...and the bump invalidates it in the same process (other workers within the check interval)
+    assert not permission_cache.has_permission(editor.id, "test.permission.2")
+    assert permission_cache.get_permission_names(editor.id) == {"test.permission.1"}
+
+
+def test_unassigned_role_is_denied_after_bump(editor):
+    assert permission_cache.has_permission(editor.id, "test.permission.1")
+    editor.roles = []
+    permission_cache.bump_rbac_version()
+    db.session.commit()
+    assert permission_cache.get_permission_mask(editor.id) == 0
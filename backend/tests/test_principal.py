@@ -0,0 +1,81 @@
+import pytest
+
+from app.config import db
+from app.models import Permission, Role, User
+from app.utils import permission_cache, principal as principal_module
+from app.utils.principal import Principal, load_principal
+
+
+@pytest.fixture
+def user(app):
+    user = User(username="reader", email="reader@example.com", password_hash="x")
+    user.roles = [Role(name="Readers", permissions=[Permission(name="contact.read")])]
+    db.session.add(user)
+    permission_cache.bump_rbac_version()
+    db.session.commit()
+    return user
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = _Clock()
+    monkeypatch.setattr(principal_module.time, "monotonic", clock)
+    return clock
+
+
+def test_principal_is_immutable(user):
+    principal = load_principal(user.id)
+    with pytest.raises(AttributeError):
+        principal.permission_mask = -1
+    with pytest.raises(AttributeError):
+        principal.is_admin = True
+    assert principal.has_permission("contact.read")
+    assert principal.permissions == {"contact.read"}
+
+
+def test_unknown_user_has_no_principal(app):
+    assert load_principal(12345) is None
+
+
+def test_principal_is_cached_until_ttl(app, user, clock):
+    app.config["PRINCIPAL_CACHE_TTL"] = 60
+    first = load_principal(user.id)
+    # A rename without an RBAC bump is picked up only once the entry expires
+    db.session.get(User, user.id).username = "renamed"
+    db.session.commit()
+
+    clock.now += 59
+    assert load_principal(user.id) is first
+    clock.now += 2
+    assert load_principal(user.id).username == "renamed"
+
+
+def test_principal_is_reloaded_after_rbac_bump(user, clock):
+    assert load_principal(user.id).has_permission("contact.read")
+    role = db.session.get(User, user.id).roles[0]
+    role.permissions = []
+    permission_cache.bump_rbac_version()
+    db.session.commit()
+    assert not load_principal(user.id).has_permission("contact.read")
+
+
+def test_cache_keeps_the_most_recently_used(app, user, clock):
+    app.config["PRINCIPAL_CACHE_SIZE"] = 1
+    other = User(username="other", email="other@example.com", password_hash="x")
+    db.session.add(other)
+    db.session.commit()
+
+    reader = load_principal(user.id)
+    load_principal(other.id)
+    # Evicted by the other user's entry: a new (equal) object is loaded
+    reloaded = load_principal(user.id)
+    assert reloaded == reader and reloaded is not reader
+    assert isinstance(reloaded, Principal)
@@ -0,0 +1,10 @@
+"""
+WSGI entry point for production servers, e.g. `gunicorn -c gunicorn.conf.py`.
+
+The schema is not created here; run `flask --app wsgi create-schema` once per deploy.
+"""
+from app import register_blueprints
+from app.config import create_app
+
+app = create_app()
+register_blueprints(app)